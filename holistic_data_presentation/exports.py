@@ -0,0 +1,29 @@
+from django.db.models import Case, CharField, Value, When
+
+from holistic_organization.exports import Column
+
+
+TOTAL_THERAPIST_EXPORT_COLUMNS = (
+    Column('organization_id', 'organization_id', kind=Column.INTEGER),
+    Column(
+        'type',
+        Case(
+            When(is_active=True, then=Value('active')),
+            default=Value('inactive'),
+            output_field=CharField()
+        )
+    ),
+    Column('period_type', 'period_type'),
+    Column('start_date', 'start_date', kind=Column.DATE),
+    Column('end_date', 'end_date', kind=Column.DATE),
+    Column('value', 'value', kind=Column.INTEGER),
+)
+
+RATE_EXPORT_COLUMNS = (
+    Column('organization_id', 'organization_id', kind=Column.INTEGER),
+    Column('type', 'type'),
+    Column('period_type', 'period_type'),
+    Column('start_date', 'start_date', kind=Column.DATE),
+    Column('end_date', 'end_date', kind=Column.DATE),
+    Column('value', 'value', kind=Column.FLOAT),
+)
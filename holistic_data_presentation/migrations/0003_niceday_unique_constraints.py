@@ -0,0 +1,39 @@
+# Generated by Django 3.2.16 on 2026-10-17 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holistic_data_presentation', '0002_rename_table_therapistrate_into_rate'),
+    ]
+
+    operations = [
+        # The NiceDay rows (without organization) weren't unique before, only the newest row of each key is kept.
+        migrations.RunSQL(
+            sql=[
+                'DELETE FROM holistic_data_presentation_rate AS old '
+                'USING holistic_data_presentation_rate AS new '
+                'WHERE old.organization_id IS NULL AND new.organization_id IS NULL '
+                'AND old.type = new.type AND old.start_date = new.start_date '
+                'AND old.end_date = new.end_date AND old.period_type = new.period_type '
+                'AND old.id < new.id',
+                'DELETE FROM holistic_data_presentation_totaltherapist AS old '
+                'USING holistic_data_presentation_totaltherapist AS new '
+                'WHERE old.organization_id IS NULL AND new.organization_id IS NULL '
+                'AND old.start_date = new.start_date AND old.end_date = new.end_date '
+                'AND old.period_type = new.period_type AND old.is_active = new.is_active '
+                'AND old.id < new.id',
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='rate',
+            constraint=models.UniqueConstraint(condition=models.Q(('organization__isnull', True)), fields=('type', 'start_date', 'end_date', 'period_type'), name='unique_niceday_rate'),
+        ),
+        migrations.AddConstraint(
+            model_name='totaltherapist',
+            constraint=models.UniqueConstraint(condition=models.Q(('organization__isnull', True)), fields=('start_date', 'end_date', 'period_type', 'is_active'), name='unique_niceday_total_therapist'),
+        ),
+    ]
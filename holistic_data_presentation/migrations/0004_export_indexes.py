@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-17 23:12
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The indexes are built without locking the tables against writes, which can't run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('holistic_data_presentation', '0003_niceday_unique_constraints'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='rate',
+            index=models.Index(fields=['organization', 'start_date'], name='rate_org_start_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='rate',
+            index=models.Index(fields=['start_date'], name='rate_start_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='totaltherapist',
+            index=models.Index(fields=['organization', 'start_date'], name='total_ther_org_start_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='totaltherapist',
+            index=models.Index(fields=['start_date'], name='total_ther_start_date_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
+from django.db.models import Q
 
-from holistic_organization.models import Organization
+from holistic_organization.models import Organization, UpsertQuerySet
 
 
 class TotalTherapist(models.Model):
@@ -32,10 +33,26 @@ class TotalTherapist(models.Model):
 
     value = models.PositiveIntegerField()
 
+    objects = UpsertQuerySet.as_manager()
+
     class Meta:
         unique_together = (
             ('organization', 'start_date', 'end_date', 'period_type', 'is_active'),
         )
+        constraints = [
+            # NULLs are distinct within the `unique_together` index,
+            # so the NiceDay-wide rows need their own partial unique index.
+            models.UniqueConstraint(
+                fields=['start_date', 'end_date', 'period_type', 'is_active'],
+                condition=Q(organization__isnull=True),
+                name='unique_niceday_total_therapist'
+            ),
+        ]
+        indexes = [
+            # The exports filtered by organization and by period, or by period only.
+            models.Index(fields=['organization', 'start_date'], name='total_ther_org_start_date_idx'),
+            models.Index(fields=['start_date'], name='total_ther_start_date_idx'),
+        ]
 
 
 class Rate(models.Model):
@@ -74,7 +91,23 @@ class Rate(models.Model):
 
     value = models.FloatField()
 
+    objects = UpsertQuerySet.as_manager()
+
     class Meta:
         unique_together = (
             ('organization', 'type', 'start_date', 'end_date', 'period_type'),
         )
+        constraints = [
+            # NULLs are distinct within the `unique_together` index,
+            # so the NiceDay-wide rows need their own partial unique index.
+            models.UniqueConstraint(
+                fields=['type', 'start_date', 'end_date', 'period_type'],
+                condition=Q(organization__isnull=True),
+                name='unique_niceday_rate'
+            ),
+        ]
+        indexes = [
+            # The exports filtered by organization and by period, or by period only.
+            models.Index(fields=['organization', 'start_date'], name='rate_org_start_date_idx'),
+            models.Index(fields=['start_date'], name='rate_start_date_idx'),
+        ]
@@ -1,6 +1,10 @@
 from django.db import transaction
 from rest_framework import serializers
 
+from holistic_data_presentation.exports import (
+    RATE_EXPORT_COLUMNS,
+    TOTAL_THERAPIST_EXPORT_COLUMNS,
+)
 from holistic_data_presentation.models import (
     Rate,
     TotalTherapist,
@@ -10,11 +14,17 @@ from holistic_data_presentation.validators import (
     validate_monthly_period,
     validate_yearly_period,
 )
+from holistic_organization.models import DataVersion
+from holistic_organization.serializers import ExportDeserializer, SyncChunkSerializer
+from holistic_organization.validators import FastBatchValidationMixin
 
 
 class BatchCreateSerializer(serializers.Serializer):
     rows_created = serializers.IntegerField()
     rows_updated = serializers.IntegerField(required=False)
+    rows_unchanged = serializers.IntegerField(required=False)
+    committed_chunks = SyncChunkSerializer(many=True, required=False)
+    failed_chunks = SyncChunkSerializer(many=True, required=False)
 
 
 class TotalTherapistSerializer(serializers.ModelSerializer):
@@ -31,7 +41,11 @@ class TotalTherapistSerializer(serializers.ModelSerializer):
         read_only = fields
 
 
-class BaseTotalTherapistBatchDeserializer(serializers.ListSerializer):
+class BaseTotalTherapistBatchDeserializer(FastBatchValidationMixin, serializers.ListSerializer):
+    # The natural key of the `TotalTherapist` objects in the batch,
+    # it must match one of the unique indexes of the table.
+    conflict_fields = None
+    conflict_condition = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -45,31 +59,9 @@ class BaseTotalTherapistBatchDeserializer(serializers.ListSerializer):
 
         @param list_total_thers: Validated JSON Array that contains a list of total therapists.
         """
-        existing_total_thers = self.get_existing_total_therapists()
-
-        to_update_objects = self._get_objects_to_update(list_total_thers, existing_total_thers)
-        to_create_objects = self._get_objects_to_create(list_total_thers, existing_total_thers)
-
-        TotalTherapist.objects.bulk_update(to_update_objects, fields=['period_type', 'value'])
-        rows_created = len(TotalTherapist.objects.bulk_create(to_create_objects))
-        rows_updated = len(list_total_thers) - rows_created
-
-        return {'rows_created': rows_created, 'rows_updated': rows_updated}
-
-    def get_existing_total_therapists(self):
-        """
-        Returns the existing `TotalTherapist` objects based on that incoming `list_total_thers`.
-        """
-        raise NotImplementedError()
+        items_by_key = {self._get_key(item): item for item in list_total_thers}
 
-    def _get_objects_to_create(self, list_total_thers, existing_total_thers):
-        """
-        Returns a list of `TotalTherapist` objects that are going to be created in batch.
-
-        @param list_total_thers: Validated JSON Array that contains a list of total therapists.
-        @param existing_total_thers: Existing total therapists.
-        """
-        return [
+        objects = [
             TotalTherapist(
                 organization_id=self.organization_id,
                 period_type=item['period_type'],
@@ -78,91 +70,50 @@ class BaseTotalTherapistBatchDeserializer(serializers.ListSerializer):
                 is_active=item['is_active'],
                 value=item['value']
             )
-            for item in list_total_thers if self._is_new_item(item, existing_total_thers)
+            for item in items_by_key.values()
         ]
 
-    def _is_new_item(self, item, existing_total_thers):
-        """
-        Returns `True` if that `item` doesn't exist
-        in the list of existing existing total therapists.
-
-        @param item: A dictionary that represents the total therapist within the payload data.
-        @param existing_total_thers: Existing total therapists.
-        """
-        for total_ther in existing_total_thers:
-            if bool(
-                item['start_date'] == total_ther.start_date and
-                item['end_date'] == total_ther.end_date and
-                item['is_active'] == total_ther.is_active
-            ):
-                return False
-
-        return True
-
-    def _get_objects_to_update(self, list_total_thers, existing_total_thers):
-        """
-        Returns a list of `TotalTherapist` objects that are going to be updated in batch.
-
-        @param list_total_thers: Validated JSON Array that contains a list of total therapists.
-        @param existing_total_thers: Existing total therapists.
-        """
-        objects_to_update = []
-
-        for item in list_total_thers:
-            to_update = self._get_object_to_update(item, existing_total_thers)
-
-            if to_update is None:
-                # That `item` doesn't exists,
-                # skip it from the update candidates.
-                continue
-
-            item, num_of_ther = list(to_update)
-            num_of_ther.value = item['value']
+        rows_created, rows_updated, rows_unchanged = TotalTherapist.objects.upsert(
+            objects,
+            conflict_fields=self.conflict_fields,
+            update_fields=['value'],
+            conflict_condition=self.conflict_condition
+        )
 
-            objects_to_update.append(num_of_ther)
+        if rows_created or rows_updated:
+            # Invalidates the cached exports, the unchanged rows keep them.
+            DataVersion.objects.bump(TotalTherapist)
 
-        return objects_to_update
+        return {
+            'rows_created': rows_created,
+            'rows_updated': rows_updated,
+            'rows_unchanged': rows_unchanged
+        }
 
-    def _get_object_to_update(self, item, existing_total_thers):
+    def _get_key(self, item):
         """
-        Returns a pair of (`item`, `TotalTherapist`)
-        if the `item` exists on the list of existing total therapists.
+        Returns the natural key of the total therapist `item`.
 
-        @param item: A dictionary that represents the Therapist within the payload data.
-        @param existing_total_thers: Existing total therapists.
+        @param item: A dictionary that represents the total therapist within the payload data.
         """
-        for total_ther in existing_total_thers:
-            if bool(
-                item['start_date'] == total_ther.start_date and
-                item['end_date'] == total_ther.end_date and
-                item['is_active'] == total_ther.is_active
-            ):
-                return (item, total_ther)
-
-        return None
+        return (item['period_type'], item['start_date'], item['end_date'], item['is_active'])
 
 
 class TotalTherapistBatchDeserializer(BaseTotalTherapistBatchDeserializer):
-
-    def get_existing_total_therapists(self):
-        """
-        Returns the existing `TotalTherapist` objects in Niceday.
-        """
-        return TotalTherapist.objects.filter(organization__isnull=True)
+    # Upserts the total therapists in NiceDay.
+    conflict_fields = ['start_date', 'end_date', 'period_type', 'is_active']
+    conflict_condition = 'organization_id IS NULL'
 
 
 class TotalTherapistInOrgBatchDeserializer(BaseTotalTherapistBatchDeserializer):
+    # Upserts the total therapists in the Organization.
+    conflict_fields = ['organization', 'start_date', 'end_date', 'period_type', 'is_active']
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.organization_id = self.context['organization_id']
 
-    def get_existing_total_therapists(self):
-        """
-        Returns the existing `TotalTherapist` objects in the Organization.
-        """
-        return TotalTherapist.objects.filter(organization_id=self.organization_id)
-
 
 class TotalTherapistDeserializer(serializers.Serializer):
     period_type = serializers.ChoiceField(
@@ -242,7 +193,11 @@ class RateSerializer(serializers.ModelSerializer):
         read_only = fields
 
 
-class BaseRateBatchDeserializer(serializers.ListSerializer):
+class BaseRateBatchDeserializer(FastBatchValidationMixin, serializers.ListSerializer):
+    # The natural key of the `Rate` objects in the batch,
+    # it must match one of the unique indexes of the table.
+    conflict_fields = None
+    conflict_condition = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -256,31 +211,9 @@ class BaseRateBatchDeserializer(serializers.ListSerializer):
 
         @param list_rate: Validated JSON Array that contains a list of the therapists' rates.
         """
-        existing_rates = self.get_existing_rates()
-
-        to_update_objects = self._get_objects_to_update(list_rate, existing_rates)
-        to_create_objects = self._get_objects_to_create(list_rate, existing_rates)
-
-        Rate.objects.bulk_update(to_update_objects, fields=['period_type', 'value'])
-        rows_created = len(Rate.objects.bulk_create(to_create_objects))
-        rows_updated = len(list_rate) - rows_created
-
-        return {'rows_created': rows_created, 'rows_updated': rows_updated}
-
-    def get_existing_rates(self):
-        """
-        Returns the existing `Rate` objects based on that incoming `list_rate`.
-        """
-        raise NotImplementedError()
-
-    def _get_objects_to_create(self, list_rate, existing_rates):
-        """
-        Returns a list of `Rate` objects that are going to be created in batch.
+        items_by_key = {self._get_key(item): item for item in list_rate}
 
-        @param list_rate: Validated JSON Array that contains a list of the therapists' rates.
-        @param existing_rates: Existing therapists' rates.
-        """
-        return [
+        objects = [
             Rate(
                 organization_id=self.organization_id,
                 type=item['type'],
@@ -289,93 +222,50 @@ class BaseRateBatchDeserializer(serializers.ListSerializer):
                 end_date=item['end_date'],
                 value=item['value']
             )
-            for item in list_rate if self._is_new_item(item, existing_rates)
+            for item in items_by_key.values()
         ]
 
-    def _is_new_item(self, item, existing_rates):
-        """
-        Returns `True` if that `item`'s type and period doesn't exist
-        in the list of existing therapists' rates.
-
-        @param item: A dictionary that represents the therapist's rate within the payload data.
-        @param existing_rates: Existing therapists' rates.
-        """
-        for rate in existing_rates:
-            if bool(
-                item['start_date'] == rate.start_date and
-                item['end_date'] == rate.end_date and
-                item['type'] == rate.type
-            ):
-                return False
-
-        return True
-
-    def _get_objects_to_update(self, list_rate, existing_rates):
-        """
-        Returns a list of `Rate` objects that are going to be updated in batch.
-
-        @param list_rate: Validated JSON Array that contains a list of the therapists' rates.
-        @param existing_rates: Existing therapists' rates.
-        """
-        objects_to_update = []
-
-        for item in list_rate:
-            pair = self._get_object_to_update(item, existing_rates)
-
-            if pair is None:
-                # That `item` doesn't exists,
-                # skip it from the update candidates.
-                continue
-
-            item, rate = list(pair)
-            rate.period_type = item['period_type']
-            rate.value = item['value']
+        rows_created, rows_updated, rows_unchanged = Rate.objects.upsert(
+            objects,
+            conflict_fields=self.conflict_fields,
+            update_fields=['value'],
+            conflict_condition=self.conflict_condition
+        )
 
-            objects_to_update.append(rate)
+        if rows_created or rows_updated:
+            # Invalidates the cached exports, the unchanged rows keep them.
+            DataVersion.objects.bump(Rate)
 
-        return objects_to_update
+        return {
+            'rows_created': rows_created,
+            'rows_updated': rows_updated,
+            'rows_unchanged': rows_unchanged
+        }
 
-    def _get_object_to_update(self, item, existing_rates):
+    def _get_key(self, item):
         """
-        Returns a pair of (`item`, `Rate`)
-        if the `item`'s type and period doesn't exist on the existing rates.
+        Returns the natural key of the therapists' rate `item`.
 
         @param item: A dictionary that represents the therapist's rate within the payload data.
-        @param existing_rates: Existing therapists' rates.
         """
-        for rate in existing_rates:
-            if bool(
-                item['start_date'] == rate.start_date and
-                item['end_date'] == rate.end_date and
-                item['type'] == rate.type
-            ):
-                return (item, rate)
-
-        return None
+        return (item['type'], item['period_type'], item['start_date'], item['end_date'])
 
 
 class RateBatchDeserializer(BaseRateBatchDeserializer):
-
-    def get_existing_rates(self):
-        """
-        Returns the existing `Rate` objects in NiceDay.
-        """
-        return Rate.objects.filter(organization__isnull=True)
+    # Upserts the `Rate` objects in NiceDay.
+    conflict_fields = ['type', 'start_date', 'end_date', 'period_type']
+    conflict_condition = 'organization_id IS NULL'
 
 
 class RatePerOrgBatchDeserializer(BaseRateBatchDeserializer):
+    # Upserts the `Rate` objects in the Organization.
+    conflict_fields = ['organization', 'type', 'start_date', 'end_date', 'period_type']
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.organization_id = self.context['organization_id']
 
-    def get_existing_rates(self):
-        """
-        Returns the existing `Rate` objects in the Organization.
-        """
-        return Rate.objects.filter(organization_id=self.organization_id)
-
 
 class RateDeserializer(serializers.Serializer):
     type = serializers.ChoiceField(
@@ -445,63 +335,45 @@ class RatePerOrgDeserializer(serializers.Serializer):
         return attrs
 
 
-class TotalTherapistExportJSONSerializer(serializers.Serializer):
+class TotalTherapistExportDeserializer(ExportDeserializer):
+    TYPE_ACTIVE = 'active'
+    TYPE_INACTIVE = 'inactive'
+    TYPE_CHOICES = (
+        (TYPE_ACTIVE, 'Active'),
+        (TYPE_INACTIVE, 'Inactive'),
+    )
+    type = serializers.ChoiceField(choices=TYPE_CHOICES, required=False)
+    period_type = serializers.ChoiceField(choices=TotalTherapist.PERIOD_CHOICES, required=False)
 
-    def to_representation(self, instance):
-        return {
-            "organization_id": instance.organization_id,
-            "type": "active" if instance.is_active else "inactive",
-            "period_type": instance.period_type,
-            "start_date": instance.start_date.isoformat(),
-            "end_date": instance.end_date.isoformat(),
-            "value": instance.value
-        }
+    export_columns = TOTAL_THERAPIST_EXPORT_COLUMNS
+    start_date_field = 'start_date'
+    end_date_field = 'end_date'
 
+    def get_filters(self):
+        filters = super().get_filters()
 
-class TotalTherapistExportCSVSerializer(serializers.Serializer):
+        if 'type' in self.validated_data:
+            filters['is_active'] = self.validated_data['type'] == self.TYPE_ACTIVE
 
-    def to_representation(self, instance):
-        return [
-            instance.organization_id,
-            "active" if instance.is_active else "inactive",
-            instance.period_type,
-            instance.start_date.isoformat(),
-            instance.end_date.isoformat(),
-            instance.value
-        ]
+        if 'period_type' in self.validated_data:
+            filters['period_type'] = self.validated_data['period_type']
 
+        return filters
 
-class RateExportJSONSerializer(serializers.Serializer):
-
-    def to_representation(self, instance):
-        return {
-            "organization_id": instance.organization_id,
-            "type": instance.type,
-            "period_type": instance.period_type,
-            "start_date": instance.start_date.isoformat(),
-            "end_date": instance.end_date.isoformat(),
-            "value": instance.value
-        }
 
+class RateExportDeserializer(ExportDeserializer):
+    type = serializers.ChoiceField(choices=Rate.TYPE_CHOICES, required=False)
+    period_type = serializers.ChoiceField(choices=Rate.PERIOD_CHOICES, required=False)
 
-class RateExportCSVSerializer(serializers.Serializer):
+    export_columns = RATE_EXPORT_COLUMNS
+    start_date_field = 'start_date'
+    end_date_field = 'end_date'
 
-    def to_representation(self, instance):
-        return [
-            instance.organization_id,
-            instance.type,
-            instance.period_type,
-            instance.start_date.isoformat(),
-            instance.end_date.isoformat(),
-            instance.value
-        ]
+    def get_filters(self):
+        filters = super().get_filters()
 
+        for name in ('type', 'period_type'):
+            if name in self.validated_data:
+                filters[name] = self.validated_data[name]
 
-class ExportDeserializer(serializers.Serializer):
-    TYPE_JSON = 'json'
-    TYPE_CSV = 'csv'
-    FORMAT_CHOICES = (
-        (TYPE_JSON, 'JSON'),
-        (TYPE_CSV, 'CSV'),
-    )
-    format = serializers.ChoiceField(choices=FORMAT_CHOICES)
+        return filters
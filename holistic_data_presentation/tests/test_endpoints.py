@@ -0,0 +1,525 @@
+import gzip
+import io
+import json
+import msgpack
+import os
+import tempfile
+
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import FileResponse
+from io import StringIO
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APITestCase
+from unittest import skipIf
+
+from holistic_data_presentation.models import (
+    Rate,
+    TotalTherapist,
+)
+from holistic_organization.models import Organization
+from holistic_organization.renderers import MessagePackRenderer, decode_msgpack_ext
+from holistic_organization.writers import pyarrow
+
+
+User = get_user_model()
+
+
+class TestRateEndpoint(APITestCase):
+    """
+    Test endpoint `/rates/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.url = '/rates/'
+
+    def test_post(self):
+        data = [
+            {'type': 'churn_rate', 'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'value': 1.5},
+            {'type': 'retention_rate', 'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'value': 3.5},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.json(), {
+            'rows_created': 2,
+            'rows_updated': 0,
+            'rows_unchanged': 0,
+            'committed_chunks': [{'start': 0, 'end': 1}],
+            'failed_chunks': [],
+        })
+        self.assertEqual(Rate.objects.filter(organization__isnull=True).count(), 2)
+
+    def test_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_gzip(self):
+        for i in range(10):
+            baker.make(Rate, type='churn_rate', period_type='weekly', start_date=f'2022-10-{i + 1:02}', end_date=f'2022-10-{i + 7:02}')
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 10)
+
+    def test_msgpack(self):
+        data = [
+            {'type': 'churn_rate', 'period_type': 'weekly', 'start_date': date(2022, 10, 31), 'end_date': date(2022, 11, 6), 'value': 1.5},
+        ]
+
+        response = self.client.post(
+            self.url, MessagePackRenderer().render(data), content_type='application/msgpack', HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['rows_created'], 1)
+
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        rates = msgpack.unpackb(response.content, ext_hook=decode_msgpack_ext)
+        self.assertEqual(rates[0]['start_date'], date(2022, 10, 31))
+        self.assertEqual(rates[0]['end_date'], date(2022, 11, 6))
+
+        # The JSON keeps the ISO 8601 dates.
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()[0]['start_date'], '2022-10-31')
+
+
+class TestTotalTherapistInOrgEndpoint(APITestCase):
+    """
+    Test endpoint `/organizations/<id>/total-therapists/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.organization = baker.make(Organization)
+        self.url = f'/organizations/{self.organization.id}/total-therapists/'
+
+    def test_post(self):
+        data = [
+            {'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'is_active': True, 'value': 10},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.json(), {
+            'rows_created': 1,
+            'rows_updated': 0,
+            'rows_unchanged': 0,
+            'committed_chunks': [{'start': 0, 'end': 0}],
+            'failed_chunks': [],
+        })
+        self.assertEqual(TotalTherapist.objects.get(organization=self.organization).value, 10)
+
+    def test_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class TestRateExportEndpoint(APITestCase):
+    """
+    Test endpoint `/rates/export/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.url = '/rates/export/'
+
+        # Every test caches its exports in its own directory, since the data versions restart with each test.
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+
+        settings_override = self.settings(EXPORT_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.organization = baker.make(Organization)
+        baker.make(
+            Rate, organization=self.organization, type='churn_rate', period_type='weekly',
+            start_date='2022-10-31', end_date='2022-11-06', value=1.5
+        )
+
+    def test_post_json(self):
+        response = self.client.post(self.url, {'format': 'json'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        self.assertListEqual(json.loads(b''.join(response.streaming_content)), [{
+            'organization_id': self.organization.id,
+            'type': 'churn_rate',
+            'period_type': 'weekly',
+            'start_date': '2022-10-31',
+            'end_date': '2022-11-06',
+            'value': 1.5
+        }])
+
+    def test_post_csv(self):
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'organization_id,type,period_type,start_date,end_date,value\r\n'
+            f'{self.organization.id},churn_rate,weekly,2022-10-31,2022-11-06,1.5\r\n'
+        )
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed.')
+    def test_post_parquet(self):
+        import pyarrow.parquet
+
+        response = self.client.post(self.url, {'format': 'parquet'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        table = pyarrow.parquet.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.schema.field('start_date').type, pyarrow.date32())
+        self.assertEqual(table.schema.field('value').type, pyarrow.float64())
+        self.assertListEqual(table.to_pylist(), [{
+            'organization_id': self.organization.id,
+            'type': 'churn_rate',
+            'period_type': 'weekly',
+            'start_date': date(2022, 10, 31),
+            'end_date': date(2022, 11, 6),
+            'value': 1.5
+        }])
+
+    def test_post_filtered(self):
+        other = baker.make(Organization)
+        baker.make(
+            Rate, organization=other, type='churn_rate', period_type='weekly',
+            start_date='2022-10-31', end_date='2022-11-06', value=2.5
+        )
+        baker.make(
+            Rate, organization=self.organization, type='churn_rate', period_type='monthly',
+            start_date='2022-11-01', end_date='2022-11-30', value=3.5
+        )
+        baker.make(
+            Rate, organization=self.organization, type='churn_rate', period_type='weekly',
+            start_date='2022-11-07', end_date='2022-11-13', value=4.5
+        )
+
+        data = {
+            'format': 'csv',
+            'organizations': [self.organization.id],
+            'type': 'churn_rate',
+            'period_type': 'weekly',
+            'start_date': '2022-10-31',
+            'end_date': '2022-11-10',
+            'columns': ['start_date', 'value'],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'start_date,value\r\n2022-10-31,1.5\r\n')
+
+        response = self.client.post(self.url, {'format': 'csv', 'type': 'unknown'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_pages(self):
+        """
+        Test the pages follow the ordering of the whole export, with the NULL organizations last
+        """
+        other = baker.make(Organization)
+
+        # The rows are created out of the export ordering, so it differs from the primary key one.
+        for organization, type, start_date in [
+            (None, 'churn_rate', '2022-11-07'), (other, 'retention_rate', '2022-10-31'),
+            (self.organization, 'retention_rate', '2022-11-07'), (None, 'churn_rate', '2022-10-31'),
+            (other, 'churn_rate', '2022-11-07'), (self.organization, 'churn_rate', '2022-11-07'),
+            (None, 'retention_rate', '2022-10-31'),
+        ]:
+            baker.make(
+                Rate, organization=organization, type=type, period_type='weekly',
+                start_date=start_date, end_date='2022-11-13', value=1.5
+            )
+
+        response = self.client.post(self.url, {'format': 'ndjson'}, format='json')
+        expected = b''.join(response.streaming_content).decode().splitlines()
+
+        for page_size in [1, 2, 3]:
+            data = {'format': 'ndjson', 'page_size': page_size}
+            lines = []
+
+            while True:
+                response = self.client.post(self.url, data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                lines += b''.join(response.streaming_content).decode().splitlines()
+
+                if not response.has_header('Export-Continuation'):
+                    break
+
+                data['continuation'] = response['Export-Continuation']
+
+            self.assertListEqual(lines, expected)
+
+    def test_post_cached(self):
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIsInstance(response, FileResponse)
+
+        etag = response['ETag']
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # The repeated export is sent from the cached file.
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=therapists_rates.csv')
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # The other formats and filters are cached on their own.
+        response = self.client.post(self.url, {'format': 'json'}, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # The batch upsert that changes the rates bumps their version.
+        data = [{'type': 'churn_rate', 'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'value': 2.5}]
+        self.client.post('/rates/', data, format='json')
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIsInstance(response, FileResponse)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'organization_id,type,period_type,start_date,end_date,value\r\n'
+            f'{self.organization.id},churn_rate,weekly,2022-10-31,2022-11-06,1.5\r\n'
+            ',churn_rate,weekly,2022-10-31,2022-11-06,2.5\r\n'
+        )
+
+        # The files of the previous version are evicted.
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # The unchanged rows keep the version.
+        etag = response['ETag']
+        self.client.post('/rates/', data, format='json')
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_post_cached_range(self):
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        content = b''.join(response.streaming_content)
+        etag = response['ETag']
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+        for header, expected in [('bytes=10-', content[10:]), ('bytes=10-19', content[10:20]), ('bytes=-5', content[-5:])]:
+            response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_RANGE=header, HTTP_IF_RANGE=etag)
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT, header)
+            self.assertEqual(response['Content-Length'], str(len(expected)))
+            self.assertEqual(b''.join(response.streaming_content), expected)
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_RANGE='bytes=10-')
+        self.assertEqual(response['Content-Range'], f'bytes 10-{len(content) - 1}/{len(content)}')
+        self.assertEqual(b''.join(response.streaming_content), content[10:])
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_RANGE=f'bytes={len(content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(content)}')
+
+        # The range of another version is ignored, the whole file is sent.
+        response = self.client.post(
+            self.url, {'format': 'csv'}, format='json', HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"other"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+    def test_post_cached_max_bytes(self):
+        """
+        Test the least recently used files are evicted beyond `EXPORT_CACHE_MAX_BYTES`
+        """
+        paths = {}
+
+        for format in ['csv', 'json']:
+            response = self.client.post(self.url, {'format': format}, format='json')
+            b''.join(response.streaming_content)
+
+            paths[format] = os.path.join(self.cache_dir, next(
+                name for name in os.listdir(self.cache_dir) if name.endswith(f'.{format}')
+            ))
+
+        # The CSV file is older, but it's used again.
+        os.utime(paths['csv'], (1000, 1000))
+        os.utime(paths['json'], (2000, 2000))
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertIsInstance(response, FileResponse)
+        b''.join(response.streaming_content)
+
+        max_bytes = os.path.getsize(paths['csv']) + os.path.getsize(paths['json'])
+
+        with self.settings(EXPORT_CACHE_MAX_BYTES=max_bytes):
+            response = self.client.post(self.url, {'format': 'ndjson'}, format='json')
+            b''.join(response.streaming_content)
+
+        self.assertListEqual(
+            sorted(name.rpartition('.')[2] for name in os.listdir(self.cache_dir)),
+            ['csv', 'ndjson']
+        )
+
+    def test_post_async(self):
+        job_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(job_dir.cleanup)
+
+        with self.settings(EXPORT_JOB_DIR=job_dir.name):
+            response = self.client.post(f'{self.url}?async=true', {'format': 'json'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+            call_command('run_export_worker', once=True, stdout=StringIO())
+
+            job = self.client.get(response['Location']).json()
+            self.assertEqual(job['status'], 'completed')
+
+            response = self.client.get(job['file_url'])
+            self.assertEqual(response['Content-Disposition'], 'attachment; filename=therapists_rates.json')
+            self.assertListEqual(json.loads(b''.join(response.streaming_content)), [{
+                'organization_id': self.organization.id,
+                'type': 'churn_rate',
+                'period_type': 'weekly',
+                'start_date': '2022-10-31',
+                'end_date': '2022-11-06',
+                'value': 1.5
+            }])
+
+    def test_post_cached_gzip(self):
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_ACCEPT_ENCODING='gzip')
+        b''.join(response.streaming_content)
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            'organization_id,type,period_type,start_date,end_date,value\r\n'
+            f'{self.organization.id},churn_rate,weekly,2022-10-31,2022-11-06,1.5\r\n'
+        )
+
+        # The weak `ETag` of the compressed response revalidates as well.
+        response = self.client.post(
+            self.url, {'format': 'csv'}, format='json', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_post_csv_gzip(self):
+        response = self.client.post(self.url, {'format': 'csv'}, format='json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            'organization_id,type,period_type,start_date,end_date,value\r\n'
+            f'{self.organization.id},churn_rate,weekly,2022-10-31,2022-11-06,1.5\r\n'
+        )
+
+    def test_post_json_empty(self):
+        Rate.objects.all().delete()
+
+        response = self.client.post(self.url, {'format': 'json'}, format='json')
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+        response = self.client.post(self.url, {'format': 'ndjson'}, format='json')
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertEqual(b''.join(response.streaming_content), b'organization_id,type,period_type,start_date,end_date,value\r\n')
+
+        if pyarrow is not None:
+            response = self.client.post(self.url, {'format': 'arrow'}, format='json')
+            table = pyarrow.ipc.open_file(pyarrow.py_buffer(b''.join(response.streaming_content))).read_all()
+            self.assertEqual(table.num_rows, 0)
+            self.assertEqual(table.schema.field('end_date').type, pyarrow.date32())
+
+
+class TestTotalTherapistExportEndpoint(APITestCase):
+    """
+    Test endpoint `/total-therapists/export/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.url = '/total-therapists/export/'
+
+        # Every test caches its exports in its own directory, since the data versions restart with each test.
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+
+        settings_override = self.settings(EXPORT_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_post_ndjson(self):
+        baker.make(
+            TotalTherapist, organization=None, is_active=False, period_type='weekly',
+            start_date='2022-10-31', end_date='2022-11-06', value=3
+        )
+        baker.make(
+            TotalTherapist, organization=None, is_active=True, period_type='weekly',
+            start_date='2022-10-31', end_date='2022-11-06', value=5
+        )
+        baker.make(
+            TotalTherapist, organization=None, is_active=False, period_type='monthly',
+            start_date='2022-11-01', end_date='2022-11-30', value=7
+        )
+
+        data = {'format': 'ndjson', 'type': 'inactive', 'period_type': 'weekly', 'end_date': '2022-11-06'}
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            b'{"organization_id":null,"type":"inactive","period_type":"weekly",'
+            b'"start_date":"2022-10-31","end_date":"2022-11-06","value":3}\n'
+        )
+
+    def test_post_pages(self):
+        for organization, is_active, start_date in [
+            (None, True, '2022-11-07'), (None, False, '2022-11-07'), (baker.make(Organization), True, '2022-10-31'),
+            (None, False, '2022-10-31'), (None, True, '2022-10-31'),
+        ]:
+            baker.make(
+                TotalTherapist, organization=organization, is_active=is_active, period_type='weekly',
+                start_date=start_date, end_date='2022-11-13', value=3
+            )
+
+        response = self.client.post(self.url, {'format': 'ndjson'}, format='json')
+        expected = b''.join(response.streaming_content).decode().splitlines()
+
+        data = {'format': 'ndjson', 'page_size': 2}
+        lines = []
+
+        while True:
+            response = self.client.post(self.url, data, format='json')
+            lines += b''.join(response.streaming_content).decode().splitlines()
+
+            if not response.has_header('Export-Continuation'):
+                break
+
+            data['continuation'] = response['Export-Continuation']
+
+        self.assertListEqual(lines, expected)
@@ -0,0 +1,172 @@
+from datetime import date
+from model_bakery import baker
+from rest_framework.test import APITestCase
+
+from holistic_data_presentation.models import (
+    Rate,
+    TotalTherapist,
+)
+from holistic_data_presentation.serializers import (
+    RateDeserializer,
+    RatePerOrgDeserializer,
+    TotalTherapistDeserializer,
+    TotalTherapistInOrgDeserializer,
+)
+from holistic_organization.models import Organization
+
+
+class TestTotalTherapistBatchDeserializer(APITestCase):
+    """
+    Test the `TotalTherapistBatchDeserializer` and `TotalTherapistInOrgBatchDeserializer`
+    """
+
+    def setUp(self):
+        self.organization = baker.make(Organization)
+
+        self.data = [
+            {'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'is_active': True, 'value': 10},
+            {'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'is_active': False, 'value': 11},
+            {'period_type': 'monthly', 'start_date': '2022-11-01', 'end_date': '2022-11-30', 'is_active': True, 'value': 29},
+        ]
+
+    def _save(self, deserializer_class, context=None):
+        deserializer = deserializer_class(data=self.data, many=True, context=context or {})
+        deserializer.is_valid(raise_exception=True)
+        deserializer.save()
+
+        return deserializer.instance
+
+    def test_upsert_in_niceday(self):
+        """
+        Test the deserializer upserts NiceDay-wide total therapists by their natural key
+        """
+        baker.make(
+            TotalTherapist,
+            organization=None,
+            period_type='weekly',
+            start_date=date(2022, 10, 31),
+            end_date=date(2022, 11, 6),
+            is_active=True,
+            value=1
+        )
+        # Same period within an organization, it must be left untouched.
+        baker.make(
+            TotalTherapist,
+            organization=self.organization,
+            period_type='weekly',
+            start_date=date(2022, 10, 31),
+            end_date=date(2022, 11, 6),
+            is_active=True,
+            value=2
+        )
+
+        result = self._save(TotalTherapistDeserializer)
+
+        self.assertDictEqual(result, {'rows_created': 2, 'rows_updated': 1, 'rows_unchanged': 0})
+
+        actual = list(
+            TotalTherapist.objects.order_by('organization', 'period_type', 'is_active')
+            .values_list('organization', 'period_type', 'is_active', 'value')
+        )
+        expected = [
+            (self.organization.id, 'weekly', True, 2),
+            (None, 'monthly', True, 29),
+            (None, 'weekly', False, 11),
+            (None, 'weekly', True, 10),
+        ]
+        self.assertListEqual(actual, expected)
+
+    def test_upsert_in_organization(self):
+        """
+        Test the deserializer upserts the organization's total therapists by their natural key
+        """
+        baker.make(
+            TotalTherapist,
+            organization=self.organization,
+            period_type='monthly',
+            start_date=date(2022, 11, 1),
+            end_date=date(2022, 11, 30),
+            is_active=True,
+            value=1
+        )
+
+        result = self._save(TotalTherapistInOrgDeserializer, {'organization_id': self.organization.id})
+
+        self.assertDictEqual(result, {'rows_created': 2, 'rows_updated': 1, 'rows_unchanged': 0})
+        self.assertEqual(
+            TotalTherapist.objects.get(organization=self.organization, period_type='monthly').value,
+            29
+        )
+
+
+class TestRateBatchDeserializer(APITestCase):
+    """
+    Test the `RateBatchDeserializer` and `RatePerOrgBatchDeserializer`
+    """
+
+    def setUp(self):
+        self.organization = baker.make(Organization)
+
+        self.data = [
+            {'type': 'churn_rate', 'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'value': 1.5},
+            {'type': 'retention_rate', 'period_type': 'weekly', 'start_date': '2022-10-31', 'end_date': '2022-11-06', 'value': 3.5},
+            {'type': 'churn_rate', 'period_type': 'monthly', 'start_date': '2022-11-01', 'end_date': '2022-11-30', 'value': 2.5},
+        ]
+
+    def _save(self, deserializer_class, context=None):
+        deserializer = deserializer_class(data=self.data, many=True, context=context or {})
+        deserializer.is_valid(raise_exception=True)
+        deserializer.save()
+
+        return deserializer.instance
+
+    def test_upsert_in_niceday(self):
+        """
+        Test the deserializer upserts NiceDay-wide rates by their natural key
+        """
+        baker.make(
+            Rate,
+            organization=None,
+            type='churn_rate',
+            period_type='weekly',
+            start_date=date(2022, 10, 31),
+            end_date=date(2022, 11, 6),
+            value=9.0
+        )
+
+        result = self._save(RateDeserializer)
+
+        self.assertDictEqual(result, {'rows_created': 2, 'rows_updated': 1, 'rows_unchanged': 0})
+
+        actual = list(
+            Rate.objects.order_by('type', 'period_type')
+            .values_list('organization', 'type', 'period_type', 'value')
+        )
+        expected = [
+            (None, 'churn_rate', 'monthly', 2.5),
+            (None, 'churn_rate', 'weekly', 1.5),
+            (None, 'retention_rate', 'weekly', 3.5),
+        ]
+        self.assertListEqual(actual, expected)
+
+    def test_upsert_in_organization(self):
+        """
+        Test the deserializer upserts the organization's rates by their natural key
+        """
+        baker.make(
+            Rate,
+            organization=self.organization,
+            type='retention_rate',
+            period_type='weekly',
+            start_date=date(2022, 10, 31),
+            end_date=date(2022, 11, 6),
+            value=9.0
+        )
+
+        result = self._save(RatePerOrgDeserializer, {'organization_id': self.organization.id})
+
+        self.assertDictEqual(result, {'rows_created': 2, 'rows_updated': 1, 'rows_unchanged': 0})
+        self.assertEqual(
+            Rate.objects.get(organization=self.organization, type='retention_rate').value,
+            3.5
+        )
@@ -1,5 +1,5 @@
+from calendar import monthrange
 from datetime import timedelta
-from dateutil.relativedelta import relativedelta
 from rest_framework.exceptions import ValidationError
 
 
@@ -31,9 +31,10 @@ def validate_monthly_period(start_date, end_date):
 
     correct_start_date = start_date.replace(day=1)
 
-    # We use `relativedelta` to calculate the end of month
+    # We use `monthrange` to get the number of days of the month,
     # So it won't blindly add 31 days to that `correct_start_date`.
-    correct_end_date = correct_start_date + relativedelta(day=31)
+    _, days = monthrange(start_date.year, start_date.month)
+    correct_end_date = correct_start_date.replace(day=days)
 
     if start_date != correct_start_date:
         raise ValidationError({
@@ -53,11 +54,7 @@ def validate_yearly_period(start_date, end_date):
     """
 
     correct_start_date = start_date.replace(day=1, month=1)
-    first_date_of_dec = correct_start_date.replace(month=12)
-
-    # We use `relativedelta` to calculate the end of month
-    # So it won't blindly add 31 days to that `first_date_of_dec`.
-    correct_end_date = first_date_of_dec + relativedelta(day=31)
+    correct_end_date = correct_start_date.replace(month=12, day=31)
 
     if start_date != correct_start_date:
         raise ValidationError({
@@ -1,7 +1,5 @@
 from django.http import Http404
 from drf_rw_serializers import generics
-from rest_framework import status
-from rest_framework.response import Response
 
 from holistic_data_presentation.filters import (
     RateFilter,
@@ -13,24 +11,25 @@ from holistic_data_presentation.models import (
 )
 from holistic_data_presentation.serializers import (
     BatchCreateSerializer,
-    ExportDeserializer,
     RateDeserializer,
-    RateExportCSVSerializer,
-    RateExportJSONSerializer,
+    RateExportDeserializer,
     RatePerOrgDeserializer,
     RateSerializer,
     TotalTherapistDeserializer,
-    TotalTherapistExportCSVSerializer,
-    TotalTherapistExportJSONSerializer,
+    TotalTherapistExportDeserializer,
     TotalTherapistInOrgDeserializer,
     TotalTherapistSerializer,
 )
-from holistic_data_presentation.writers import CSVStream
+from holistic_organization.export_cache import ExportCache
+from holistic_organization.mixins import BatchSyncMixin, CompressedResponseMixin, ExportJobMixin
+from holistic_organization.models import ExportJob
+from holistic_organization.writers import CopyCSVStream
 
 
-class TotalTherapistListView(generics.ListCreateAPIView):
+class TotalTherapistListView(CompressedResponseMixin, BatchSyncMixin, generics.ListCreateAPIView):
     read_serializer_class = TotalTherapistSerializer
     write_serializer_class = TotalTherapistDeserializer
+    sync_scope = 'total_therapists'
     filterset_class = TotalTherapistFilter
 
     queryset = TotalTherapist.objects.all().order_by('end_date')
@@ -42,17 +41,13 @@ class TotalTherapistListView(generics.ListCreateAPIView):
         return super().get_read_serializer_class()
 
     def post(self, request, *args, **kwargs):
-        deserializer = self.get_write_serializer(data=request.data, many=True)
-        deserializer.is_valid(raise_exception=True)
-        deserializer.save()
+        return self.create_batch_sync_response(request)
 
-        serializer = self.get_read_serializer(deserializer.instance)
-        return Response(serializer.data)
 
-
-class TotalTherapistInOrgListView(generics.CreateAPIView):
+class TotalTherapistInOrgListView(BatchSyncMixin, generics.CreateAPIView):
     read_serializer_class = BatchCreateSerializer
     write_serializer_class = TotalTherapistInOrgDeserializer
+    sync_scope = 'total_therapists'
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -63,57 +58,29 @@ class TotalTherapistInOrgListView(generics.CreateAPIView):
         if not self.kwargs.get('id'):
             raise Http404
 
-        deserializer = self.get_write_serializer(data=request.data, many=True)
-        deserializer.is_valid(raise_exception=True)
-        deserializer.save()
-
-        serializer = self.get_read_serializer(deserializer.instance)
-        return Response(serializer.data)
-
-
-class TotalTherapistExportView(generics.CreateAPIView):
-
-    def post(self, request, *args, **kwargs):
-        deserializer = ExportDeserializer(data=request.data)
-        deserializer.is_valid(raise_exception=True)
-
-        format = deserializer.validated_data['format']
-        filename = 'total_therapists'
-
-        queryset = TotalTherapist.objects.all()\
-            .order_by('organization', 'is_active', 'period_type', 'start_date')
-
-        if format == 'json':
-            serializer = TotalTherapistExportJSONSerializer(
-                queryset,
-                many=True
-            )
+        return self.create_batch_sync_response(request)
 
-            response = Response(serializer.data)
-            response['Content-Disposition'] = f"attachment; filename={filename}.json"
 
-            return response
+class TotalTherapistExportView(ExportJobMixin, CompressedResponseMixin, generics.CreateAPIView):
+    export_deserializer_class = TotalTherapistExportDeserializer
+    export_filename = 'total_therapists'
+    export_job_type = ExportJob.TYPE_TOTAL_THERAPISTS
 
-        elif format == 'csv':
-            csv_stream = CSVStream()
-            headers = [
-                'organization_id', 'type', 'period_type',
-                'start_date', 'end_date', 'value'
-            ]
+    def get_export_queryset(self, deserializer):
+        return deserializer.paginate(
+            TotalTherapist.objects.filter(**deserializer.get_filters()).order_by('organization', 'is_active', 'period_type', 'start_date')
+        )
 
-            return csv_stream.export(
-                filename,
-                headers,
-                queryset.iterator(),
-                TotalTherapistExportCSVSerializer
-            )
+    def get_export_response(self, request, deserializer, export):
+        export_cache = ExportCache(self.export_filename, TotalTherapist, deserializer.get_request_data())
 
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return export_cache.get_response(request, self.export_filename, export)
 
 
-class RateListView(generics.ListCreateAPIView):
+class RateListView(CompressedResponseMixin, BatchSyncMixin, generics.ListCreateAPIView):
     read_serializer_class = RateSerializer
     write_serializer_class = RateDeserializer
+    sync_scope = 'rates'
     filterset_class = RateFilter
 
     queryset = Rate.objects.all().order_by('end_date')
@@ -125,17 +92,13 @@ class RateListView(generics.ListCreateAPIView):
         return super().get_read_serializer_class()
 
     def post(self, request, *args, **kwargs):
-        deserializer = self.get_write_serializer(data=request.data, many=True)
-        deserializer.is_valid(raise_exception=True)
-        deserializer.save()
+        return self.create_batch_sync_response(request)
 
-        serializer = self.get_read_serializer(deserializer.instance)
-        return Response(serializer.data)
 
-
-class RatePerOrgListView(generics.CreateAPIView):
+class RatePerOrgListView(BatchSyncMixin, generics.CreateAPIView):
     read_serializer_class = BatchCreateSerializer
     write_serializer_class = RatePerOrgDeserializer
+    sync_scope = 'rates'
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -146,49 +109,21 @@ class RatePerOrgListView(generics.CreateAPIView):
         if not self.kwargs.get('id'):
             raise Http404
 
-        deserializer = self.get_write_serializer(data=request.data, many=True)
-        deserializer.is_valid(raise_exception=True)
-        deserializer.save()
-
-        serializer = self.get_read_serializer(deserializer.instance)
-        return Response(serializer.data)
-
-
-class RateExportView(generics.CreateAPIView):
-
-    def post(self, request, *args, **kwargs):
-        deserializer = ExportDeserializer(data=request.data)
-        deserializer.is_valid(raise_exception=True)
-
-        format = deserializer.validated_data['format']
-        filename = 'therapists_rates'
-
-        queryset = Rate.objects.all()\
-            .order_by('organization', 'type', 'period_type', 'start_date')
-
-        if format == 'json':
-            serializer = RateExportJSONSerializer(
-                queryset,
-                many=True
-            )
+        return self.create_batch_sync_response(request)
 
-            response = Response(serializer.data)
-            response['Content-Disposition'] = f"attachment; filename={filename}.json"
 
-            return response
+class RateExportView(ExportJobMixin, CompressedResponseMixin, generics.CreateAPIView):
+    export_deserializer_class = RateExportDeserializer
+    export_filename = 'therapists_rates'
+    export_job_type = ExportJob.TYPE_RATES
+    csv_stream_class = CopyCSVStream
 
-        elif format == 'csv':
-            csv_stream = CSVStream()
-            headers = [
-                'organization_id', 'type', 'period_type',
-                'start_date', 'end_date', 'value'
-            ]
+    def get_export_queryset(self, deserializer):
+        return deserializer.paginate(
+            Rate.objects.filter(**deserializer.get_filters()).order_by('organization', 'type', 'period_type', 'start_date')
+        )
 
-            return csv_stream.export(
-                filename,
-                headers,
-                queryset.iterator(),
-                RateExportCSVSerializer
-            )
+    def get_export_response(self, request, deserializer, export):
+        export_cache = ExportCache(self.export_filename, Rate, deserializer.get_request_data())
 
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return export_cache.get_response(request, self.export_filename, export)
@@ -2,7 +2,10 @@ from django.contrib import admin
 
 
 from holistic_organization.models import (
+    ExportJob,
+    IdempotencyRecord,
     Organization,
+    SyncJob,
     Therapist,
     Interaction
 )
@@ -47,3 +50,48 @@ class InteractionAdmin(admin.ModelAdmin):
     list_filter = ('therapist', 'interaction_date',)
     list_per_page = 25
     search_fields = ('therapist_id',)
+
+
+@admin.register(SyncJob)
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'sync_type',
+        'target_id',
+        'status',
+        'processed_items',
+        'total_items',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('sync_type', 'status',)
+    list_per_page = 25
+    search_fields = ('target_id',)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'export_type',
+        'format',
+        'status',
+        'file_size',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('export_type', 'status',)
+    list_per_page = 25
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = (
+        'scope',
+        'key',
+        'status_code',
+        'created_at',
+    )
+    list_filter = ('status_code',)
+    list_per_page = 25
+    search_fields = ('scope', 'key',)
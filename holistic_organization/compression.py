@@ -0,0 +1,180 @@
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from holistic_organization.parsers import zstandard
+
+
+# The content types that are compressed already.
+COMPRESSED_CONTENT_TYPES = (
+    'application/vnd.apache.parquet',
+)
+
+# The responses that are smaller than this aren't worth compressing.
+MIN_COMPRESSED_SIZE = 200
+
+
+class GzipCompressor:
+    encoding = 'gzip'
+    level = 6
+
+    def __init__(self):
+        self.compressobj = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self.compressobj.compress(data)
+
+    def flush(self):
+        return self.compressobj.flush()
+
+
+class ZstdCompressor:
+    encoding = 'zstd'
+    level = 3
+
+    def __init__(self):
+        self.compressobj = zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def compress(self, data):
+        return self.compressobj.compress(data)
+
+    def flush(self):
+        return self.compressobj.flush()
+
+
+class BrotliCompressor:
+    encoding = 'br'
+    quality = 5
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=self.quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def get_compressor_classes():
+    """
+    Returns the available compressors, the preferred one first.
+    """
+    compressor_classes = []
+
+    if zstandard is not None:
+        compressor_classes.append(ZstdCompressor)
+
+    if brotli is not None:
+        compressor_classes.append(BrotliCompressor)
+
+    compressor_classes.append(GzipCompressor)
+
+    return compressor_classes
+
+
+def select_compressor_class(accept_encoding):
+    """
+    Returns the compressor that's preferred by the `Accept-Encoding` header, or `None`.
+    The encodings are chosen by their quality values, and by the server preference when they're equal
+    (see `get_compressor_classes`). An explicit `identity` of a higher quality is answered without compression.
+    """
+    qualities = {}
+
+    for coding in accept_encoding.split(','):
+        coding, *params = coding.split(';')
+        quality = 1.0
+
+        for param in params:
+            name, _, value = param.strip().partition('=')
+
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[coding.strip().lower()] = quality
+
+    best_class = None
+    best_quality = 0.0
+
+    for compressor_class in get_compressor_classes():
+        quality = qualities.get(compressor_class.encoding, qualities.get('*', 0.0))
+
+        if quality > best_quality:
+            best_class = compressor_class
+            best_quality = quality
+
+    if qualities.get('identity', 0.0) > best_quality:
+        return None
+
+    return best_class
+
+
+def compress_sequence(compressor, sequence):
+    """
+    Compresses the chunks of the `sequence` incrementally, the compressor buffers the small chunks.
+    """
+    for chunk in sequence:
+        data = compressor.compress(chunk)
+
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def compress_response(request, response):
+    """
+    Compresses the `response` by the encoding that's negotiated through the `Accept-Encoding` header of the `request`.
+    The streaming responses are compressed incrementally while they're sent.
+
+    @param request: The request of the response.
+    @param response: The rendered response, or a streaming response.
+    """
+    if response.status_code != 200 or response.has_header('Content-Encoding'):
+        return response
+
+    if response.get('Content-Type', '').split(';')[0] in COMPRESSED_CONTENT_TYPES:
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    compressor_class = select_compressor_class(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+    if compressor_class is None:
+        return response
+
+    compressor = compressor_class()
+
+    if response.streaming:
+        response.streaming_content = compress_sequence(compressor, response.streaming_content)
+        del response['Content-Length']
+
+    else:
+        if len(response.content) < MIN_COMPRESSED_SIZE:
+            return response
+
+        content = compressor.compress(response.content) + compressor.flush()
+
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+
+    # The compressed content differs from the identity content byte by byte.
+    etag = response.get('ETag')
+
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = 'W/' + etag
+
+    response['Content-Encoding'] = compressor_class.encoding
+
+    return response
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from contextlib import suppress
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags
+
+from holistic_organization.models import DataVersion
+
+
+# The content types of the export formats, whose extensions are the format names.
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+# A single range of the `Range` header, e.g. `bytes=100-199`, `bytes=100-`, or `bytes=-100`.
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    A file-like object that reads `length` bytes of the `file` from the `start` position,
+    for the `206 Partial Content` responses.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class ExportCache:
+    """
+    Caches the rendered files of an export on the local disk (see `EXPORT_CACHE_DIR`),
+    keyed by the export, its request (format, filters, and columns), and the data version of its table.
+    The key is sent as the `ETag` of the response, so a client that holds the same version
+    is answered by `304 Not Modified` through `If-None-Match`.
+
+    The cached files are sent along with `Accept-Ranges: bytes`, so an interrupted download
+    can be resumed by the `Range` header, whose positions refer to the uncompressed file.
+
+    The data version is read before the rows, so a cached file may hold newer rows than its version,
+    but never older ones.
+
+    @param name: The name of the export, it prefixes the cached files.
+    @param model: The exported model, whose `DataVersion` keys the cached files.
+    @param request_data: The request of the export, see `ExportDeserializer.get_request_data`.
+    """
+
+    def __init__(self, name, model, request_data):
+        self.name = name
+        self.format = request_data['format']
+        self.version = DataVersion.objects.get_version(model)
+
+        digest = hashlib.sha256(
+            json.dumps([name, self.version, request_data], sort_keys=True, cls=DjangoJSONEncoder).encode()
+        ).hexdigest()
+
+        self.etag = f'"{digest}"'
+        self.directory = settings.EXPORT_CACHE_DIR
+        self.path = None
+
+        if self.directory:
+            self.path = os.path.join(self.directory, f'{name}-{self.version}-{digest}.{self.format}')
+
+    def get_response(self, request, filename, export):
+        """
+        Returns the response of the export, either `304 Not Modified`, the cached file,
+        or the streaming response of the `export`, which is cached while it's sent.
+
+        @param request: The export request.
+        @param filename: The name of the exported file, without its extension.
+        @param export: A callable that returns the streaming response of the export on a cache miss.
+        """
+        # 1. Answer the client that already holds the same version of the export
+        if self.is_not_modified(request):
+            response = HttpResponseNotModified()
+            response['ETag'] = self.etag
+
+            return response
+
+        # 2. Send the cached file (or its requested range), if any
+        response = self.get_cached_response(request, filename)
+
+        if response is None:
+            response = export()
+
+            if response.status_code != 200 or not response.streaming:
+                return response
+
+            # 3. Write the exported chunks into the cache while they're sent
+            if self.path:
+                response.streaming_content = self._store(response.streaming_content)
+
+        # 4. Add the version of the export to the response
+        response['ETag'] = self.etag
+
+        return response
+
+    def is_not_modified(self, request):
+        """
+        Returns `True` if the `If-None-Match` header of the `request` matches the version of the export.
+        The weak comparison is used, since the compressed responses carry a weak `ETag`.
+        """
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+        return '*' in etags or self.etag in [etag[2:] if etag.startswith('W/') else etag for etag in etags]
+
+    def get_cached_response(self, request, filename):
+        """
+        Returns the `FileResponse` of the cached file, or of the range requested by the `Range` header,
+        or `None` if the file is missing.
+        """
+        if not self.path:
+            return None
+
+        try:
+            file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        # The hits mark the file as recently used, the least recently used files are evicted first.
+        with suppress(FileNotFoundError):
+            os.utime(self.path)
+
+        size = os.fstat(file.fileno()).st_size
+        byte_range = self.get_range(request, size)
+        content_type = CONTENT_TYPES[self.format]
+
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+
+        elif byte_range[0] >= size:
+            file.close()
+
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+
+        else:
+            start, end = byte_range
+
+            response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Disposition'] = f"attachment; filename={filename}.{self.format}"
+
+        return response
+
+    def get_range(self, request, size):
+        """
+        Returns the (`start`, `end`) positions of the `Range` header of the `request`, both inclusive,
+        or `None` if the whole file is requested. The `start` is beyond the `size` if the range can't be satisfied.
+
+        Only a single range is supported, the other headers are ignored as the RFC 7233 allows,
+        as well as any range whose `If-Range` header doesn't match the version of the export.
+        """
+        match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+
+        if match is None or match.groups() == ('', ''):
+            return None
+
+        if request.META.get('HTTP_IF_RANGE', self.etag) != self.etag:
+            return None
+
+        first, last = match.groups()
+
+        if not first:
+            # The suffix range, i.e. the last bytes of the file.
+            suffix = int(last)
+
+            return (max(size - suffix, 0), size - 1) if suffix else (size, size)
+
+        start = int(first)
+
+        if last and int(last) < start:
+            return None
+
+        return start, min(int(last) if last else size - 1, size - 1)
+
+    def _store(self, chunks):
+        """
+        Yields the `chunks` while writing them into a temporary file, which replaces the cached file
+        once the export is complete. An export that's cut short (e.g. the client went away) isn't cached.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        file = tempfile.NamedTemporaryFile(dir=self.directory, prefix=f'.{self.name}-', delete=False)
+        stored = False
+
+        try:
+            with file:
+                for chunk in chunks:
+                    file.write(chunk)
+
+                    yield chunk
+
+            # The concurrent exports of the same key write the same content, the last one wins.
+            os.replace(file.name, self.path)
+            stored = True
+
+        finally:
+            if not stored:
+                with suppress(FileNotFoundError):
+                    os.remove(file.name)
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes the cached files of the export that are keyed by an older data version,
+        then the least recently used files of the cache until it fits within `EXPORT_CACHE_MAX_BYTES`.
+        """
+        prefix = f'{self.name}-'
+        files = []
+
+        for entry in os.scandir(self.directory):
+            version, _, _ = entry.name[len(prefix):].partition('-')
+
+            if entry.name.startswith(prefix) and version.isdigit() and int(version) < self.version:
+                with suppress(FileNotFoundError):
+                    os.remove(entry.path)
+
+            elif not entry.name.startswith('.'):
+                # The temporary files of the exports in progress aren't counted.
+                with suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        max_bytes = settings.EXPORT_CACHE_MAX_BYTES
+
+        if max_bytes is None:
+            return
+
+        size = sum(file_size for _, file_size, _ in files)
+
+        for _, file_size, path in sorted(files):
+            if size <= max_bytes:
+                break
+
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+            size -= file_size
@@ -0,0 +1,144 @@
+from django.db import connection
+from django.db.models import CharField, F, Func, TextField, Value
+from django.db.models.functions import Cast, NullIf
+from itertools import islice
+
+
+class DateText(Func):
+    """
+    Formats a date as `YYYY-MM-DD` within the database, the same text as `date.isoformat()`.
+    """
+    function = 'to_char'
+    output_field = CharField()
+
+    def __init__(self, expression, **extra):
+        super().__init__(expression, Value('YYYY-MM-DD'), **extra)
+
+
+class FloatText(Func):
+    """
+    Formats a float within the database as the text of `repr(value)`, i.e. the integral values
+    keep their `.0`, which PostgreSQL drops. The NaN and the infinite values aren't supported.
+
+    Both write the shortest digits that round-trip, but PostgreSQL switches to the exponent notation
+    from 1e15 while Python does from 1e16. A non-integral value of that range has exactly 17 digits,
+    16 of them before the point, so its point is moved back in place.
+    """
+    output_field = CharField()
+    template = (
+        "(CASE WHEN %(expressions)s = trunc(%(expressions)s) AND abs(%(expressions)s) < 1e16 "
+        "THEN %(expressions)s::bigint::text || '.0' "
+        r"ELSE regexp_replace(%(expressions)s::text, '^(-?\d)\.(\d{15})(\d)e\+15$', '\1\2.\3') END)"
+    )
+
+
+class Column:
+    """
+    A column of an export.
+
+    @param name: The key of the column in the JSON exports.
+    @param field: The field (or the annotation) of the queryset, or an expression.
+    @param header: The header of the column in the CSV exports, defaults to the `name`.
+    @param kind: The type of the column, the text exports format the dates and the floats within the database,
+        and the columnar exports store each kind with its own type.
+    """
+    TEXT = 'text'
+    INTEGER = 'integer'
+    FLOAT = 'float'
+    DATE = 'date'
+
+    def __init__(self, name, field, header=None, kind=TEXT):
+        self.name = name
+        self.field = field
+        self.header = header or name
+        self.kind = kind
+
+    def expression(self):
+        return F(self.field) if isinstance(self.field, str) else self.field
+
+    def text_expression(self):
+        """
+        Returns the expression that selects the column as it's written by the text (CSV and JSON) exports.
+        """
+        if self.kind == self.DATE:
+            return DateText(self.expression())
+
+        return self.expression()
+
+    def copy_expression(self):
+        """
+        Returns the expression that selects the column as the text that Python's `csv` module writes,
+        for the CSV exports that are written by PostgreSQL.
+        """
+        if self.kind == self.DATE:
+            return DateText(self.expression())
+
+        if self.kind == self.FLOAT:
+            return FloatText(self.expression())
+
+        # PostgreSQL quotes an empty string to tell it from NULL, while Python writes both as an empty field.
+        return NullIf(Cast(self.expression(), TextField()), Value(''), output_field=TextField())
+
+
+THERAPIST_EXPORT_COLUMNS = (
+    Column('therapist_id', 'id', header='id'),
+    Column('organization_id', 'organization_id', kind=Column.INTEGER),
+    Column('organization_date_joined', 'date_joined', header='date_joined', kind=Column.DATE),
+)
+
+# The interactions are exported from `annotate_organization_id().annotate_organization_date_joined()`.
+INTERACTION_EXPORT_COLUMNS = (
+    Column('therapist_id', 'therapist_id'),
+    Column('interaction_date', 'interaction_date', kind=Column.DATE),
+    Column('counter', 'counter', kind=Column.INTEGER),
+    Column('chat_count', 'chat_count', kind=Column.INTEGER),
+    Column('call_count', 'call_count', kind=Column.INTEGER),
+    Column('organization_id', 'organization_id', kind=Column.INTEGER),
+    Column('organization_date_joined', 'organization_date_joined', kind=Column.DATE),
+)
+
+
+def iter_chunks(queryset, expressions, chunk_size):
+    """
+    Yields the rows of the `queryset` as lists of up to `chunk_size` tuples of the `expressions`.
+    The rows are fetched through a server-side cursor, without creating any model instance.
+
+    @param queryset: The ordered queryset to export.
+    @param expressions: The expressions of the columns.
+    @param chunk_size: The number of rows that are fetched at once.
+    """
+    rows = queryset.values_list(*expressions).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def iter_text_chunks(queryset, columns, chunk_size):
+    """
+    Yields the rows of the `queryset` as lists of up to `chunk_size` tuples,
+    whose values are ready to be written by the text exports.
+    """
+    return iter_chunks(queryset, [column.text_expression() for column in columns], chunk_size)
+
+
+def copy_csv_sql(queryset, columns):
+    """
+    Returns the `COPY ... TO STDOUT` statement that writes the rows of the `queryset` as CSV
+    (without the header), the same way as the `CSVStream` does.
+
+    @param queryset: The ordered queryset to export.
+    @param columns: The `Column` objects of the export.
+    """
+    query = queryset.values_list(*[column.copy_expression() for column in columns]).query
+    sql, params = query.sql_with_params()
+
+    # COPY doesn't take any parameter, so they're bound by psycopg2 in place.
+    with connection.cursor() as cursor:
+        sql = cursor.mogrify(sql, params).decode()
+
+    return f'COPY ({sql}) TO STDOUT WITH (FORMAT csv)'
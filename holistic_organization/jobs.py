@@ -0,0 +1,304 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+
+from holistic_organization.locks import atomic_with_retry
+from holistic_organization.models import ExportJob, IdempotencyRecord, SyncJob
+from holistic_organization.serializers import (
+    InteractionDeserializer,
+    OrganizationDeserializer,
+    TherapistDeserializer,
+)
+
+
+class SyncJobRunner:
+    """
+    Runs the `SyncJob` objects through the same batch deserializers as the synchronization endpoints.
+    """
+
+    # Idempotency scopes whose payload fingerprints are made stale by each job type.
+    STALE_SCOPES = {
+        SyncJob.TYPE_ORGANIZATIONS: ('organizations:',),
+        SyncJob.TYPE_THERAPISTS: ('therapists:',),
+        SyncJob.TYPE_INTERACTIONS: ('interactions:', 'bulk_interactions:'),
+    }
+
+    # A pair of (deserializer class, context key of the job's `target_id`) of each job type.
+    DESERIALIZERS = {
+        SyncJob.TYPE_ORGANIZATIONS: (OrganizationDeserializer, None),
+        SyncJob.TYPE_THERAPISTS: (TherapistDeserializer, 'organization_id'),
+        SyncJob.TYPE_INTERACTIONS: (InteractionDeserializer, 'therapist_id'),
+    }
+
+    def claim(self):
+        """
+        Claims the oldest pending job, or a running job whose worker stopped sending heartbeats.
+        Returns `None` if there's no job to run.
+        """
+        stale_at = timezone.now() - timedelta(seconds=settings.SYNC_JOB_TIMEOUT)
+
+        with transaction.atomic():
+            job = SyncJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status=SyncJob.STATUS_PENDING) |  # noqa: W504
+                Q(status=SyncJob.STATUS_RUNNING, heartbeat_at__lt=stale_at)
+            ).order_by('id').first()
+
+            if job is None:
+                return None
+
+            job.status = SyncJob.STATUS_RUNNING
+            job.started_at = job.started_at or timezone.now()
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+        return job
+
+    def run(self, job):
+        """
+        Processes the remaining chunks of the `job` in order.
+
+        Each chunk is saved, removed, and recorded into the job's progress within the same transaction,
+        so a job that's claimed again resumes from its first unprocessed chunk.
+        """
+        try:
+            for chunk_id in job.chunks.order_by('index').values_list('id', flat=True):
+                self._run_chunk(job.id, chunk_id)
+
+        except Exception as e:
+            SyncJob.objects.filter(id=job.id).update(
+                status=SyncJob.STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now()
+            )
+
+            raise
+
+        SyncJob.objects.filter(id=job.id).update(
+            status=SyncJob.STATUS_COMPLETED,
+            finished_at=timezone.now()
+        )
+
+    def _run_chunk(self, job_id, chunk_id):
+        """
+        Processes the chunk within its own transaction, which is retried as a whole when it collides
+        with a concurrent synchronization, so a retry doesn't hold the locks of the failed attempt.
+        The chunk is recorded as failed if its items can't be saved.
+        """
+        try:
+            atomic_with_retry(lambda: self._process_chunk(job_id, chunk_id))
+        except DatabaseError:
+            atomic_with_retry(lambda: self._process_chunk(job_id, chunk_id, save=False))
+
+    def _process_chunk(self, job_id, chunk_id, save=True):
+        """
+        Saves the items of the chunk along with the job's progress, then removes the chunk.
+        It runs within the transaction of `_run_chunk`, and locks the job row on each attempt.
+
+        @param save: `False` records the chunk as failed without saving its items.
+        """
+        job = SyncJob.objects.select_for_update().get(id=job_id)
+        chunk = job.chunks.filter(id=chunk_id).first()
+
+        if chunk is None:
+            # It's already processed by another worker.
+            return
+
+        deserializer_class, context_key = self.DESERIALIZERS[job.sync_type]
+        context = {context_key: job.target_id} if context_key else {}
+
+        chunk_range = {
+            'start': job.processed_items,
+            'end': job.processed_items + len(chunk.items) - 1
+        }
+
+        deserializer = deserializer_class(data=chunk.items, many=True, context=context)
+        errors = None
+
+        if not save:
+            errors = {'non_field_errors': ['Unable to save the items.']}
+        elif not deserializer.is_valid():
+            errors = deserializer.errors
+        else:
+            deserializer.save()
+
+        if errors:
+            job.failed_chunks.append({**chunk_range, 'errors': errors})
+        else:
+            job.committed_chunks.append(chunk_range)
+            job.rows_created += deserializer.instance['rows_created']
+            job.rows_updated += deserializer.instance.get('rows_updated', 0)
+            job.rows_unchanged += deserializer.instance.get('rows_unchanged', 0)
+
+            self._invalidate_fingerprints(job)
+
+        job.processed_items += len(chunk.items)
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=[
+            'processed_items', 'rows_created', 'rows_updated', 'rows_unchanged',
+            'committed_chunks', 'failed_chunks', 'heartbeat_at'
+        ])
+
+        chunk.delete()
+
+    def _invalidate_fingerprints(self, job):
+        """
+        Discards the payload fingerprints that no longer describe the latest synchronized data,
+        except the one of the `job` itself, so an identical retry is still answered by the same job.
+        """
+        query = Q()
+
+        for prefix in self.STALE_SCOPES[job.sync_type]:
+            query |= Q(scope__startswith=prefix)
+
+        IdempotencyRecord.objects.filter(query, key__startswith='sha256:').exclude(
+            status_code=status.HTTP_202_ACCEPTED, response__id=job.id
+        ).delete()
+
+
+class ExportJobRunner:
+    """
+    Runs the `ExportJob` objects through the same export views as the export endpoints,
+    and writes their output into a file within `EXPORT_JOB_DIR`.
+    """
+
+    # The export view of each job type, they're imported lazily since they belong to different apps.
+    EXPORT_VIEWS = {
+        ExportJob.TYPE_THERAPISTS: 'holistic_organization.views.TherapistExportView',
+        ExportJob.TYPE_INTERACTIONS: 'holistic_organization.views.InteractionExportView',
+        ExportJob.TYPE_TOTAL_THERAPISTS: 'holistic_data_presentation.views.TotalTherapistExportView',
+        ExportJob.TYPE_RATES: 'holistic_data_presentation.views.RateExportView',
+    }
+
+    # Number of seconds between the heartbeats of a running job.
+    heartbeat_interval = 5
+
+    def claim(self):
+        """
+        Claims the oldest pending job, or a running job whose worker stopped sending heartbeats.
+        Returns `None` if there's no job to run.
+        """
+        stale_at = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+
+        with transaction.atomic():
+            job = ExportJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status=ExportJob.STATUS_PENDING) |  # noqa: W504
+                Q(status=ExportJob.STATUS_RUNNING, heartbeat_at__lt=stale_at)
+            ).order_by('id').first()
+
+            if job is None:
+                return None
+
+            job.status = ExportJob.STATUS_RUNNING
+            job.started_at = job.started_at or timezone.now()
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+        return job
+
+    def run(self, job):
+        """
+        Writes the export of the `job` into its file. A job that's claimed again starts over.
+        """
+        try:
+            file_name, file_size, continuation = self._export(job)
+
+        except Exception as e:
+            ExportJob.objects.filter(id=job.id).update(
+                status=ExportJob.STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now()
+            )
+
+            raise
+
+        ExportJob.objects.filter(id=job.id).update(
+            status=ExportJob.STATUS_COMPLETED,
+            file_name=file_name,
+            file_size=file_size,
+            continuation=continuation or '',
+            finished_at=timezone.now()
+        )
+
+    def purge(self):
+        """
+        Removes the jobs that finished more than `EXPORT_JOB_TTL` seconds ago, along with their files.
+        Returns the number of removed jobs.
+        """
+        expired_at = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TTL)
+        jobs = list(ExportJob.objects.filter(finished_at__lt=expired_at))
+
+        for job in jobs:
+            shutil.rmtree(job.get_directory(), ignore_errors=True)
+
+        ExportJob.objects.filter(id__in=[job.id for job in jobs]).delete()
+
+        return len(jobs)
+
+    @contextmanager
+    def _heartbeat(self, job):
+        """
+        Updates the `heartbeat_at` of the running `job` every `heartbeat_interval` seconds,
+        from its own thread and database connection, since the connection of the worker
+        is busy with the export (e.g. `COPY ... TO STDOUT`) until it's complete.
+        """
+        stopped = threading.Event()
+
+        def beat():
+            try:
+                while not stopped.wait(self.heartbeat_interval):
+                    ExportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now())
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def _export(self, job):
+        """
+        Writes the export into a temporary file, which is moved into the job's directory once it's complete,
+        then returns a tuple of (file name, file size, continuation token of the next page).
+        """
+        view = import_string(self.EXPORT_VIEWS[job.export_type])()
+
+        deserializer = view.export_deserializer_class(data=job.request_data)
+        deserializer.is_valid(raise_exception=True)
+
+        columns = deserializer.validated_data['columns']
+        queryset, continuation = view.get_export_queryset(deserializer)
+
+        response = view.export(view.export_filename, queryset, columns, job.format)
+        file_name = f'{view.export_filename}.{job.format}'
+
+        directory = job.get_directory()
+        os.makedirs(directory, exist_ok=True)
+
+        file = tempfile.NamedTemporaryFile(dir=directory, prefix='.', delete=False)
+
+        try:
+            with file, self._heartbeat(job):
+                for chunk in response.streaming_content:
+                    file.write(chunk)
+
+            os.replace(file.name, os.path.join(directory, file_name))
+
+        except BaseException:
+            os.remove(file.name)
+            raise
+
+        return file_name, os.path.getsize(os.path.join(directory, file_name)), continuation
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from psycopg2.extensions import TransactionRollbackError
+
+
+# Namespaces of the advisory locks, they keep the keys of different kinds apart.
+LOCK_ORGANIZATION = 1
+LOCK_THERAPIST = 2
+
+
+def advisory_xact_lock(namespace, keys):
+    """
+    Acquires the transaction-level advisory locks of the `keys`, they're released on commit or rollback.
+
+    The keys are locked in a sorted order, so the transactions that lock overlapping keys
+    wait for each other instead of deadlocking.
+
+    @param namespace: One of the `LOCK_*` namespaces.
+    @param keys: The keys to lock, e.g. the IDs of the therapists.
+    """
+    keys = sorted(set(str(key) for key in keys))
+
+    if not keys:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT pg_advisory_xact_lock(%s, hashtext(k))
+            FROM (SELECT unnest(%s::text[]) AS k ORDER BY 1) AS lock_keys
+        """, [namespace, keys])
+
+
+def is_transient_error(error):
+    """
+    Returns `True` if the database `error` is a serialization failure or a deadlock,
+    which succeed when the transaction is simply retried.
+    """
+    return isinstance(error, OperationalError) and isinstance(error.__cause__, TransactionRollbackError)
+
+
+def atomic_with_retry(func):
+    """
+    Calls the `func` within a transaction (or a savepoint), and retries it
+    up to `SYNC_MAX_RETRIES` times when it fails on a serialization failure or a deadlock.
+    Returns the result of the `func`.
+    """
+    attempt = 0
+
+    while True:
+        try:
+            with transaction.atomic():
+                return func()
+
+        except OperationalError as e:
+            if not is_transient_error(e) or attempt >= settings.SYNC_MAX_RETRIES:
+                raise
+
+            attempt += 1
+            time.sleep(settings.SYNC_RETRY_DELAY * attempt)
@@ -0,0 +1,185 @@
+import csv
+import io
+import json
+import time
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from holistic_data_presentation.exports import RATE_EXPORT_COLUMNS
+from holistic_data_presentation.models import Rate
+from holistic_organization.exports import INTERACTION_EXPORT_COLUMNS, copy_csv_sql
+from holistic_organization.models import Interaction, Organization, Therapist
+from holistic_organization.writers import (
+    ColumnarStream,
+    CopyCSVStream,
+    CSVStream,
+    JSONStream,
+    pyarrow,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the exports from model instances (row by row) with the exports from the tuples '
+        'of the column specs, and with the CSV exports written by COPY. The rows are created within a transaction, which is rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        items = options['items']
+
+        with transaction.atomic():
+            self._create_rows(items)
+
+            exports = (
+                (
+                    'interactions',
+                    Interaction.objects.annotate_organization_id().annotate_organization_date_joined().order_by('id'),
+                    INTERACTION_EXPORT_COLUMNS,
+                    self._interaction_row
+                ),
+                (
+                    'rates',
+                    Rate.objects.all().order_by('organization', 'type', 'period_type', 'start_date'),
+                    RATE_EXPORT_COLUMNS,
+                    self._rate_row
+                ),
+            )
+
+            for name, queryset, columns, to_row in exports:
+                elapsed = {}
+                sizes = {}
+
+                formats = [
+                    ('instances csv', lambda: self._instances_csv(queryset, columns, to_row)),
+                    ('tuples csv', lambda: CSVStream()._content(queryset, columns)),
+                    ('copy csv', lambda: CopyCSVStream()._content(copy_csv_sql(queryset, columns), columns)),
+                    ('instances json', lambda: self._instances_json(queryset, columns, to_row)),
+                    ('tuples json', lambda: JSONStream().export('export', queryset, columns).streaming_content),
+                ]
+
+                if pyarrow is not None:
+                    formats += [
+                        ('parquet', lambda: ColumnarStream()._content(queryset, columns, 'parquet')),
+                        ('arrow', lambda: ColumnarStream()._content(queryset, columns, 'arrow')),
+                    ]
+
+                for label, export in formats:
+                    elapsed[label], sizes[label] = min(self._time(export) for _ in range(options['repeat']))
+
+                self.stdout.write(f'{name}: {items} rows - ' + ', '.join(
+                    f'{label} {seconds:.2f}s ({items / seconds:.0f} rows/sec)'
+                    for label, seconds in elapsed.items()
+                ))
+                self.stdout.write(
+                    f'{name}: csv {elapsed["instances csv"] / elapsed["tuples csv"]:.1f}x, '
+                    f'copy csv {elapsed["instances csv"] / elapsed["copy csv"]:.1f}x, '
+                    f'json {elapsed["instances json"] / elapsed["tuples json"]:.1f}x'
+                )
+                self.stdout.write(f'{name}: sizes - ' + ', '.join(
+                    f'{label} {size / 1024 / 1024:.2f}MB' for label, size in sizes.items()
+                    if not label.startswith('instances')
+                ))
+
+            transaction.set_rollback(True)
+
+    def _time(self, export):
+        started_at = time.perf_counter()
+        size = 0
+
+        for chunk in export():
+            size += len(chunk)
+
+        return time.perf_counter() - started_at, size
+
+    def _create_rows(self, count):
+        start = date(2018, 1, 1)
+
+        organizations = Organization.objects.bulk_create(
+            [Organization(name=f'Benchmark {i}') for i in range(10)]
+        )
+        therapists = Therapist.objects.bulk_create([
+            Therapist(id=f'benchmark{i:023x}', organization=organizations[i % 10], date_joined=start)
+            for i in range(1000)
+        ])
+
+        Interaction.objects.bulk_create(
+            (
+                Interaction(
+                    therapist=therapists[i % 1000],
+                    interaction_date=start + timedelta(days=i // 1000 % 3650),
+                    counter=i // 3650000 + 1,
+                    chat_count=i % 7,
+                    call_count=i % 3
+                )
+                for i in range(count)
+            ),
+            batch_size=5000
+        )
+        Rate.objects.bulk_create(
+            (
+                Rate(
+                    organization=organizations[i % 10],
+                    type=Rate.TYPE_CHURN_RATE,
+                    period_type=Rate.TYPE_WEEKLY,
+                    start_date=start + timedelta(days=i // 10),
+                    end_date=start + timedelta(days=i // 10 + 6),
+                    value=i / 7
+                )
+                for i in range(count)
+            ),
+            batch_size=5000
+        )
+
+        # Refreshes the statistics, otherwise the planner still sees the tables as empty.
+        with connection.cursor() as cursor:
+            for model in (Organization, Therapist, Interaction, Rate):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def _interaction_row(self, instance):
+        org_date_joined = instance.organization_date_joined
+
+        return [
+            instance.therapist_id,
+            instance.interaction_date.isoformat(),
+            instance.counter,
+            instance.chat_count,
+            instance.call_count,
+            instance.organization_id,
+            org_date_joined.isoformat() if org_date_joined else None
+        ]
+
+    def _rate_row(self, instance):
+        return [
+            instance.organization_id,
+            instance.type,
+            instance.period_type,
+            instance.start_date.isoformat(),
+            instance.end_date.isoformat(),
+            instance.value
+        ]
+
+    def _instances_csv(self, queryset, columns, to_row):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow([column.header for column in columns])
+
+        for instance in queryset.iterator():
+            writer.writerow(to_row(instance))
+
+            yield buffer.getvalue()
+
+            buffer.seek(0)
+            buffer.truncate()
+
+    def _instances_json(self, queryset, columns, to_row):
+        names = [column.name for column in columns]
+
+        for instance in queryset.iterator():
+            yield json.dumps(dict(zip(names, to_row(instance))), ensure_ascii=False, separators=(',', ':'))
@@ -0,0 +1,101 @@
+import io
+import time
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from holistic_organization.parsers import MessagePackParser
+from holistic_organization.renderers import MessagePackRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the JSON and the MessagePack rendering and parsing '
+        'of the synchronization and list payloads. It doesn\'t touch the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        items = options['items']
+
+        payloads = (
+            ('interactions', self._interactions(items)),
+            ('total_therapists', self._total_therapists(items)),
+            ('rates', self._rates(items)),
+        )
+        formats = (
+            ('json', JSONRenderer(), JSONParser()),
+            ('msgpack', MessagePackRenderer(), MessagePackParser()),
+        )
+
+        for name, data in payloads:
+            results = []
+
+            for format, renderer, parser in formats:
+                content = renderer.render(data)
+
+                render_time = min(self._time(renderer.render, data) for _ in range(options['repeat']))
+                parse_time = min(
+                    self._time(parser.parse, io.BytesIO(content))
+                    for _ in range(options['repeat'])
+                )
+
+                results.append(
+                    f'{format} {len(content) / 1024 / 1024:.1f}MB, '
+                    f'render {render_time:.2f}s, parse {parse_time:.2f}s'
+                )
+
+            self.stdout.write(f'{name}: {items} items - ' + ' | '.join(results))
+
+    def _time(self, func, *args):
+        started_at = time.perf_counter()
+        func(*args)
+
+        return time.perf_counter() - started_at
+
+    def _interactions(self, count):
+        start = date(2018, 1, 1)
+
+        return [
+            {
+                'interaction_date': start + timedelta(days=i % 3650),
+                'counter': i % 5 + 1,
+                'chat_count': i % 7,
+                'call_count': i % 3
+            }
+            for i in range(count)
+        ]
+
+    def _total_therapists(self, count):
+        start = date(2018, 1, 1)
+        weeks = [start + timedelta(weeks=i % 520) for i in range(count)]
+
+        return [
+            {
+                'organization': i % 50 or None,
+                'is_active': i % 2 == 0,
+                'period_type': 'weekly',
+                'start_date': week,
+                'end_date': week + timedelta(days=6),
+                'value': i % 100
+            }
+            for i, week in enumerate(weeks)
+        ]
+
+    def _rates(self, count):
+        return [
+            {
+                'organization': i % 50 or None,
+                'type': 'retention_rate',
+                'period_type': 'yearly',
+                'start_date': date(year, 1, 1),
+                'end_date': date(year, 12, 31),
+                'value': 0.5
+            }
+            for i, year in enumerate(2000 + i % 100 for i in range(count))
+        ]
@@ -0,0 +1,103 @@
+import time
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from holistic_data_presentation.serializers import (
+    RateDeserializer,
+    TotalTherapistDeserializer,
+)
+from holistic_organization.serializers import (
+    InteractionDeserializer,
+    TherapistDeserializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the DRF validation and the compiled validation (`SYNC_FAST_VALIDATION`) '
+        'of the synchronization payloads. It doesn\'t touch the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        items = options['items']
+
+        payloads = (
+            ('interactions', InteractionDeserializer, {'therapist_id': 'a' * 32}, self._interactions(items)),
+            ('therapists', TherapistDeserializer, {'organization_id': 1}, self._therapists(items)),
+            ('total_therapists', TotalTherapistDeserializer, {}, self._total_therapists(items)),
+            ('rates', RateDeserializer, {}, self._rates(items)),
+        )
+
+        for name, deserializer_class, context, data in payloads:
+            elapsed = {}
+
+            for fast in (False, True):
+                elapsed[fast] = min(
+                    self._validate(deserializer_class, context, data, fast)
+                    for _ in range(options['repeat'])
+                )
+
+            self.stdout.write(
+                f'{name}: {items} items - DRF {elapsed[False]:.2f}s ({items / elapsed[False]:.0f} items/sec), '
+                f'compiled {elapsed[True]:.2f}s ({items / elapsed[True]:.0f} items/sec), '
+                f'{elapsed[False] / elapsed[True]:.1f}x'
+            )
+
+    def _validate(self, deserializer_class, context, data, fast):
+        with override_settings(SYNC_FAST_VALIDATION=fast):
+            started_at = time.perf_counter()
+
+            deserializer = deserializer_class(data=data, many=True, context=context)
+            deserializer.is_valid(raise_exception=True)
+
+            return time.perf_counter() - started_at
+
+    def _dates(self, count):
+        start = date(2018, 1, 1)
+
+        return [(start + timedelta(days=i % 3650)).isoformat() for i in range(count)]
+
+    def _interactions(self, count):
+        return [
+            {'interaction_date': day, 'counter': i % 5 + 1, 'chat_count': i % 7, 'call_count': i % 3}
+            for i, day in enumerate(self._dates(count))
+        ]
+
+    def _therapists(self, count):
+        return [
+            {'therapist_id': f'{i:032x}', 'date_joined': day}
+            for i, day in enumerate(self._dates(count))
+        ]
+
+    def _total_therapists(self, count):
+        start = date(2018, 1, 1)
+        weeks = [start + timedelta(weeks=i % 520) for i in range(count)]
+
+        return [
+            {
+                'period_type': 'weekly',
+                'start_date': week.isoformat(),
+                'end_date': (week + timedelta(days=6)).isoformat(),
+                'is_active': i % 2 == 0,
+                'value': i % 100
+            }
+            for i, week in enumerate(weeks)
+        ]
+
+    def _rates(self, count):
+        return [
+            {
+                'type': 'retention_rate',
+                'period_type': 'yearly',
+                'start_date': f'{year}-01-01',
+                'end_date': f'{year}-12-31',
+                'value': 0.5
+            }
+            for year in (2000 + i % 100 for i in range(count))
+        ]
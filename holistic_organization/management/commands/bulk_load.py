@@ -0,0 +1,299 @@
+import csv
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from holistic_organization.models import (
+    IdempotencyRecord,
+    Interaction,
+    Organization,
+    Therapist,
+)
+
+
+class ProgressReader:
+    """
+    A file-like wrapper that reports how many rows went through its `read` method.
+    """
+
+    def __init__(self, file, callback, interval=2):
+        self.file = file
+        self.callback = callback
+        self.interval = interval
+
+        self.rows = 0
+        self.started_at = time.monotonic()
+        self.reported_at = self.started_at
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.rows += data.count('\n' if isinstance(data, str) else b'\n')
+
+        now = time.monotonic()
+
+        if now - self.reported_at >= self.interval:
+            self.reported_at = now
+            self.callback(self.rows, now - self.started_at)
+
+        return data
+
+
+class NDJSONReader:
+    """
+    A file-like wrapper that converts NDJSON lines into CSV rows for `COPY FROM STDIN`.
+    """
+
+    def __init__(self, file, keys):
+        self.file = file
+        self.keys = keys
+
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def read(self, size=-1):
+        while size < 0 or self.buffer.tell() < size:
+            line = self.file.readline()
+
+            if not line:
+                break
+
+            if not line.strip():
+                continue
+
+            item = json.loads(line)
+            self.writer.writerow([item.get(key) for key in self.keys])
+
+        data = self.buffer.getvalue()
+
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+        return data
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads therapists or interactions from CSV/NDJSON files in the export format '
+        'through COPY FROM STDIN, then merges them with set-based SQL.'
+    )
+
+    TARGET_THERAPISTS = 'therapists'
+    TARGET_INTERACTIONS = 'interactions'
+
+    FORMAT_CSV = 'csv'
+    FORMAT_NDJSON = 'ndjson'
+
+    # Staging columns of each target, they follow the column order of the CSV exports.
+    # The `row_number` column keeps the file order, so the last row of a duplicated key wins.
+    STAGING_COLUMNS = {
+        TARGET_THERAPISTS: (
+            ('therapist_id', 'varchar(32)'),
+            ('organization_id', 'bigint'),
+            ('date_joined', 'date'),
+        ),
+        TARGET_INTERACTIONS: (
+            ('therapist_id', 'varchar(32)'),
+            ('interaction_date', 'date'),
+            ('counter', 'integer'),
+            ('chat_count', 'integer'),
+            ('call_count', 'integer'),
+            ('organization_id', 'bigint'),
+            ('organization_date_joined', 'date'),
+        ),
+    }
+
+    # Keys of each staging column within the JSON exports.
+    NDJSON_KEYS = {
+        TARGET_THERAPISTS: ('therapist_id', 'organization_id', 'organization_date_joined'),
+        TARGET_INTERACTIONS: (
+            'therapist_id', 'interaction_date', 'counter', 'chat_count',
+            'call_count', 'organization_id', 'organization_date_joined',
+        ),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target',
+            choices=[self.TARGET_THERAPISTS, self.TARGET_INTERACTIONS]
+        )
+        parser.add_argument('paths', nargs='+')
+        parser.add_argument(
+            '--format',
+            choices=[self.FORMAT_CSV, self.FORMAT_NDJSON],
+            default=self.FORMAT_CSV
+        )
+
+    def handle(self, *args, **options):
+        target = options['target']
+        staging_table = f'bulk_load_{target}'
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_staging_table(cursor, staging_table, target)
+
+            for path in options['paths']:
+                self._copy(cursor, staging_table, target, path, options['format'])
+
+            cursor.execute(f'ANALYZE {staging_table}')
+
+            started_at = time.monotonic()
+
+            if target == self.TARGET_THERAPISTS:
+                rows_created, rows_updated, rows_unchanged = self._merge_therapists(cursor, staging_table)
+            else:
+                rows_created, rows_updated, rows_unchanged = self._merge_interactions(cursor, staging_table)
+
+            self._report(
+                'Merged', rows_created + rows_updated + rows_unchanged, time.monotonic() - started_at,
+                f'{rows_created} created, {rows_updated} updated, {rows_unchanged} unchanged'
+            )
+
+            self._invalidate_fingerprints(target)
+
+    def _create_staging_table(self, cursor, staging_table, target):
+        """
+        Creates the staging table of the `target`.
+        Temporary tables are never WAL-logged, and it's dropped once the load is committed.
+        """
+        columns = ', '.join(
+            f'{name} {type}' for name, type in self.STAGING_COLUMNS[target]
+        )
+
+        cursor.execute(f'DROP TABLE IF EXISTS {staging_table}')
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {staging_table} (row_number bigserial, {columns}) ON COMMIT DROP'
+        )
+
+    def _copy(self, cursor, staging_table, target, path, format):
+        """
+        Streams the file in `path` into the staging table through `COPY FROM STDIN`.
+        """
+        columns = ', '.join(name for name, _ in self.STAGING_COLUMNS[target])
+        sql = f'COPY {staging_table} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER {{header}})'
+
+        def report(rows, elapsed):
+            self._report('Copying', rows, elapsed, path)
+
+        started_at = time.monotonic()
+
+        try:
+            if format == self.FORMAT_CSV:
+                with open(path, 'rb') as file:
+                    cursor.copy_expert(sql.format(header='true'), ProgressReader(file, report))
+            else:
+                with open(path, 'r') as file:
+                    reader = NDJSONReader(file, self.NDJSON_KEYS[target])
+                    cursor.copy_expert(sql.format(header='false'), ProgressReader(reader, report))
+
+        except OSError as e:
+            raise CommandError(f'Unable to read {path}: {e}')
+
+        self._report('Copied', cursor.rowcount, time.monotonic() - started_at, path)
+
+    def _merge_therapists(self, cursor, staging_table):
+        """
+        Upserts the staged therapists, and creates their organizations
+        the same way as the Organization synchronization does.
+        """
+        qn = connection.ops.quote_name
+
+        cursor.execute(f"""
+            INSERT INTO {qn(Organization._meta.db_table)} (id, name)
+            SELECT DISTINCT organization_id, 'Organization ' || organization_id
+            FROM {staging_table}
+            WHERE organization_id IS NOT NULL
+            ON CONFLICT (id) DO NOTHING
+        """)
+
+        table = qn(Therapist._meta.db_table)
+
+        return self._execute_upsert(cursor, f"""
+            SELECT DISTINCT ON (therapist_id) therapist_id, organization_id, date_joined
+            FROM {staging_table}
+            ORDER BY therapist_id, row_number DESC
+        """, f"""
+            INSERT INTO {table} (id, organization_id, date_joined)
+            SELECT * FROM source
+            ON CONFLICT (id) DO UPDATE SET
+                organization_id = EXCLUDED.organization_id,
+                date_joined = EXCLUDED.date_joined
+            WHERE ({table}.organization_id, {table}.date_joined)
+                IS DISTINCT FROM (EXCLUDED.organization_id, EXCLUDED.date_joined)
+        """)
+
+    def _merge_interactions(self, cursor, staging_table):
+        """
+        Upserts the staged interactions.
+
+        Unknown therapists are created without any organization and `date_joined`,
+        the same way as the `InteractionBatchDeserializer` does.
+        """
+        qn = connection.ops.quote_name
+
+        cursor.execute(f"""
+            INSERT INTO {qn(Therapist._meta.db_table)} (id)
+            SELECT DISTINCT therapist_id
+            FROM {staging_table}
+            ON CONFLICT (id) DO NOTHING
+        """)
+
+        if cursor.rowcount:
+            self.stdout.write(f'Created {cursor.rowcount} unknown therapists.')
+
+        table = qn(Interaction._meta.db_table)
+
+        return self._execute_upsert(cursor, f"""
+            SELECT DISTINCT ON (therapist_id, interaction_date, counter)
+                therapist_id, interaction_date, counter, chat_count, call_count
+            FROM {staging_table}
+            ORDER BY therapist_id, interaction_date, counter, row_number DESC
+        """, f"""
+            INSERT INTO {table} (therapist_id, interaction_date, counter, chat_count, call_count)
+            SELECT * FROM source
+            ON CONFLICT (therapist_id, interaction_date, counter) DO UPDATE SET
+                chat_count = EXCLUDED.chat_count,
+                call_count = EXCLUDED.call_count
+            WHERE ({table}.chat_count, {table}.call_count)
+                IS DISTINCT FROM (EXCLUDED.chat_count, EXCLUDED.call_count)
+        """)
+
+    def _invalidate_fingerprints(self, target):
+        """
+        Discards the payload fingerprints of the synchronization endpoints of the `target`,
+        so their next request is applied on top of the loaded data.
+        """
+        stale = Q(scope__startswith=f'{target}:')
+
+        if target == self.TARGET_INTERACTIONS:
+            stale |= Q(scope__startswith='bulk_interactions:')
+
+        IdempotencyRecord.objects.filter(stale, key__startswith='sha256:').delete()
+
+    def _execute_upsert(self, cursor, source_sql, upsert_sql):
+        """
+        Executes the `INSERT ... ON CONFLICT` statement over the rows of `source_sql`,
+        and returns a tuple of (`rows_created`, `rows_updated`, `rows_unchanged`)
+        without fetching each affected row.
+
+        @param source_sql: A query of the rows to be upserted, it's named `source` within the `upsert_sql`.
+        @param upsert_sql: The `INSERT ... ON CONFLICT` statement, it must skip the unchanged rows.
+        """
+        cursor.execute(f"""
+            WITH source AS ({source_sql}),
+            upserted AS ({upsert_sql} RETURNING (xmax = 0) AS inserted)
+            SELECT
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted),
+                (SELECT count(*) FROM source) - count(*)
+            FROM upserted
+        """)
+
+        return cursor.fetchone()
+
+    def _report(self, action, rows, elapsed, detail):
+        rate = rows / elapsed if elapsed > 0 else 0
+
+        self.stdout.write(f'{action} {rows} rows in {elapsed:.1f}s ({rate:.0f} rows/sec) - {detail}')
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from holistic_organization.jobs import ExportJobRunner
+
+
+class Command(BaseCommand):
+    help = 'Runs the pending export jobs that are queued by the `?async=true` export requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exits once there is no pending job, instead of polling for new ones.'
+        )
+
+    def handle(self, *args, **options):
+        runner = ExportJobRunner()
+
+        while True:
+            job = runner.claim()
+
+            if job is None:
+                purged = runner.purge()
+
+                if purged:
+                    self.stdout.write(f'Removed {purged} expired export jobs.')
+
+                if options['once']:
+                    return
+
+                time.sleep(settings.EXPORT_JOB_POLL_INTERVAL)
+                continue
+
+            self.stdout.write(f'Running {job.export_type} export job {job.id}.')
+            started_at = time.monotonic()
+
+            try:
+                runner.run(job)
+            except Exception as e:
+                self.stderr.write(f'Export job {job.id} failed: {e}')
+                continue
+
+            job.refresh_from_db()
+            elapsed = time.monotonic() - started_at
+
+            self.stdout.write(
+                f'Completed export job {job.id} in {elapsed:.1f}s - '
+                f'{job.file_size / 1024 / 1024:.2f}MB written to {job.get_file_path()}.'
+            )
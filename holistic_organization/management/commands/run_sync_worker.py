@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from holistic_organization.jobs import SyncJobRunner
+
+
+class Command(BaseCommand):
+    help = 'Runs the pending synchronization jobs that are queued by the `?async=true` synchronization requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exits once there is no pending job, instead of polling for new ones.'
+        )
+
+    def handle(self, *args, **options):
+        runner = SyncJobRunner()
+
+        while True:
+            job = runner.claim()
+
+            if job is None:
+                if options['once']:
+                    return
+
+                time.sleep(settings.SYNC_JOB_POLL_INTERVAL)
+                continue
+
+            self.stdout.write(f'Running {job.sync_type} synchronization job {job.id}.')
+            started_at = time.monotonic()
+
+            try:
+                runner.run(job)
+            except Exception as e:
+                self.stderr.write(f'Synchronization job {job.id} failed: {e}')
+                continue
+
+            job.refresh_from_db()
+            elapsed = time.monotonic() - started_at
+
+            self.stdout.write(
+                f'Completed synchronization job {job.id} in {elapsed:.1f}s - '
+                f'{job.rows_created} created, {job.rows_updated} updated, {job.rows_unchanged} unchanged, '
+                f'{len(job.failed_chunks)} failed chunks.'
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-17 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holistic_organization', '0003_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncjob',
+            name='rows_unchanged',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.16 on 2026-10-17 23:12
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The indexes are built without locking the tables against writes, which can't run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('holistic_organization', '0004_syncjob_rows_unchanged'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='interaction',
+            index=models.Index(fields=['interaction_date'], name='interaction_date_idx'),
+        ),
+    ]
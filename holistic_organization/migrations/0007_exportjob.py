@@ -0,0 +1,40 @@
+# Generated by Django 3.2.16 on 2026-10-17 23:22
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holistic_organization', '0006_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_type', models.CharField(choices=[('therapists', 'Therapists'), ('interactions', 'Interactions'), ('total_therapists', 'Total Therapists'), ('rates', 'Rates')], max_length=16)),
+                ('request_data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('format', models.CharField(max_length=16)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('file_name', models.CharField(blank=True, default='', max_length=64)),
+                ('file_size', models.PositiveBigIntegerField(null=True)),
+                ('continuation', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('heartbeat_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['status', 'id'], name='holistic_or_status_dddfc4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['finished_at'], name='holistic_or_finishe_2a9186_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-17 23:35
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holistic_organization', '0007_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncjobchunk',
+            name='items',
+            field=models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
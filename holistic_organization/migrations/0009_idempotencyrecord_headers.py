@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-17 23:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holistic_organization', '0008_syncjobchunk_items_encoder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencyrecord',
+            name='headers',
+            field=models.JSONField(default=dict),
+        ),
+    ]
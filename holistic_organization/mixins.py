@@ -0,0 +1,534 @@
+import hashlib
+import tempfile
+
+from collections.abc import Iterator
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.template.response import SimpleTemplateResponse
+from django.urls import reverse
+from django.utils import timezone
+from itertools import islice
+from rest_framework import status
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.response import Response
+
+from holistic_organization.compression import compress_response
+from holistic_organization.locks import atomic_with_retry
+from holistic_organization.models import ExportJob, IdempotencyRecord, SyncJob, SyncJobChunk
+from holistic_organization.parsers import (
+    JSONArrayStreamParser,
+    MessagePackArrayStreamParser,
+    decode_content,
+)
+from holistic_organization.serializers import ExportJobSerializer, SyncJobSerializer
+from holistic_organization.writers import ColumnarStream, CSVStream, JSONStream
+
+
+class CompressedResponseMixin:
+    """
+    A mixin for the views whose responses are compressed by the `Accept-Encoding` of the request,
+    e.g. the export and the list views. The streaming responses are compressed incrementally.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            # The DRF responses are rendered afterwards.
+            response.add_post_render_callback(lambda rendered: compress_response(request, rendered))
+        else:
+            compress_response(request, response)
+
+        return response
+
+
+class ExportJobMixin:
+    """
+    A mixin for the export views that can run in the background by the `?async=true` query parameter.
+    The export is queued as an `ExportJob`, whose file is written by the `run_export_worker` command,
+    so the database is no longer busy while the client downloads the export.
+
+    The views provide the `export_deserializer_class` and the `export_filename`,
+    along with the `get_export_queryset` method that is used by the worker as well.
+    """
+    # The `ExportJob.export_type` of the view.
+    export_job_type = None
+
+    export_deserializer_class = None
+    export_filename = None
+
+    # The writer of the CSV format, i.e. `CSVStream`, or `CopyCSVStream` for the exports without any
+    # computed column, which are written by PostgreSQL itself.
+    csv_stream_class = CSVStream
+
+    def post(self, request, *args, **kwargs):
+        deserializer = self.export_deserializer_class(data=request.data)
+        deserializer.is_valid(raise_exception=True)
+
+        if self.is_async_requested():
+            return self.enqueue_export(deserializer)
+
+        format = deserializer.validated_data['format']
+        columns = deserializer.validated_data['columns']
+
+        queryset, continuation = self.get_export_queryset(deserializer)
+
+        response = self.get_export_response(
+            request,
+            deserializer,
+            lambda: self.export(self.export_filename, queryset, columns, format)
+        )
+
+        if continuation:
+            response['Export-Continuation'] = continuation
+
+        return response
+
+    def is_async_requested(self):
+        """
+        Returns `True` if the client asked for an asynchronous export by `?async=true`.
+        """
+        return self.request.query_params.get('async', '').lower() in ('1', 'true')
+
+    def enqueue_export(self, deserializer):
+        """
+        Persists the validated export request as a pending `ExportJob`,
+        then returns the `202 Accepted` response along with the job data.
+        """
+        job = ExportJob.objects.create(
+            export_type=self.export_job_type,
+            request_data=deserializer.get_request_data(),
+            format=deserializer.validated_data['format']
+        )
+
+        return Response(
+            ExportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('export-job', kwargs={'pk': job.id})}
+        )
+
+    def get_export_queryset(self, deserializer):
+        """
+        Returns a pair of (queryset, continuation token of the next page) of the export,
+        see `ExportDeserializer.paginate`.
+        """
+        raise NotImplementedError
+
+    def get_export_response(self, request, deserializer, export):
+        """
+        Returns the response of the synchronous export, the views may override it
+        to answer from a cache (see `ExportCache`).
+
+        @param request: The export request.
+        @param deserializer: The validated `ExportDeserializer` of the request.
+        @param export: A callable that returns the streaming response of the export.
+        """
+        return export()
+
+    def export(self, filename, queryset, columns, format):
+        """
+        Returns the streaming response of the export in the `format`.
+        """
+        if format in ('json', 'ndjson'):
+            json_stream = JSONStream()
+
+            return json_stream.export(
+                filename,
+                queryset,
+                columns,
+                lines=format == 'ndjson'
+            )
+
+        elif format == 'csv':
+            csv_stream = self.csv_stream_class()
+
+            return csv_stream.export(
+                filename,
+                queryset,
+                columns
+            )
+
+        elif format in ('parquet', 'arrow'):
+            columnar_stream = ColumnarStream()
+
+            return columnar_stream.export(
+                filename,
+                queryset,
+                columns,
+                format
+            )
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BatchSyncMixin:
+    """
+    A mixin for the views that upsert a JSON array of items in batch.
+
+    The items are read incrementally from the request stream, then validated and
+    upserted in chunks, so the memory usage stays flat regardless of the payload size.
+    Each chunk is committed separately, so a bad item only discards its own chunk
+    and the locks are held for one chunk at most.
+
+    A request that repeats the `Idempotency-Key` header, or the same payload as the latest one
+    applied to the same target, is answered from the stored response without touching the data.
+    """
+    parser_classes = [JSONArrayStreamParser, MessagePackArrayStreamParser]
+
+    # The name of the synchronized data, it scopes the idempotency records of the view.
+    sync_scope = None
+
+    # The `SyncJob.sync_type` of the view, it allows the view to run asynchronously.
+    sync_job_type = None
+
+    def create_batch_sync_response(self, request):
+        """
+        Returns the response of the batch synchronization request,
+        either replayed from the idempotency records, queued as a `SyncJob`, or processed immediately.
+        """
+        # Validates the query parameters before any replay.
+        is_async = self.is_async_requested()
+        chunk_size = self.get_chunk_size()
+
+        scope = self.get_sync_scope()
+        idempotency_key = request.headers.get('Idempotency-Key')
+        spool = None
+
+        try:
+            if idempotency_key:
+                key = f'key:{idempotency_key}'
+                items = None
+            else:
+                key, spool = self.fingerprint_request(request, is_async)
+                items = self.parse_spool(request, spool) if spool else None
+
+            record = self.get_idempotency_record(scope, key)
+
+            if record is not None:
+                return self.get_replayed_response(record)
+
+            result = None
+
+            if is_async:
+                job = self.enqueue_batch_sync(request, items, chunk_size)
+                response = Response(
+                    SyncJobSerializer(job).data,
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': reverse('sync-job', kwargs={'pk': job.id})}
+                )
+            else:
+                result = self.perform_batch_sync(request, items, chunk_size)
+                serializer = self.get_read_serializer(result)
+                response = Response(serializer.data, status=self.get_batch_sync_status(result))
+
+            self.record_batch_sync(scope, key, response, result)
+
+            return response
+
+        finally:
+            if spool is not None:
+                spool.close()
+
+    def get_sync_scope(self):
+        """
+        Returns the scope of the idempotency records, e.g. `therapists:1`.
+        """
+        return f'{self.sync_scope}:{self.kwargs.get("id", "")}'
+
+    def fingerprint_request(self, request, is_async=False):
+        """
+        Copies the body of the request into a spooled temporary file while hashing it,
+        then returns a pair of (content hash key, spooled file).
+        The spooled file keeps the memory usage bounded, the body is parsed from it afterwards.
+
+        The asynchronous requests have their own keys, since their responses are the queued jobs.
+        """
+        parser = self.get_stream_parser(request)
+
+        if parser is None:
+            return None, None
+
+        stream = request.stream
+
+        if stream is None:
+            return None, None
+
+        # The decompressed body is fingerprinted, so it doesn't depend on the compression level.
+        stream = decode_content(stream, request.META.get('HTTP_CONTENT_ENCODING'))
+
+        digest = hashlib.sha256()
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.SYNC_SPOOL_MAX_MEMORY_SIZE)
+
+        while True:
+            chunk = stream.read(parser.read_size)
+
+            if not chunk:
+                break
+
+            digest.update(chunk)
+            spool.write(chunk)
+
+        spool.seek(0)
+
+        key = f'sha256:{digest.hexdigest()}'
+
+        return f'{key}:async' if is_async else key, spool
+
+    def get_stream_parser(self, request):
+        """
+        Returns the streaming parser of the request content type, if any.
+        """
+        parser = request.negotiator.select_parser(request, request.parsers)
+
+        if not isinstance(parser, JSONArrayStreamParser):
+            return None
+
+        return parser
+
+    def parse_spool(self, request, spool):
+        """
+        Returns an iterator over the items of the array within the `spool` file.
+        """
+        encoding = request.encoding or settings.DEFAULT_CHARSET
+
+        return self.get_stream_parser(request).iter_items(spool, encoding)
+
+    def get_idempotency_record(self, scope, key):
+        """
+        Returns the unexpired `IdempotencyRecord` of the `scope` and `key`, if any.
+        """
+        if key is None:
+            return None
+
+        expired_at = timezone.now() - timedelta(seconds=settings.SYNC_IDEMPOTENCY_TTL)
+
+        return IdempotencyRecord.objects.filter(
+            scope=scope,
+            key=key,
+            created_at__gte=expired_at
+        ).first()
+
+    def get_replayed_response(self, record):
+        """
+        Returns the stored response of the `IdempotencyRecord`, along with its headers.
+        A queued job is answered by its current state rather than the stored one.
+        """
+        data = record.response
+
+        if record.status_code == status.HTTP_202_ACCEPTED:
+            job = SyncJob.objects.filter(id=data.get('id')).first()
+
+            if job is not None:
+                data = SyncJobSerializer(job).data
+
+        return Response(
+            data,
+            status=record.status_code,
+            headers={**record.headers, 'Idempotent-Replayed': 'true'}
+        )
+
+    def record_batch_sync(self, scope, key, response, result):
+        """
+        Stores the response of the request, so its repetition can be answered without touching the data.
+
+        A content hash only identifies the latest payload applied to the target,
+        so any applied request discards the content hash records it makes stale.
+        Only the fully applied (or queued) requests are stored, the failed ones can be retried.
+        """
+        if response.status_code not in (status.HTTP_200_OK, status.HTTP_202_ACCEPTED, status.HTTP_207_MULTI_STATUS):
+            return
+
+        with transaction.atomic():
+            self.get_stale_fingerprints(scope, result).filter(key__startswith='sha256:').delete()
+
+            IdempotencyRecord.objects.filter(
+                created_at__lt=timezone.now() - timedelta(seconds=settings.SYNC_IDEMPOTENCY_TTL)
+            ).delete()
+
+            if key is None or response.status_code == status.HTTP_207_MULTI_STATUS:
+                return
+
+            IdempotencyRecord.objects.update_or_create(
+                scope=scope,
+                key=key,
+                defaults={
+                    'status_code': response.status_code,
+                    'response': response.data,
+                    # The content type is negotiated by each request.
+                    'headers': {name: value for name, value in response.items() if name != 'Content-Type'},
+                    'created_at': timezone.now(),
+                }
+            )
+
+    def get_stale_fingerprints(self, scope, result):
+        """
+        Returns the `IdempotencyRecord` objects whose target is changed by the applied request.
+        """
+        return IdempotencyRecord.objects.filter(scope=scope)
+
+    def is_async_requested(self):
+        """
+        Returns `True` if the client asked for an asynchronous synchronization by `?async=true`.
+        """
+        if self.request.query_params.get('async', '').lower() not in ('1', 'true'):
+            return False
+
+        if self.sync_job_type is None:
+            raise ValidationError({'async': 'This endpoint doesn\'t support asynchronous synchronization.'})
+
+        return True
+
+    def enqueue_batch_sync(self, request, items=None, chunk_size=None):
+        """
+        Persists the items of the request in chunks as a pending `SyncJob`,
+        which will be run by the `run_sync_worker` command.
+        """
+        items = request.data if items is None else items
+
+        if not isinstance(items, Iterator):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+
+        with transaction.atomic():
+            job = SyncJob.objects.create(
+                sync_type=self.sync_job_type,
+                target_id=self.kwargs.get('id')
+            )
+
+            chunks = self.iter_chunks(items, chunk_size or self.get_chunk_size())
+
+            for index, chunk in enumerate(chunks):
+                SyncJobChunk.objects.create(job=job, index=index, items=chunk)
+                job.total_items += len(chunk)
+
+            job.save(update_fields=['total_items'])
+
+        return job
+
+    def perform_batch_sync(self, request, items=None, chunk_size=None):
+        """
+        Validates and saves the items of the request in chunks, then returns
+        the merged result of the committed chunks along with the committed and failed chunk ranges.
+        """
+        items = request.data if items is None else items
+
+        if not isinstance(items, Iterator):
+            # The request doesn't carry a JSON array stream (e.g. an empty body),
+            # let the deserializer report it.
+            deserializer = self.get_write_serializer(data=items, many=True)
+            deserializer.is_valid(raise_exception=True)
+            deserializer.save()
+
+            return deserializer.instance
+
+        chunks = self.iter_chunks(items, chunk_size or self.get_chunk_size())
+
+        results = []
+        committed_chunks = []
+        failed_chunks = []
+        offset = 0
+
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            except ParseError as e:
+                # The rest of the payload is unreadable.
+                failed_chunks.append({'start': offset, 'end': None, 'errors': [e.detail]})
+                break
+
+            chunk_range = {'start': offset, 'end': offset + len(chunk) - 1}
+            offset += len(chunk)
+
+            result, errors = self.save_chunk(chunk)
+
+            if errors:
+                failed_chunks.append({**chunk_range, 'errors': errors})
+                continue
+
+            results.append(result)
+            committed_chunks.append(chunk_range)
+
+        merged = self.merge_results(results)
+        merged['committed_chunks'] = committed_chunks
+        merged['failed_chunks'] = failed_chunks
+
+        return merged
+
+    def get_chunk_size(self):
+        """
+        Returns the number of items per chunk, it can be given by the `chunk_size` query parameter.
+        """
+        chunk_size = self.request.query_params.get('chunk_size')
+
+        if chunk_size is None:
+            return settings.SYNC_CHUNK_SIZE
+
+        try:
+            chunk_size = int(chunk_size)
+        except ValueError:
+            raise ValidationError({'chunk_size': 'A valid integer is required.'})
+
+        if not 1 <= chunk_size <= settings.SYNC_MAX_CHUNK_SIZE:
+            raise ValidationError({
+                'chunk_size': f'Ensure this value is between 1 and {settings.SYNC_MAX_CHUNK_SIZE}.'
+            })
+
+        return chunk_size
+
+    def iter_chunks(self, items, chunk_size):
+        """
+        Yields a list for every `chunk_size` items.
+        """
+        while True:
+            chunk = list(islice(items, chunk_size))
+
+            if not chunk:
+                return
+
+            yield chunk
+
+    def save_chunk(self, chunk):
+        """
+        Validates and saves the `chunk` within its own transaction,
+        then returns a pair of (`result`, `errors`).
+        The transaction is retried when it collides with a concurrent synchronization.
+        """
+        deserializer = self.get_write_serializer(data=chunk, many=True)
+
+        if not deserializer.is_valid():
+            return None, deserializer.errors
+
+        try:
+            atomic_with_retry(deserializer.save)
+        except DatabaseError:
+            return None, {'non_field_errors': ['Unable to save the items.']}
+
+        return deserializer.instance, None
+
+    def merge_results(self, results):
+        """
+        Returns the sum of the `rows_created`, `rows_updated`, and `rows_unchanged` of the chunk `results`.
+        """
+        merged = {'rows_created': 0}
+
+        for result in results:
+            for key in ('rows_created', 'rows_updated', 'rows_unchanged'):
+                if key in result:
+                    merged[key] = merged.get(key, 0) + result[key]
+
+        return merged
+
+    def get_batch_sync_status(self, result):
+        """
+        Returns `200` if every chunk is committed, `207` if some chunks failed,
+        or `400` if none of them are committed.
+        """
+        if not result.get('failed_chunks'):
+            return status.HTTP_200_OK
+
+        if result.get('committed_chunks'):
+            return status.HTTP_207_MULTI_STATUS
+
+        return status.HTTP_400_BAD_REQUEST
@@ -1,7 +1,131 @@
-from django.db import models
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models
 from django.db.models import F
 
 
+class UpsertQuerySet(models.QuerySet):
+
+    def upsert(self, objects, conflict_fields, update_fields, conflict_condition=None, batch_size=1000):
+        """
+        Inserts the `objects` in batch through a native PostgreSQL
+        `INSERT ... ON CONFLICT (conflict_fields) DO UPDATE` statement,
+        and returns a tuple of (`rows_created`, `rows_updated`, `rows_unchanged`).
+
+        Each batch costs a single round trip, the `RETURNING (xmax = 0)` clause
+        tells whether each affected row was inserted or updated.
+        The rows are sent in the order of their `conflict_fields`, so the concurrent upserts
+        lock their overlapping rows in the same order instead of deadlocking.
+        An existing row whose `update_fields` already hold the new values isn't rewritten,
+        so it doesn't produce a dead tuple nor WAL, and it's counted as `rows_unchanged`.
+
+        @param objects: A list of unsaved model instances, each natural key must appear once.
+            The auto primary key is inserted as well if every object has it.
+        @param conflict_fields: Field names of the unique index that identifies the natural key.
+        @param update_fields: Field names to be updated when the row already exists.
+            If it's empty, the conflicting rows are left untouched (`DO NOTHING`).
+        @param conflict_condition: An optional SQL predicate to infer a partial unique index.
+        @param batch_size: Number of rows sent per statement.
+        """
+        rows_created = 0
+        rows_updated = 0
+
+        for (inserted,) in self.upsert_returning(
+            objects,
+            conflict_fields,
+            update_fields,
+            conflict_condition=conflict_condition,
+            batch_size=batch_size
+        ):
+            if inserted:
+                rows_created += 1
+            else:
+                rows_updated += 1
+
+        return rows_created, rows_updated, len(objects) - rows_created - rows_updated
+
+    def upsert_returning(
+        self, objects, conflict_fields, update_fields,
+        returning_fields=(), conflict_condition=None, batch_size=1000
+    ):
+        """
+        Same as the `upsert` method, but yields a tuple of (`inserted`, *`returning_fields`)
+        for each affected row. The unchanged rows aren't yielded.
+
+        @param returning_fields: Field names whose values are returned along with each affected row.
+        """
+        if not objects:
+            return
+
+        opts = self.model._meta
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+
+        # The auto primary key is only sent when every object carries its own value.
+        include_pk = all(obj.pk is not None for obj in objects)
+        fields = [
+            field for field in opts.concrete_fields
+            if field is not opts.auto_field or include_pk
+        ]
+        conflict_columns = [opts.get_field(name).column for name in conflict_fields]
+        update_columns = [opts.get_field(name).column for name in update_fields]
+        returning_columns = [opts.get_field(name).column for name in returning_fields]
+
+        conflict_attnames = [opts.get_field(name).attname for name in conflict_fields]
+        objects = sorted(objects, key=lambda obj: tuple(
+            (value is None, value)
+            for value in (getattr(obj, attname) for attname in conflict_attnames)
+        ))
+
+        table = quote_name(opts.db_table)
+
+        insert_sql = 'INSERT INTO {table} ({columns}) VALUES '.format(
+            table=table,
+            columns=', '.join(quote_name(field.column) for field in fields)
+        )
+
+        conflict_sql = ' ON CONFLICT ({})'.format(
+            ', '.join(quote_name(column) for column in conflict_columns)
+        )
+
+        if conflict_condition:
+            conflict_sql += f' WHERE {conflict_condition}'
+
+        if update_columns:
+            conflict_sql += ' DO UPDATE SET ' + ', '.join(
+                f'{quote_name(column)} = EXCLUDED.{quote_name(column)}'
+                for column in update_columns
+            )
+            # Skips the rows that wouldn't change.
+            conflict_sql += ' WHERE ({}) IS DISTINCT FROM ({})'.format(
+                ', '.join(f'{table}.{quote_name(column)}' for column in update_columns),
+                ', '.join(f'EXCLUDED.{quote_name(column)}' for column in update_columns)
+            )
+        else:
+            conflict_sql += ' DO NOTHING'
+
+        conflict_sql += ' RETURNING ' + ', '.join(
+            ['(xmax = 0)'] + [quote_name(column) for column in returning_columns]
+        )
+
+        placeholder = '({})'.format(', '.join(['%s'] * len(fields)))
+
+        with connection.cursor() as cursor:
+            for start in range(0, len(objects), batch_size):
+                batch = objects[start:start + batch_size]
+                params = [
+                    field.get_db_prep_save(getattr(obj, field.attname), connection)
+                    for obj in batch for field in fields
+                ]
+
+                values_sql = ', '.join([placeholder] * len(batch))
+                cursor.execute(insert_sql + values_sql + conflict_sql, params)
+
+                yield from cursor.fetchall()
+
+
 class Organization(models.Model):
     name = models.CharField(
         max_length=128,
@@ -10,6 +134,8 @@ class Organization(models.Model):
         default=''
     )
 
+    objects = UpsertQuerySet.as_manager()
+
 
 class Therapist(models.Model):
     id = models.CharField(max_length=32, primary_key=True)
@@ -20,13 +146,15 @@ class Therapist(models.Model):
     )
     date_joined = models.DateField(null=True)
 
+    objects = UpsertQuerySet.as_manager()
+
     class Meta:
         unique_together = (
             ('id', 'organization'),
         )
 
 
-class InteractionQuerySet(models.QuerySet):
+class InteractionQuerySet(UpsertQuerySet):
 
     def annotate_organization_id(self):
         """
@@ -57,3 +185,208 @@ class Interaction(models.Model):
         unique_together = (
             ('therapist', 'interaction_date', 'counter'),
         )
+        indexes = [
+            # The exports filtered by date only, the `unique_together` index
+            # already serves the ones filtered by organization (through the therapists).
+            models.Index(fields=['interaction_date'], name='interaction_date_idx'),
+        ]
+
+
+class SyncJob(models.Model):
+    TYPE_ORGANIZATIONS = 'organizations'
+    TYPE_THERAPISTS = 'therapists'
+    TYPE_INTERACTIONS = 'interactions'
+    TYPE_CHOICES = (
+        (TYPE_ORGANIZATIONS, 'Organizations'),
+        (TYPE_THERAPISTS, 'Therapists'),
+        (TYPE_INTERACTIONS, 'Interactions'),
+    )
+    sync_type = models.CharField(
+        max_length=16,
+        choices=TYPE_CHOICES
+    )
+
+    # The organization ID of the therapists synchronization,
+    # or the therapist ID of the interactions synchronization.
+    target_id = models.CharField(max_length=32, null=True)
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+
+    total_items = models.PositiveIntegerField(default=0)
+    processed_items = models.PositiveIntegerField(default=0)
+    rows_created = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_unchanged = models.PositiveIntegerField(default=0)
+    committed_chunks = models.JSONField(default=list)
+    failed_chunks = models.JSONField(default=list)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    # Updated by the worker after every chunk,
+    # a running job without a recent heartbeat is claimed again by another worker.
+    heartbeat_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+
+class ExportJob(models.Model):
+    TYPE_THERAPISTS = 'therapists'
+    TYPE_INTERACTIONS = 'interactions'
+    TYPE_TOTAL_THERAPISTS = 'total_therapists'
+    TYPE_RATES = 'rates'
+    TYPE_CHOICES = (
+        (TYPE_THERAPISTS, 'Therapists'),
+        (TYPE_INTERACTIONS, 'Interactions'),
+        (TYPE_TOTAL_THERAPISTS, 'Total Therapists'),
+        (TYPE_RATES, 'Rates'),
+    )
+    export_type = models.CharField(
+        max_length=16,
+        choices=TYPE_CHOICES
+    )
+
+    # The validated body of the export request, it's validated again by the worker.
+    request_data = models.JSONField(encoder=DjangoJSONEncoder)
+    format = models.CharField(max_length=16)
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+
+    # The name of the exported file within the job's directory of `EXPORT_JOB_DIR`, and its size in bytes.
+    file_name = models.CharField(max_length=64, blank=True, default='')
+    file_size = models.PositiveBigIntegerField(null=True)
+
+    # The continuation token of the next page, when the export is requested by pages.
+    continuation = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    # Updated by the worker while it writes the file,
+    # a running job without a recent heartbeat is claimed again by another worker.
+    heartbeat_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['finished_at']),
+        ]
+
+    def get_directory(self):
+        """
+        Returns the directory of the job's file within `EXPORT_JOB_DIR`.
+        """
+        return os.path.join(settings.EXPORT_JOB_DIR, str(self.id))
+
+    def get_file_path(self):
+        return os.path.join(self.get_directory(), self.file_name)
+
+
+class SyncJobChunk(models.Model):
+    job = models.ForeignKey(
+        SyncJob,
+        on_delete=models.CASCADE,
+        related_name='chunks'
+    )
+    index = models.PositiveIntegerField()
+    items = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = (
+            ('job', 'index'),
+        )
+
+
+class IdempotencyRecord(models.Model):
+    # The synchronization endpoint and its target, e.g. `therapists:1`.
+    scope = models.CharField(max_length=64)
+
+    # Either the `Idempotency-Key` header of the request (`key:<value>`),
+    # or the content hash of the request body (`sha256:<hex digest>`, followed by `:async` for `?async=true`).
+    key = models.CharField(max_length=255)
+
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (
+            ('scope', 'key'),
+        )
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+
+class DataVersionQuerySet(models.QuerySet):
+
+    def get_version(self, model):
+        """
+        Returns the data version of the `model`'s table, `0` if it's never bumped.
+        """
+        version = self.filter(table_name=model._meta.db_table).values_list('version', flat=True).first()
+
+        return version or 0
+
+    def bump(self, model):
+        """
+        Increments the data version of the `model`'s table in a single statement.
+        It's called within the transaction that changes the rows, so the new version
+        is committed along with them, and the concurrent bumps of the same table wait for each other.
+        """
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (table_name, version) VALUES (%s, 1) '
+                f'ON CONFLICT (table_name) DO UPDATE SET version = {table}.version + 1',
+                [model._meta.db_table]
+            )
+
+
+class DataVersion(models.Model):
+    # The table whose rows are versioned, e.g. `holistic_data_presentation_rate`.
+    table_name = models.CharField(max_length=64, unique=True)
+
+    # Bumped by the batch upserts that change any row of the table,
+    # it keys the cached exports of the table (see `holistic_organization.export_cache`).
+    version = models.PositiveBigIntegerField(default=0)
+
+    objects = DataVersionQuerySet.as_manager()
@@ -0,0 +1,285 @@
+import codecs
+import json
+import msgpack
+import zlib
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from holistic_organization.renderers import decode_msgpack_ext
+
+
+class GzipReader:
+    """
+    A file-like wrapper that decompresses a gzip (or deflate) stream incrementally.
+    Each `read` call decompresses at most `size` bytes, so the expanded body is never buffered.
+    """
+
+    def __init__(self, stream, wbits=16 + zlib.MAX_WBITS, read_size=64 * 1024):
+        self.stream = stream
+        self.wbits = wbits
+        self.read_size = read_size
+        self.decompressor = zlib.decompressobj(wbits)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(self.read_size), b''))
+
+        while True:
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data or self.stream.read(self.read_size)
+
+                if not data:
+                    return b''
+
+                # The body carries another gzip member.
+                self.decompressor = zlib.decompressobj(self.wbits)
+
+            elif self.decompressor.unconsumed_tail:
+                data = self.decompressor.unconsumed_tail
+
+            else:
+                data = self.stream.read(self.read_size)
+
+                if not data:
+                    raise ParseError('Compressed body is truncated.')
+
+            try:
+                chunk = self.decompressor.decompress(data, size)
+            except zlib.error as e:
+                raise ParseError(f'Invalid compressed body - {e}')
+
+            if chunk:
+                return chunk
+
+
+class SizeLimitedReader:
+    """
+    A file-like wrapper that stops reading once `max_size` bytes went through,
+    it guards the decompressed streams against decompression bombs.
+    """
+
+    def __init__(self, stream, max_size):
+        self.stream = stream
+        self.max_size = max_size
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.size += len(data)
+
+        if self.size > self.max_size:
+            raise ParseError(f'Decompressed body exceeds {self.max_size} bytes.')
+
+        return data
+
+
+def decode_content(stream, content_encoding):
+    """
+    Returns a file-like object that reads the `stream` decompressed according to
+    the `Content-Encoding` header, e.g. `gzip` or `zstd`.
+    The decompressed size is bounded by `SYNC_MAX_DECOMPRESSED_SIZE`.
+    """
+    codings = [
+        coding.strip().lower()
+        for coding in (content_encoding or '').split(',')
+        if coding.strip().lower() not in ('', 'identity')
+    ]
+
+    if not codings or stream is None:
+        return stream
+
+    # The codings are listed in the order they were applied.
+    for coding in reversed(codings):
+        if coding in ('gzip', 'x-gzip'):
+            stream = GzipReader(stream)
+
+        elif coding == 'deflate':
+            stream = GzipReader(stream, wbits=zlib.MAX_WBITS)
+
+        elif coding == 'zstd' and zstandard is not None:
+            stream = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+
+        else:
+            raise UnsupportedMediaType(
+                content_encoding,
+                detail=f'Unsupported content encoding "{coding}" in request.'
+            )
+
+    return SizeLimitedReader(stream, settings.SYNC_MAX_DECOMPRESSED_SIZE)
+
+
+class JSONArrayStreamParser(BaseParser):
+    """
+    Parses a JSON array incrementally from the request stream.
+
+    Instead of loading the whole payload, it returns an iterator that yields
+    the items of the array one by one, so the memory usage doesn't depend on the payload size.
+    The request body isn't buffered, hence `DATA_UPLOAD_MAX_MEMORY_SIZE` doesn't apply.
+    A compressed request body (`Content-Encoding: gzip`) is decompressed while it's parsed.
+    """
+    media_type = 'application/json'
+
+    # Number of bytes read from the stream at once.
+    read_size = 64 * 1024
+
+    # Guards against a single item that never ends.
+    max_item_size = 1024 * 1024
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        request = parser_context.get('request')
+
+        if request is not None:
+            stream = decode_content(stream, request.META.get('HTTP_CONTENT_ENCODING'))
+
+        return self.iter_items(stream, encoding)
+
+    def iter_items(self, stream, encoding):
+        """
+        Yields the items of the JSON array within the `stream`.
+        """
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder(encoding)()
+
+        buffer = ''
+        position = 0
+        eof = False
+        need_more = False
+
+        # One of `start`, `first_item`, `item`, `separator`, or `end`.
+        state = 'start'
+
+        while True:
+            position = self._skip_whitespace(buffer, position)
+
+            if need_more or position >= len(buffer):
+                if eof:
+                    if state == 'end':
+                        return
+
+                    raise ParseError('JSON parse error - Unexpected end of data.')
+
+                chunk = stream.read(self.read_size)
+                eof = not chunk
+
+                try:
+                    buffer = buffer[position:] + text_decoder.decode(chunk or b'', final=eof)
+                except UnicodeDecodeError as e:
+                    raise ParseError(f'JSON parse error - {e}')
+
+                position = 0
+                need_more = False
+                continue
+
+            char = buffer[position]
+
+            if state == 'start':
+                if char != '[':
+                    raise ParseError('JSON parse error - Expected an array of items.')
+
+                position += 1
+                state = 'first_item'
+
+            elif state in ('first_item', 'item'):
+                if state == 'first_item' and char == ']':
+                    position += 1
+                    state = 'end'
+                    continue
+
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    if eof or len(buffer) - position > self.max_item_size:
+                        raise ParseError(f'JSON parse error - {e}')
+
+                    # The item isn't complete yet.
+                    need_more = True
+                    continue
+
+                if end == len(buffer) and not eof:
+                    # A scalar item (e.g. a number) might be cut at the end of the buffer.
+                    need_more = True
+                    continue
+
+                yield item
+
+                position = end
+                state = 'separator'
+
+            elif state == 'separator':
+                if char == ',':
+                    state = 'item'
+                elif char == ']':
+                    state = 'end'
+                else:
+                    raise ParseError('JSON parse error - Expected "," or "]" after an item.')
+
+                position += 1
+
+            else:
+                raise ParseError('JSON parse error - Extra data after the array.')
+
+    def _skip_whitespace(self, buffer, position):
+        while position < len(buffer) and buffer[position] in ' \t\n\r':
+            position += 1
+
+        return position
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses a MessagePack request body, e.g. the body of the export requests.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), ext_hook=decode_msgpack_ext, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ParseError(f'MessagePack parse error - {e}')
+
+
+class MessagePackArrayStreamParser(JSONArrayStreamParser):
+    """
+    Parses a MessagePack array incrementally from the request stream,
+    the same way as the `JSONArrayStreamParser` does.
+    """
+    media_type = 'application/msgpack'
+
+    def iter_items(self, stream, encoding):
+        """
+        Yields the items of the MessagePack array within the `stream`.
+        """
+        unpacker = msgpack.Unpacker(
+            stream,
+            read_size=self.read_size,
+            max_buffer_size=self.max_item_size,
+            ext_hook=decode_msgpack_ext,
+            raw=False
+        )
+
+        try:
+            count = unpacker.read_array_header()
+
+            for _ in range(count):
+                yield unpacker.unpack()
+
+        except msgpack.OutOfData:
+            raise ParseError('MessagePack parse error - Unexpected end of data.')
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ParseError(f'MessagePack parse error - {e}')
+
+        try:
+            unpacker.unpack()
+        except msgpack.OutOfData:
+            return
+
+        raise ParseError('MessagePack parse error - Extra data after the array.')
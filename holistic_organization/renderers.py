@@ -0,0 +1,65 @@
+import datetime
+import decimal
+import msgpack
+import struct
+import uuid
+
+from rest_framework.renderers import BaseRenderer
+
+
+# The MessagePack extension type of the dates,
+# its payload is the number of days since 1970-01-01 as a big-endian 32-bit integer.
+DATE_EXT_TYPE = 1
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def encode_msgpack(obj):
+    """
+    Encodes the objects that MessagePack doesn't support natively.
+    The dates take 6 bytes (`DATE_EXT_TYPE`) and the datetimes use the standard timestamp extension.
+    """
+    if isinstance(obj, datetime.datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=datetime.timezone.utc)
+
+        return msgpack.Timestamp.from_datetime(obj)
+
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(DATE_EXT_TYPE, struct.pack('>i', obj.toordinal() - EPOCH_ORDINAL))
+
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+
+    raise TypeError(f'Object of type {type(obj).__name__} is not MessagePack serializable.')
+
+
+def decode_msgpack_ext(code, data):
+    """
+    Decodes the extension types written by `encode_msgpack`.
+    """
+    if code == DATE_EXT_TYPE and len(data) == 4:
+        (days,) = struct.unpack('>i', data)
+
+        return datetime.date.fromordinal(days + EPOCH_ORDINAL)
+
+    return msgpack.ExtType(code, data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders the response data into MessagePack, it's selected by `Accept: application/msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encode_msgpack, use_bin_type=True)
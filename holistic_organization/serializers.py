@@ -1,11 +1,32 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
 from rest_framework import serializers
 
+from holistic_organization.exports import (
+    INTERACTION_EXPORT_COLUMNS,
+    THERAPIST_EXPORT_COLUMNS,
+)
 from holistic_organization.models import (
+    ExportJob,
     Organization,
+    SyncJob,
     Therapist,
     Interaction,
 )
+from holistic_organization.locks import (
+    LOCK_ORGANIZATION,
+    LOCK_THERAPIST,
+    advisory_xact_lock,
+)
+from holistic_organization.validators import FastBatchValidationMixin
+from holistic_organization.writers import pyarrow
 
 
 class OrganizationSerializer(serializers.ModelSerializer):
@@ -15,78 +36,297 @@ class OrganizationSerializer(serializers.ModelSerializer):
         read_only = fields
 
 
-class TherapistExportJSONSerializer(serializers.Serializer):
+class ExportDeserializer(serializers.Serializer):
+    TYPE_JSON = 'json'
+    TYPE_NDJSON = 'ndjson'
+    TYPE_CSV = 'csv'
+    TYPE_PARQUET = 'parquet'
+    TYPE_ARROW = 'arrow'
+    FORMAT_CHOICES = (
+        (TYPE_JSON, 'JSON'),
+        (TYPE_NDJSON, 'NDJSON'),
+        (TYPE_CSV, 'CSV'),
+        (TYPE_PARQUET, 'Parquet'),
+        (TYPE_ARROW, 'Arrow IPC'),
+    )
+    format = serializers.ChoiceField(choices=FORMAT_CHOICES)
+    organizations = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    columns = serializers.ListField(child=serializers.CharField(), required=False, allow_empty=False)
+    page_size = serializers.IntegerField(min_value=1, required=False)
+    continuation = serializers.CharField(required=False)
+
+    # The `Column` objects of the export, the `columns` are chosen among them.
+    export_columns = ()
+
+    # The lookups of the filters, they're set by the subclasses.
+    organization_field = 'organization_id'
+    start_date_field = None
+    end_date_field = None
 
-    def to_representation(self, instance):
-        date_joined = instance.date_joined
+    continuation_salt = 'holistic_organization.serializers.ExportDeserializer.continuation'
 
-        return {
-            "therapist_id": instance.id,
-            "organization_id": instance.organization_id,
-            "organization_date_joined": date_joined.isoformat() if date_joined else None
-        }
+    def validate_format(self, value):
+        if value in (self.TYPE_PARQUET, self.TYPE_ARROW) and pyarrow is None:
+            raise serializers.ValidationError(f'The {value} format requires the pyarrow package.')
 
+        return value
 
-class TherapistExportCSVSerializer(serializers.Serializer):
+    def validate_columns(self, value):
+        columns = {column.name: column for column in self.export_columns}
+        unknown = [name for name in value if name not in columns]
 
-    def to_representation(self, instance):
-        date_joined = instance.date_joined
+        if unknown:
+            raise serializers.ValidationError(
+                f'Unknown columns: {", ".join(unknown)}. The columns are: {", ".join(columns)}.'
+            )
 
-        return [
-            instance.id,
-            instance.organization_id,
-            date_joined.isoformat() if date_joined else None
-        ]
+        return [columns[name] for name in dict.fromkeys(value)]
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date')
+        end_date = attrs.get('end_date')
+
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError('`start_date` must not be after `end_date`.')
+
+        attrs.setdefault('columns', list(self.export_columns))
+
+        return attrs
+
+    def get_filters(self):
+        """
+        Returns the lookups that filter the exported rows, by the validated data.
+        """
+        data = self.validated_data
+        filters = {}
+
+        if 'organizations' in data:
+            filters[f'{self.organization_field}__in'] = data['organizations']
 
+        if 'start_date' in data:
+            filters[f'{self.start_date_field}__gte'] = data['start_date']
 
-class InteractionExportJSONSerializer(serializers.Serializer):
+        if 'end_date' in data:
+            filters[f'{self.end_date_field}__lte'] = data['end_date']
 
-    def to_representation(self, instance):
-        org_date_joined = instance.organization_date_joined
+        return filters
 
+    def get_request_data(self):
+        """
+        Returns the validated data as it's given by the request, i.e. the columns by their names.
+        It identifies the export within the cache, and it's the request of the export jobs.
+        """
         return {
-            "therapist_id": instance.therapist_id,
-            "interaction_date": instance.interaction_date.isoformat(),
-            "counter": instance.counter,
-            "chat_count": instance.chat_count,
-            "call_count": instance.call_count,
-            "organization_id": instance.organization_id,
-            "organization_date_joined": org_date_joined.isoformat() if org_date_joined else None
+            key: [column.name for column in value] if key == 'columns' else value
+            for key, value in self.validated_data.items()
         }
 
+    def paginate(self, queryset):
+        """
+        Returns a pair of (page, continuation token of the next page) of the `queryset`
+        when the export is requested by pages (`page_size` or `continuation`),
+        otherwise returns the `queryset` as it is along with `None`.
 
-class InteractionExportCSVSerializer(serializers.Serializer):
+        The pages keep the ordering of the `queryset`, with the primary key as the last tiebreaker,
+        and start after the key of the last row of the previous page (`WHERE (<ordering>) > <last key>`),
+        so every page costs the same wherever it lies, and the same token returns the same page again.
+        The token is `None` on the last page.
 
-    def to_representation(self, instance):
-        org_date_joined = instance.organization_date_joined
+        @param queryset: The filtered and ordered queryset to export, without any annotation.
+        """
+        data = self.validated_data
 
-        return [
-            instance.therapist_id,
-            instance.interaction_date.isoformat(),
-            instance.counter,
-            instance.chat_count,
-            instance.call_count,
-            instance.organization_id,
-            org_date_joined.isoformat() if org_date_joined else None
-        ]
+        if 'page_size' not in data and 'continuation' not in data:
+            return queryset, None
 
+        page_size = data.get('page_size', settings.EXPORT_PAGE_SIZE)
+        ordering = self._get_keyset_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
 
-class ExportDeserializer(serializers.Serializer):
-    TYPE_JSON = 'json'
-    TYPE_CSV = 'csv'
-    FORMAT_CHOICES = (
-        (TYPE_JSON, 'JSON'),
-        (TYPE_CSV, 'CSV'),
-    )
-    format = serializers.ChoiceField(choices=FORMAT_CHOICES)
+        if 'continuation' in data:
+            last_key = self._load_continuation(data['continuation'], len(ordering))
+            queryset = queryset.filter(self._get_keyset_filter(queryset.model, ordering, last_key, after=True))
+
+        # The key of the last row of the page, and of the first row of the next page if any.
+        fields = [field.lstrip('-') for field in ordering]
+        keys = list(queryset.values_list(*fields)[page_size - 1:page_size + 1])
+
+        if len(keys) < 2:
+            return queryset, None
+
+        page = queryset.filter(self._get_keyset_filter(queryset.model, ordering, keys[1], after=False))
+
+        return page, self._dump_continuation(keys[0])
+
+    def _get_keyset_ordering(self, queryset):
+        """
+        Returns the ordering of the `queryset` that identifies each row, i.e. ending with the primary key.
+        """
+        ordering = list(queryset.query.order_by)
+        pk_name = queryset.model._meta.pk.name
+
+        if not {'pk', pk_name} & {field.lstrip('-') for field in ordering}:
+            ordering.append('pk')
+
+        return ordering
+
+    def _get_keyset_filter(self, model, ordering, key, after):
+        """
+        Returns the `Q` object of the rows that are strictly after (or before) the `key` in the `ordering`,
+        i.e. `(a > x) OR (a = x AND b > y) OR ...`. The NULL values come last in an ascending order,
+        and first in a descending one, as PostgreSQL sorts them.
+        """
+        query = Q(pk__in=[])
+        equal = Q()
+
+        for field, value in zip(ordering, key):
+            name = field.lstrip('-')
+            nullable = name != 'pk' and model._meta.get_field(name).null
+
+            # Whether the requested rows have the greater values of the field.
+            greater = after != field.startswith('-')
+
+            if value is None:
+                # NULL is the greatest value, nothing is greater than it.
+                if not greater:
+                    query |= equal & Q(**{f'{name}__isnull': False})
+
+                equal &= Q(**{f'{name}__isnull': True})
+            else:
+                condition = Q(**{f'{name}__gt' if greater else f'{name}__lt': value})
+
+                if nullable and greater:
+                    condition |= Q(**{f'{name}__isnull': True})
+
+                query |= equal & condition
+                equal &= Q(**{name: value})
+
+        return query
+
+    def _dump_continuation(self, last_key):
+        """
+        Returns the signed token of the page that starts after the `last_key`,
+        it's bound to the export and to its filters.
+        """
+        # The dates are kept as their ISO text, which the lookups accept as well.
+        last_key = json.loads(json.dumps(last_key, cls=DjangoJSONEncoder))
+
+        return signing.dumps({'after': last_key, 'filters': self._get_filters_digest()}, salt=self.continuation_salt)
+
+    def _load_continuation(self, token, length):
+        """
+        Returns the key of the last row of the previous page from the continuation `token`.
+        """
+        try:
+            payload = signing.loads(token, salt=self.continuation_salt)
+        except signing.BadSignature:
+            raise serializers.ValidationError({'continuation': ['Invalid continuation token.']})
+
+        if payload.get('filters') != self._get_filters_digest():
+            raise serializers.ValidationError({'continuation': ['The continuation token belongs to another export.']})
+
+        if not isinstance(payload.get('after'), list) or len(payload['after']) != length:
+            raise serializers.ValidationError({'continuation': ['Invalid continuation token.']})
+
+        return payload['after']
+
+    def _get_filters_digest(self):
+        filters = json.dumps([type(self).__name__, self.get_filters()], sort_keys=True, cls=DjangoJSONEncoder)
+
+        return hashlib.sha256(filters.encode()).hexdigest()
+
+
+class TherapistExportDeserializer(ExportDeserializer):
+    export_columns = THERAPIST_EXPORT_COLUMNS
+    start_date_field = 'date_joined'
+    end_date_field = 'date_joined'
+
+
+class InteractionExportDeserializer(ExportDeserializer):
+    export_columns = INTERACTION_EXPORT_COLUMNS
+    organization_field = 'therapist__organization_id'
+    start_date_field = 'interaction_date'
+    end_date_field = 'interaction_date'
+
+
+class SyncChunkSerializer(serializers.Serializer):
+    start = serializers.IntegerField()
+    end = serializers.IntegerField(allow_null=True)
+    errors = serializers.JSONField(required=False)
 
 
 class SyncSerializer(serializers.Serializer):
     rows_created = serializers.IntegerField()
     rows_updated = serializers.IntegerField(required=False)
+    rows_unchanged = serializers.IntegerField(required=False)
+    committed_chunks = SyncChunkSerializer(many=True, required=False)
+    failed_chunks = SyncChunkSerializer(many=True, required=False)
+
+
+class SyncJobSerializer(serializers.ModelSerializer):
+    committed_chunks = SyncChunkSerializer(many=True)
+    failed_chunks = SyncChunkSerializer(many=True)
+
+    class Meta:
+        model = SyncJob
+        fields = (
+            'id',
+            'sync_type',
+            'target_id',
+            'status',
+            'total_items',
+            'processed_items',
+            'rows_created',
+            'rows_updated',
+            'rows_unchanged',
+            'committed_chunks',
+            'failed_chunks',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        )
+        read_only = fields
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    file_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id',
+            'export_type',
+            'format',
+            'status',
+            'file_url',
+            'file_size',
+            'continuation',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        )
+        read_only = fields
+
+    def get_file_url(self, job):
+        if job.status != ExportJob.STATUS_COMPLETED:
+            return None
+
+        return reverse('export-job-file', kwargs={'pk': job.id})
+
 
+class TherapistSyncSerializer(SyncSerializer):
+    therapist_id = serializers.CharField()
 
-class OrganizationBatchDeserializer(serializers.ListSerializer):
+
+class BulkInteractionSyncSerializer(SyncSerializer):
+    therapists = TherapistSyncSerializer(many=True)
+
+
+class OrganizationBatchDeserializer(FastBatchValidationMixin, serializers.ListSerializer):
 
     @transaction.atomic
     def create(self, organization_list):
@@ -96,33 +336,60 @@ class OrganizationBatchDeserializer(serializers.ListSerializer):
 
         @param organization_list: Validated JSON Array that contains a list of organizations.
         """
-        org_ids = [item['organization_id'] for item in organization_list]
-        existing_org_ids = Organization.objects.all().values_list('id', flat=True)
-
-        org_ids_to_create = list(set(org_ids).difference(existing_org_ids))
+        # 1. When the payload carries the same `organization_id` more than once,
+        # the last item wins.
+        items_by_id = {item['organization_id']: item for item in organization_list}
+
+        # 2. The organizations without `name` are created with a default name,
+        # and the existing ones are left untouched.
+        # Only the organizations in the payload are touched,
+        # so the cost doesn't depend on the total number of organizations.
+        unnamed_objects = [
+            Organization(id=org_id, name=f"Organization {org_id}")
+            for org_id, item in items_by_id.items()
+            if 'name' not in item
+        ]
 
-        organization_objects = [
-            Organization(
-                id=org_id,
-                name=f"Organization {org_id}"
-            )
-            for org_id in org_ids_to_create
+        rows_created, _, rows_unchanged = Organization.objects.upsert(
+            unnamed_objects,
+            conflict_fields=['id'],
+            update_fields=[]
+        )
+
+        # 3. The organizations with `name` are created, or renamed within the same statement.
+        named_objects = [
+            Organization(id=org_id, name=item['name'])
+            for org_id, item in items_by_id.items()
+            if 'name' in item
         ]
 
-        rows_created = len(Organization.objects.bulk_create(organization_objects))
-        return {'rows_created': rows_created}
+        named_created, rows_updated, named_unchanged = Organization.objects.upsert(
+            named_objects,
+            conflict_fields=['id'],
+            update_fields=['name']
+        )
+
+        return {
+            'rows_created': rows_created + named_created,
+            'rows_updated': rows_updated,
+            'rows_unchanged': rows_unchanged + named_unchanged
+        }
 
 
 class OrganizationDeserializer(serializers.Serializer):
     organization_id = serializers.IntegerField(
         min_value=1
     )
+    name = serializers.CharField(
+        max_length=128,
+        required=False
+    )
 
     class Meta:
         list_serializer_class = OrganizationBatchDeserializer
 
 
-class TherapistBatchDeserializer(serializers.ListSerializer):
+class TherapistBatchDeserializer(FastBatchValidationMixin, serializers.ListSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -135,85 +402,31 @@ class TherapistBatchDeserializer(serializers.ListSerializer):
 
         @param list_therapists: Validated JSON Array that contains a list of therapists.
         """
-        list_ther_ids = [item['therapist_id'] for item in list_therapists]
-        existing_therapists = Therapist.objects.filter(id__in=list_ther_ids)
-
-        objects_to_update = self._get_objects_to_update(list_therapists, existing_therapists)
-        objects_to_create = self._get_objects_to_create(list_therapists, existing_therapists)
+        # Concurrent synchronizations of the same organization are applied one after another.
+        advisory_xact_lock(LOCK_ORGANIZATION, [self.organization_id])
 
-        Therapist.objects.bulk_update(objects_to_update, fields=['organization', 'date_joined'])
-        rows_created = len(Therapist.objects.bulk_create(objects_to_create))
-        rows_updated = len(list_therapists) - rows_created
+        items_by_id = {item['therapist_id']: item for item in list_therapists}
 
-        return {'rows_created': rows_created, 'rows_updated': rows_updated}
-
-    def _get_objects_to_create(self, list_therapists, existing_therapists):
-        """
-        Returns a list of `Therapist` objects that are going to be created
-        in batch.
-
-        @param list_therapists: Validated JSON Array that contains a list of therapists.
-        @param existing_therapists: Existing therapists.
-        """
-        return [
+        objects = [
             Therapist(
-                id=item['therapist_id'],
+                id=therapist_id,
                 organization_id=self.organization_id,
                 date_joined=item['date_joined']
             )
-            for item in list_therapists if self._is_new_item(item, existing_therapists)
+            for therapist_id, item in items_by_id.items()
         ]
 
-    def _is_new_item(self, item, existing_therapists):
-        """
-        Returns `True` if that therapist `item` doesn't exist in the list of existing therapists.
-
-        @param item: A dictionary that represents the Therapist within the payload data.
-        @param org_therapists: Existing therapists.
-        """
-        for therapist in existing_therapists:
-            if item['therapist_id'] == therapist.id:
-                return False
-
-        return True
-
-    def _get_objects_to_update(self, list_therapists, existing_therapists):
-        """
-        Returns a list of `Therapist` objects that are going to be updated
-        in batch.
-
-        @param list_therapists: Validated JSON Array that contains a list of therapists.
-        @param existing_therapists: Existing therapists.
-        """
-        therapists_to_update = []
-
-        for item in list_therapists:
-            pair = self._get_object_to_update(item, existing_therapists)
-
-            if pair is None:
-                continue
-
-            item, therapist = list(pair)
-            therapist.organization_id = self.organization_id
-            therapist.date_joined = item['date_joined']
-
-            therapists_to_update.append(therapist)
-
-        return therapists_to_update
-
-    def _get_object_to_update(self, item, existing_therapists):
-        """
-        Returns a pair of (`item`, `Therapist`)
-        if that `item` exists on the list of existing therapists.
-
-        @param item: A dictionary that represents the Therapist within the payload data.
-        @param existing_therapists: Existing therapists.
-        """
-        for therapist in existing_therapists:
-            if item['therapist_id'] == therapist.id:
-                return (item, therapist)
+        rows_created, rows_updated, rows_unchanged = Therapist.objects.upsert(
+            objects,
+            conflict_fields=['id'],
+            update_fields=['organization', 'date_joined']
+        )
 
-        return None
+        return {
+            'rows_created': rows_created,
+            'rows_updated': rows_updated,
+            'rows_unchanged': rows_unchanged
+        }
 
 
 class TherapistDeserializer(serializers.Serializer):
@@ -227,7 +440,7 @@ class TherapistDeserializer(serializers.Serializer):
         list_serializer_class = TherapistBatchDeserializer
 
 
-class InteractionBatchDeserializer(serializers.ListSerializer):
+class InteractionBatchDeserializer(FastBatchValidationMixin, serializers.ListSerializer):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -241,51 +454,30 @@ class InteractionBatchDeserializer(serializers.ListSerializer):
 
         @param list_interaction: Validated JSON Array that contains a list of interactions.
         """
-        # 1. Find objects to be created / updated
-        existing_interactions = Interaction.objects.filter(therapist_id=self.therapist_id)
+        # Concurrent synchronizations of the same therapist are applied one after another.
+        advisory_xact_lock(LOCK_THERAPIST, [self.therapist_id])
 
-        objects_to_update = self._get_objects_to_update(list_interaction, existing_interactions)
-        objects_to_create = self._get_objects_to_create(list_interaction, existing_interactions)
-
-        # 2. Special case when creating new interaction objects
+        # 1. Special case when creating new interaction objects
         # - We found some interaction objects where the therapist who owned it
         #   doesn't belongs to any Organization.
         # - Hence in that case, we will leave both (`organization` and `date_joined`) fields
         #   to be empty.
-        unknown_ther_ids = []
-
-        if objects_to_create:
-
-            existing_ther_ids = Therapist.objects.filter(
-                id__in=[o.therapist_id for o in objects_to_create]
-            ).values_list('id', flat=True)
-
-            unknown_ther_ids = set([
-                o.therapist_id
-                for o in objects_to_create if o.therapist_id not in existing_ther_ids
-            ])
-
-        if unknown_ther_ids:
-            Therapist.objects.bulk_create(
-                [Therapist(id=ther_id)for ther_id in unknown_ther_ids]
+        if list_interaction:
+            Therapist.objects.upsert(
+                [Therapist(id=self.therapist_id)],
+                conflict_fields=['id'],
+                update_fields=[]
             )
 
-        # 3. Perform bulk operation to upsert `Interaction` objects
-        Interaction.objects.bulk_update(objects_to_update, fields=['chat_count', 'call_count'])
-        rows_created = len(Interaction.objects.bulk_create(objects_to_create))
-        rows_updated = len(list_interaction) - rows_created
-
-        return {'rows_created': rows_created, 'rows_updated': rows_updated}
-
-    def _get_objects_to_create(self, interaction_list, existing_interactions):
-        """
-        Returns a list of `Interaction` objects that are going to be created
-        in batch.
+        # 2. Perform a single statement to upsert `Interaction` objects
+        # - When the payload carries the same `(interaction_date, counter)` more than once,
+        #   the last item wins.
+        items_by_key = {
+            (item['interaction_date'], item['counter']): item
+            for item in list_interaction
+        }
 
-        @param interaction_list: Validated JSON Array that contains a list of interactions.
-        @param existing_interactions: Existing therapist's interactions.
-        """
-        return [
+        objects = [
             Interaction(
                 therapist_id=self.therapist_id,
                 interaction_date=item['interaction_date'],
@@ -293,76 +485,105 @@ class InteractionBatchDeserializer(serializers.ListSerializer):
                 chat_count=item['chat_count'],
                 call_count=item['call_count']
             )
-            for item in interaction_list if self._is_new_item(item, existing_interactions)
+            for item in items_by_key.values()
         ]
 
-    def _is_new_item(self, item, existing_interactions):
-        """
-        Returns `True` if that `item` exists in the list of existing interactions.
+        rows_created, rows_updated, rows_unchanged = Interaction.objects.upsert(
+            objects,
+            conflict_fields=['therapist', 'interaction_date', 'counter'],
+            update_fields=['chat_count', 'call_count']
+        )
 
-        @param therapist_id: The therapist identifier.
-        @param item: A dictionary that represents the therapist interaction within the payload data.
-        @param existing_interactions: Existing interactions.
-        """
-        for interaction in existing_interactions:
-            if bool(
-                self.therapist_id == interaction.therapist_id and
-                item['interaction_date'] == interaction.interaction_date and
-                item['counter'] == interaction.counter
-            ):
-                return False
+        return {
+            'rows_created': rows_created,
+            'rows_updated': rows_updated,
+            'rows_unchanged': rows_unchanged
+        }
 
-        return True
 
-    def _get_objects_to_update(self, list_interaction, existing_interactions):
-        """
-        Returns a list of `Interaction` objects that are going to be updated
-        in batch.
+class InteractionDeserializer(serializers.Serializer):
+    counter = serializers.IntegerField(min_value=1)
+    interaction_date = serializers.DateField()
+    chat_count = serializers.IntegerField(min_value=0)
+    call_count = serializers.IntegerField(min_value=0)
 
-        @param therapist_id: The therapist identifier.
-        @param list_interaction: Validated JSON Array that contains a list of interactions.
-        @param existing_interactions: Existing interactions.
-        """
-        interactions_to_update = []
+    class Meta:
+        list_serializer_class = InteractionBatchDeserializer
 
-        for item in list_interaction:
-            pair = self._get_object_to_update(item, existing_interactions)
 
-            if pair is None:
-                continue
+class BulkInteractionBatchDeserializer(FastBatchValidationMixin, serializers.ListSerializer):
 
-            item, interaction = list(pair)
-            interaction.chat_count = item['chat_count']
-            interaction.call_count = item['call_count']
+    @transaction.atomic
+    def create(self, list_interaction):
+        """
+        We override this method to implement upsert interactions of many therapists in batch.
 
-            interactions_to_update.append(interaction)
+        @param list_interaction: Validated JSON Array that contains a list of interactions,
+            each of them carries its `therapist_id`.
+        """
+        # 1. Special case when creating new interaction objects,
+        # the therapists who don't belong to any Organization are created without
+        # `organization` and `date_joined` (see `InteractionBatchDeserializer`).
+        # A chunk may hold thousands of therapists, so they aren't locked one by one (see `advisory_xact_lock`),
+        # the upserts resolve the concurrent synchronizations by themselves. The rows are upserted
+        # in the order of their keys, so the concurrent chunks lock them in the same order.
+        ther_ids = sorted(set(item['therapist_id'] for item in list_interaction))
+
+        Therapist.objects.upsert(
+            [Therapist(id=ther_id) for ther_id in ther_ids],
+            conflict_fields=['id'],
+            update_fields=[]
+        )
+
+        # 2. Perform a single set-based upsert of the `Interaction` objects of all therapists
+        items_by_key = {
+            (item['therapist_id'], item['interaction_date'], item['counter']): item
+            for item in list_interaction
+        }
 
-        return interactions_to_update
+        objects = [
+            Interaction(
+                therapist_id=item['therapist_id'],
+                interaction_date=item['interaction_date'],
+                counter=item['counter'],
+                chat_count=item['chat_count'],
+                call_count=item['call_count']
+            )
+            for _, item in sorted(items_by_key.items())
+        ]
 
-    def _get_object_to_update(self, item, existing_interactions):
-        """
-        Returns a pair of (`item`, `Interaction`)
-        if that `item` exists in the list of existing interactions.
+        # Every interaction is unchanged, unless the upsert reports it as created or updated.
+        results = {
+            ther_id: {'therapist_id': ther_id, 'rows_created': 0, 'rows_updated': 0, 'rows_unchanged': 0}
+            for ther_id in ther_ids
+        }
 
-        @param item: A dictionary that represents the therapist interaction within the payload data.
-        @param existing_interactions: Existing interactions.
-        """
-        for interaction in existing_interactions:
-            if bool(
-                self.therapist_id == interaction.therapist_id and
-                item['interaction_date'] == interaction.interaction_date and
-                item['counter'] == interaction.counter
-            ):
-                return (item, interaction)
+        for ther_id, _, _ in items_by_key:
+            results[ther_id]['rows_unchanged'] += 1
 
-        return None
+        for inserted, ther_id in Interaction.objects.upsert_returning(
+            objects,
+            conflict_fields=['therapist', 'interaction_date', 'counter'],
+            update_fields=['chat_count', 'call_count'],
+            returning_fields=['therapist']
+        ):
+            results[ther_id]['rows_created' if inserted else 'rows_updated'] += 1
+            results[ther_id]['rows_unchanged'] -= 1
 
+        therapists = list(results.values())
 
-class InteractionDeserializer(serializers.Serializer):
-    counter = serializers.IntegerField(min_value=1)
-    interaction_date = serializers.DateField()
-    chat_count = serializers.IntegerField(min_value=0)
-    call_count = serializers.IntegerField(min_value=0)
+        return {
+            'rows_created': sum(result['rows_created'] for result in therapists),
+            'rows_updated': sum(result['rows_updated'] for result in therapists),
+            'rows_unchanged': sum(result['rows_unchanged'] for result in therapists),
+            'therapists': therapists
+        }
+
+
+class BulkInteractionDeserializer(InteractionDeserializer):
+    therapist_id = serializers.CharField(
+        max_length=32
+    )
 
     class Meta:
-        list_serializer_class = InteractionBatchDeserializer
+        list_serializer_class = BulkInteractionBatchDeserializer
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
+from model_bakery import baker
+from rest_framework.test import APITestCase
+
+from holistic_organization.models import (
+    Interaction,
+    Organization,
+    Therapist,
+)
+
+
+class TestBulkLoadCommand(APITestCase):
+    """
+    Test the `bulk_load` management command
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, filename, content):
+        path = os.path.join(self.directory.name, filename)
+
+        with open(path, 'w') as file:
+            file.write(content)
+
+        return path
+
+    def test_load_therapists_csv(self):
+        baker.make(Therapist, id='a' * 32, organization=None, date_joined=None)
+
+        path = self._write('therapists.csv', (
+            'id,organization_id,date_joined\r\n'
+            f'{"a" * 32},1,2018-06-08\r\n'
+            f'{"b" * 32},2,\r\n'
+        ))
+
+        out = StringIO()
+        call_command('bulk_load', 'therapists', path, stdout=out)
+
+        self.assertIn('1 created, 1 updated', out.getvalue())
+        self.assertListEqual(
+            list(Organization.objects.order_by('id').values_list('id', 'name')),
+            [(1, 'Organization 1'), (2, 'Organization 2')]
+        )
+        self.assertListEqual(
+            list(Therapist.objects.order_by('id').values_list('id', 'organization_id', 'date_joined')),
+            [('a' * 32, 1, date(2018, 6, 8)), ('b' * 32, 2, None)]
+        )
+
+    def test_load_interactions_ndjson(self):
+        therapist = baker.make(Therapist, id='a' * 32)
+        baker.make(
+            Interaction,
+            therapist=therapist,
+            interaction_date=date(2018, 6, 8),
+            counter=1,
+            chat_count=1,
+            call_count=1
+        )
+
+        items = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0,
+             'organization_id': None, 'organization_date_joined': None},
+            {'therapist_id': 'c' * 32, 'interaction_date': '2018-06-09', 'counter': 1, 'chat_count': 3, 'call_count': 4,
+             'organization_id': None, 'organization_date_joined': None},
+        ]
+        path = self._write('interactions.ndjson', '\n'.join(json.dumps(item) for item in items))
+
+        out = StringIO()
+        call_command('bulk_load', 'interactions', path, format='ndjson', stdout=out)
+
+        self.assertIn('1 created, 1 updated', out.getvalue())
+        self.assertListEqual(
+            list(
+                Interaction.objects.order_by('therapist_id')
+                .values_list('therapist_id', 'chat_count', 'call_count')
+            ),
+            [('a' * 32, 2, 0), ('c' * 32, 3, 4)]
+        )
+        self.assertIsNone(Therapist.objects.get(id='c' * 32).organization_id)
@@ -0,0 +1,94 @@
+import gzip
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APITestCase
+from unittest import skipIf
+
+from holistic_organization.compression import (
+    BrotliCompressor,
+    GzipCompressor,
+    ZstdCompressor,
+    brotli,
+    compress_response,
+    select_compressor_class,
+)
+from holistic_organization.parsers import zstandard
+
+
+class TestCompressResponse(APITestCase):
+    """
+    Test the `select_compressor_class` and the `compress_response`
+    """
+
+    def setUp(self):
+        self.content = b'organization_id,type,period_type,start_date,end_date,value\r\n' * 1000
+
+    def _request(self, accept_encoding):
+        return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_select_compressor_class(self):
+        self.assertIs(select_compressor_class('gzip, deflate'), GzipCompressor)
+        self.assertIs(select_compressor_class('gzip;q=1.0, identity; q=0.5'), GzipCompressor)
+        self.assertIsNone(select_compressor_class(''))
+        self.assertIsNone(select_compressor_class('gzip;q=0, deflate'))
+        self.assertIsNone(select_compressor_class('*;q=0'))
+
+    @skipIf(zstandard is None, 'zstandard is not installed.')
+    def test_select_preferred_compressor_class(self):
+        self.assertIs(select_compressor_class('gzip, zstd'), ZstdCompressor)
+        self.assertIs(select_compressor_class('*'), ZstdCompressor)
+        self.assertIs(select_compressor_class('gzip, zstd;q=0'), GzipCompressor)
+
+        # The client preference comes first, the server one only breaks the ties.
+        self.assertIs(select_compressor_class('gzip;q=1, zstd;q=0.5'), GzipCompressor)
+        self.assertIs(select_compressor_class('zstd;q=0.5, gzip;q=0.8, *;q=0.1'), GzipCompressor)
+        self.assertIs(select_compressor_class('gzip;q=0.5, zstd;q=0.5'), ZstdCompressor)
+
+    @skipIf(brotli is None, 'brotli is not installed.')
+    def test_select_preferred_brotli(self):
+        self.assertIs(select_compressor_class('gzip;q=1, br;q=0.5'), GzipCompressor)
+        self.assertIs(select_compressor_class('gzip;q=0.5, br'), BrotliCompressor)
+
+    def test_select_identity(self):
+        self.assertIsNone(select_compressor_class('gzip;q=0.5, identity'))
+        self.assertIs(select_compressor_class('gzip, identity;q=0.5'), GzipCompressor)
+
+    def test_compress(self):
+        response = compress_response(self._request('gzip'), HttpResponse(self.content))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.content)
+
+    def test_compress_streaming(self):
+        chunks = [self.content[i:i + 1000] for i in range(0, len(self.content), 1000)]
+        response = compress_response(self._request('gzip'), StreamingHttpResponse(iter(chunks)))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.content)
+
+    @skipIf(zstandard is None, 'zstandard is not installed.')
+    def test_compress_zstd(self):
+        response = compress_response(self._request('zstd'), StreamingHttpResponse(iter([self.content])))
+
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+
+        reader = zstandard.ZstdDecompressor().stream_reader(b''.join(response.streaming_content))
+        self.assertEqual(reader.read(), self.content)
+
+    def test_not_compressed(self):
+        response = compress_response(self._request(''), HttpResponse(self.content))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        # Too small.
+        response = compress_response(self._request('gzip'), HttpResponse(b'[]'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        response = compress_response(
+            self._request('gzip'),
+            HttpResponse(self.content, content_type='application/vnd.apache.parquet')
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
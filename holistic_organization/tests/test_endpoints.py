@@ -0,0 +1,668 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import FileResponse
+from django.test import override_settings
+from django.utils import timezone
+from io import StringIO
+from model_bakery import baker
+from psycopg2.errors import DeadlockDetected
+from rest_framework import status
+from rest_framework.test import APITestCase
+from unittest import mock, skipIf
+
+from holistic_organization.models import (
+    ExportJob,
+    Interaction,
+    Organization,
+    SyncJob,
+    Therapist,
+)
+from holistic_organization.jobs import ExportJobRunner
+from holistic_organization.renderers import MessagePackRenderer
+from holistic_organization.serializers import ExportDeserializer, TherapistBatchDeserializer
+from holistic_organization.writers import ColumnarStream, CopyCSVStream, pyarrow
+
+
+User = get_user_model()
+
+
+class TestBulkInteractionSyncEndpoint(APITestCase):
+    """
+    Test endpoint `/sync/interactions/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.url = '/sync/interactions/'
+
+    def test_post(self):
+        baker.make(Therapist, id='a' * 32)
+
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0},
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': 2, 'chat_count': 1, 'call_count': 0},
+            {'therapist_id': 'b' * 32, 'interaction_date': '2018-06-13', 'counter': 1, 'chat_count': 2, 'call_count': 1},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data[0]['chat_count'] = 5
+        response = self.client.post(self.url, data[:1], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertDictEqual(response.json(), {
+            'rows_created': 0,
+            'rows_updated': 1,
+            'rows_unchanged': 0,
+            'committed_chunks': [{'start': 0, 'end': 0}],
+            'failed_chunks': [],
+            'therapists': [
+                {'rows_created': 0, 'rows_updated': 1, 'rows_unchanged': 0, 'therapist_id': 'a' * 32},
+            ]
+        })
+        self.assertEqual(Interaction.objects.count(), 3)
+        self.assertEqual(Interaction.objects.get(therapist_id='a' * 32, counter=1).chat_count, 5)
+        self.assertIsNone(Therapist.objects.get(id='b' * 32).organization_id)
+
+    def test_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(SYNC_CHUNK_SIZE=2)
+    def test_post_in_chunks(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0},
+            {'therapist_id': 'b' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 1, 'call_count': 0},
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-13', 'counter': 1, 'chat_count': 2, 'call_count': 1},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertDictEqual(response.json(), {
+            'rows_created': 3,
+            'rows_updated': 0,
+            'rows_unchanged': 0,
+            'committed_chunks': [{'start': 0, 'end': 1}, {'start': 2, 'end': 2}],
+            'failed_chunks': [],
+            'therapists': [
+                {'rows_created': 2, 'rows_updated': 0, 'rows_unchanged': 0, 'therapist_id': 'a' * 32},
+                {'rows_created': 1, 'rows_updated': 0, 'rows_unchanged': 0, 'therapist_id': 'b' * 32},
+            ]
+        })
+
+    @override_settings(SYNC_CHUNK_SIZE=2)
+    def test_post_invalid_chunk(self):
+        """
+        Test an invalid item only discards its own chunk
+        """
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0},
+            {'therapist_id': 'b' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 1, 'call_count': 0},
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-13', 'counter': 0, 'chat_count': 2, 'call_count': 1},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+
+        result = response.json()
+        self.assertEqual(result['rows_created'], 2)
+        self.assertListEqual(result['committed_chunks'], [{'start': 0, 'end': 1}])
+        self.assertEqual(len(result['failed_chunks']), 1)
+        self.assertEqual(result['failed_chunks'][0]['start'], 2)
+        self.assertEqual(result['failed_chunks'][0]['end'], 2)
+        self.assertIn('counter', result['failed_chunks'][0]['errors'][0])
+        self.assertEqual(Interaction.objects.count(), 2)
+
+    def test_post_all_chunks_failed(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-13', 'counter': 0, 'chat_count': 2, 'call_count': 1},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertListEqual(response.json()['committed_chunks'], [])
+
+    def test_post_chunk_size(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': i, 'chat_count': 2, 'call_count': 0}
+            for i in range(1, 4)
+        ]
+
+        response = self.client.post(f'{self.url}?chunk_size=2', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            response.json()['committed_chunks'],
+            [{'start': 0, 'end': 1}, {'start': 2, 'end': 2}]
+        )
+
+        response = self.client.post(f'{self.url}?chunk_size=0', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_invalid_json(self):
+        response = self.client.post(self.url, '[{"therapist_id": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_gzip(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': i, 'chat_count': 2, 'call_count': 0}
+            for i in range(1, 101)
+        ]
+        content = gzip.compress(json.dumps(data).encode())
+
+        response = self.client.post(
+            self.url, content, content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['rows_created'], 100)
+
+        response = self.client.post(
+            self.url, content, content_type='application/json', HTTP_CONTENT_ENCODING='br'
+        )
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class TestAsyncSyncEndpoint(APITestCase):
+    """
+    Test the `?async=true` mode of the synchronization endpoints and `/sync/jobs/<id>/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.organization = baker.make(Organization)
+        self.url = f'/sync/organizations/{self.organization.id}/therapists/?async=true&chunk_size=2'
+
+    def test_post(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'},
+            {'therapist_id': 'b' * 32, 'date_joined': '2018-04-06'},
+            {'therapist_id': 'c' * 32, 'date_joined': 'invalid'},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = response.json()
+        self.assertEqual(job['status'], SyncJob.STATUS_PENDING)
+        self.assertEqual(job['total_items'], 3)
+        self.assertEqual(response['Location'], f'/sync/jobs/{job["id"]}/')
+        self.assertEqual(Therapist.objects.count(), 0)
+
+        call_command('run_sync_worker', once=True, stdout=StringIO())
+
+        response = self.client.get(f'/sync/jobs/{job["id"]}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        job = response.json()
+        self.assertEqual(job['status'], SyncJob.STATUS_COMPLETED)
+        self.assertEqual(job['processed_items'], 3)
+        self.assertEqual(job['rows_created'], 2)
+        self.assertListEqual(job['committed_chunks'], [{'start': 0, 'end': 1}])
+        self.assertEqual(job['failed_chunks'][0]['start'], 2)
+        self.assertIn('date_joined', job['failed_chunks'][0]['errors'][0])
+
+        self.assertEqual(Therapist.objects.filter(organization=self.organization).count(), 2)
+        self.assertFalse(SyncJob.objects.get(id=job['id']).chunks.exists())
+
+    def test_post_retry(self):
+        """
+        Test an identical retry after the job is run is answered by the same job
+        """
+        data = [{'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'}]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.json()['id']
+
+        call_command('run_sync_worker', once=True, stdout=StringIO())
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response['Location'], f'/sync/jobs/{job_id}/')
+        self.assertEqual(SyncJob.objects.count(), 1)
+
+        # The replayed job is answered by its current state.
+        job = response.json()
+        self.assertEqual(job['id'], job_id)
+        self.assertEqual(job['status'], SyncJob.STATUS_COMPLETED)
+        self.assertEqual(job['rows_created'], 1)
+
+    def test_post_sync_after_async(self):
+        data = [{'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'}]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        response = self.client.post(self.url.replace('async=true', 'async=false'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(response.json()['rows_created'], 1)
+
+    def test_post_async_after_sync(self):
+        data = [{'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'}]
+
+        response = self.client.post(self.url.replace('async=true', 'async=false'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(response.json()['status'], SyncJob.STATUS_PENDING)
+        self.assertEqual(SyncJob.objects.count(), 1)
+
+    @override_settings(SYNC_RETRY_DELAY=0)
+    def test_post_retry_deadlock(self):
+        """
+        Test a chunk that collides with a concurrent synchronization is retried in a new transaction
+        """
+        data = [{'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'}]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        # The test case runs within its own transactions.
+        depth = len(connection.savepoint_ids)
+        create = TherapistBatchDeserializer.create
+        calls = []
+        delays = []
+
+        def create_once_deadlocked(deserializer, validated_data):
+            calls.append(1)
+
+            if len(calls) == 1:
+                try:
+                    raise OperationalError('deadlock detected') from DeadlockDetected()
+                except OperationalError as e:
+                    raise e
+
+            return create(deserializer, validated_data)
+
+        with mock.patch.object(TherapistBatchDeserializer, 'create', create_once_deadlocked), \
+                mock.patch('holistic_organization.locks.time.sleep', lambda delay: delays.append(len(connection.savepoint_ids))):
+            call_command('run_sync_worker', once=True, stdout=StringIO())
+
+        # The backoff waits outside of the transaction of the chunk, which holds the job row lock.
+        self.assertListEqual(delays, [depth])
+        self.assertEqual(len(calls), 2)
+
+        job = SyncJob.objects.get()
+        self.assertEqual(job.status, SyncJob.STATUS_COMPLETED)
+        self.assertEqual(job.rows_created, 1)
+        self.assertListEqual(job.failed_chunks, [])
+
+    def test_post_msgpack(self):
+        """
+        Test the dates decoded from MessagePack are stored in the chunks of the job
+        """
+        data = [{'therapist_id': 'a' * 32, 'date_joined': date(2018, 4, 6)}]
+
+        response = self.client.post(self.url, MessagePackRenderer().render(data), content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        call_command('run_sync_worker', once=True, stdout=StringIO())
+
+        self.assertEqual(SyncJob.objects.get().status, SyncJob.STATUS_COMPLETED)
+        self.assertEqual(Therapist.objects.get(id='a' * 32).date_joined, date(2018, 4, 6))
+
+    def test_post_unsupported(self):
+        response = self.client.post('/sync/interactions/?async=true', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestAsyncExportEndpoint(APITestCase):
+    """
+    Test the `?async=true` mode of the export endpoints and `/exports/jobs/<id>/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        job_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(job_dir.cleanup)
+
+        settings_override = self.settings(EXPORT_JOB_DIR=job_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        therapist = baker.make(Therapist, id='a' * 32, organization=baker.make(Organization), date_joined='2018-06-01')
+
+        for counter in range(1, 4):
+            baker.make(
+                Interaction, therapist=therapist, interaction_date='2018-06-08',
+                counter=counter, chat_count=2, call_count=0
+            )
+
+        self.url = '/interactions/export/'
+
+    def test_post(self):
+        data = {'format': 'csv', 'page_size': 2}
+
+        response = self.client.post(self.url, data, format='json')
+        expected = b''.join(response.streaming_content)
+        continuation = response['Export-Continuation']
+
+        response = self.client.post(f'{self.url}?async=true', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = response.json()
+        self.assertEqual(job['status'], ExportJob.STATUS_PENDING)
+        self.assertEqual(job['export_type'], ExportJob.TYPE_INTERACTIONS)
+        self.assertIsNone(job['file_url'])
+        self.assertEqual(response['Location'], f'/exports/jobs/{job["id"]}/')
+
+        response = self.client.get(f'/exports/jobs/{job["id"]}/file/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        call_command('run_export_worker', once=True, stdout=StringIO())
+
+        response = self.client.get(f'/exports/jobs/{job["id"]}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        job = response.json()
+        self.assertEqual(job['status'], ExportJob.STATUS_COMPLETED)
+        self.assertEqual(job['file_size'], len(expected))
+        # The tokens are timestamped, so only their payloads are compared.
+        self.assertEqual(
+            signing.loads(job['continuation'], salt=ExportDeserializer.continuation_salt),
+            signing.loads(continuation, salt=ExportDeserializer.continuation_salt)
+        )
+        self.assertEqual(job['file_url'], f'/exports/jobs/{job["id"]}/file/')
+
+        response = self.client.get(job['file_url'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIsInstance(response, FileResponse)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=therapists_interactions.csv')
+        self.assertEqual(b''.join(response.streaming_content), expected)
+
+    def test_post_copy_heartbeat(self):
+        """
+        Test the heartbeats don't interfere with the COPY of a CSV export that spans many chunks
+        """
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        expected = b''.join(response.streaming_content)
+
+        self.client.post(f'{self.url}?async=true', {'format': 'csv'}, format='json')
+
+        with mock.patch.object(ExportJobRunner, 'heartbeat_interval', 0), \
+                mock.patch.object(CopyCSVStream, 'chunk_size', 16):
+            call_command('run_export_worker', once=True, stdout=StringIO(), stderr=StringIO())
+
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, ExportJob.STATUS_COMPLETED, job.error)
+
+        with open(job.get_file_path(), 'rb') as file:
+            self.assertEqual(file.read(), expected)
+
+    def test_post_invalid(self):
+        response = self.client.post(f'{self.url}?async=true', {'format': 'xml'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_purge(self):
+        self.client.post(f'{self.url}?async=true', {'format': 'ndjson'}, format='json')
+        call_command('run_export_worker', once=True, stdout=StringIO())
+
+        job = ExportJob.objects.get()
+        self.assertTrue(os.path.exists(job.get_file_path()))
+
+        ExportJob.objects.update(finished_at=timezone.now() - timedelta(days=2))
+        call_command('run_export_worker', once=True, stdout=StringIO())
+
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(job.get_directory()))
+
+
+class TestIdempotentSyncEndpoint(APITestCase):
+    """
+    Test the idempotent replay of the synchronization endpoints
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.organization = baker.make(Organization)
+        self.url = f'/sync/organizations/{self.organization.id}/therapists/'
+
+        self.data_a = [{'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'}]
+        self.data_b = [{'therapist_id': 'a' * 32, 'date_joined': '2019-01-01'}]
+
+    def test_replay_same_payload(self):
+        response = self.client.post(self.url, self.data_a, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+        with self.assertNumQueries(1):
+            replayed = self.client.post(self.url, self.data_a, format='json')
+
+        self.assertEqual(replayed.status_code, status.HTTP_200_OK)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertDictEqual(replayed.json(), response.json())
+
+    def test_changed_payload_in_between(self):
+        self.client.post(self.url, self.data_a, format='json')
+        self.client.post(self.url, self.data_b, format='json')
+
+        response = self.client.post(self.url, self.data_a, format='json')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Therapist.objects.get().date_joined.isoformat(), '2018-04-06')
+
+        # The therapist is moved to other organization.
+        other = baker.make(Organization)
+        self.client.post(f'/sync/organizations/{other.id}/therapists/', self.data_a, format='json')
+
+        response = self.client.post(self.url, self.data_a, format='json')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Therapist.objects.get().organization_id, self.organization.id)
+
+    def test_idempotency_key(self):
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'request-1'}
+
+        response = self.client.post(self.url, self.data_a, format='json', **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # A retry with the same key isn't applied, even if the payload differs.
+        response = self.client.post(self.url, self.data_b, format='json', **headers)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Therapist.objects.get().date_joined.isoformat(), '2018-04-06')
+
+    def test_failed_request_not_replayed(self):
+        data = [{'therapist_id': 'a' * 32, 'date_joined': 'invalid'}]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertNotIn('Idempotent-Replayed', response)
+
+
+class TestInteractionExportEndpoint(APITestCase):
+    """
+    Test endpoint `/interactions/export/`
+    """
+
+    def setUp(self):
+        self.user = baker.make(User)
+        self.client.force_authenticate(self.user)
+
+        self.url = '/interactions/export/'
+
+        organization = baker.make(Organization)
+        therapist = baker.make(Therapist, id='a' * 32, organization=organization, date_joined='2018-06-01')
+
+        for counter in range(1, 4):
+            baker.make(
+                Interaction, therapist=therapist, interaction_date='2018-06-08',
+                counter=counter, chat_count=2, call_count=0
+            )
+
+        self.expected = [
+            {
+                'therapist_id': 'a' * 32,
+                'interaction_date': '2018-06-08',
+                'counter': counter,
+                'chat_count': 2,
+                'call_count': 0,
+                'organization_id': organization.id,
+                'organization_date_joined': '2018-06-01'
+            }
+            for counter in range(1, 4)
+        ]
+
+    def test_post_json(self):
+        response = self.client.post(self.url, {'format': 'json'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        self.assertListEqual(json.loads(b''.join(response.streaming_content)), self.expected)
+
+    def test_post_ndjson(self):
+        response = self.client.post(self.url, {'format': 'ndjson'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=therapists_interactions.ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertListEqual([json.loads(line) for line in lines], self.expected)
+
+    def test_post_csv(self):
+        response = self.client.post(self.url, {'format': 'csv'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        rows = [
+            'therapist_id,interaction_date,counter,chat_count,call_count,organization_id,organization_date_joined'
+        ] + [
+            f'{item["therapist_id"]},2018-06-08,{item["counter"]},2,0,{item["organization_id"]},2018-06-01'
+            for item in self.expected
+        ]
+        self.assertEqual(b''.join(response.streaming_content).decode(), '\r\n'.join(rows) + '\r\n')
+
+    def test_post_filtered(self):
+        other = baker.make(Therapist, id='b' * 32, organization=baker.make(Organization))
+        baker.make(Interaction, therapist=other, interaction_date='2018-06-08', counter=1, chat_count=0, call_count=0)
+        baker.make(Interaction, therapist_id='a' * 32, interaction_date='2018-07-01', counter=1, chat_count=0, call_count=0)
+
+        data = {
+            'format': 'ndjson',
+            'organizations': [self.expected[0]['organization_id']],
+            'start_date': '2018-06-01',
+            'end_date': '2018-06-30',
+            'columns': ['counter', 'interaction_date'],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertListEqual(
+            [json.loads(line) for line in lines],
+            [{'counter': item['counter'], 'interaction_date': '2018-06-08'} for item in self.expected]
+        )
+
+        data['format'] = 'csv'
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            b'counter,interaction_date\r\n1,2018-06-08\r\n2,2018-06-08\r\n3,2018-06-08\r\n'
+        )
+
+    def test_post_pages(self):
+        data = {'format': 'ndjson', 'page_size': 2, 'organizations': [self.expected[0]['organization_id']]}
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertListEqual([json.loads(line) for line in lines], self.expected[:2])
+
+        continuation = response['Export-Continuation']
+
+        # The same token returns the same page again, e.g. to resume a failed download.
+        for _ in range(2):
+            response = self.client.post(self.url, {**data, 'continuation': continuation}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.has_header('Export-Continuation'))
+
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            self.assertListEqual([json.loads(line) for line in lines], self.expected[2:])
+
+        # The CSV pages are written by COPY, each of them along with its header.
+        response = self.client.post(self.url, {**data, 'format': 'csv', 'columns': ['counter']}, format='json')
+        self.assertEqual(b''.join(response.streaming_content), b'counter\r\n1\r\n2\r\n')
+        self.assertEqual(
+            signing.loads(response['Export-Continuation'], salt=ExportDeserializer.continuation_salt),
+            signing.loads(continuation, salt=ExportDeserializer.continuation_salt)
+        )
+
+        # The token is bound to the filters of the export.
+        response = self.client.post(self.url, {'format': 'ndjson', 'continuation': continuation}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('continuation', response.json())
+
+        response = self.client.post(self.url, {**data, 'continuation': continuation + 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {**data, 'page_size': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_invalid_filters(self):
+        for data in [
+            {'format': 'json', 'columns': ['counter', 'unknown']},
+            {'format': 'json', 'columns': []},
+            {'format': 'json', 'start_date': '2018-07-01', 'end_date': '2018-06-01'},
+            {'format': 'json', 'organizations': ['x']},
+        ]:
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed.')
+    def test_post_parquet(self):
+        import pyarrow.parquet
+
+        with mock.patch.object(ColumnarStream, 'row_group_size', 2):
+            response = self.client.post(self.url, {'format': 'parquet'}, format='json')
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertEqual(pyarrow.parquet.ParquetFile(io.BytesIO(content)).num_row_groups, 2)
+
+        table = pyarrow.parquet.read_table(io.BytesIO(content))
+        self.assertEqual(table.schema.field('interaction_date').type, pyarrow.date32())
+        self.assertEqual(table.schema.field('counter').type, pyarrow.int64())
+        self.assertEqual(table.schema.field('therapist_id').type, pyarrow.string())
+
+        rows = [
+            {**row, 'interaction_date': row['interaction_date'].isoformat(),
+             'organization_date_joined': row['organization_date_joined'].isoformat()}
+            for row in table.to_pylist()
+        ]
+        self.assertListEqual(rows, self.expected)
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed.')
+    def test_post_arrow(self):
+        response = self.client.post(self.url, {'format': 'arrow'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=therapists_interactions.arrow')
+
+        table = pyarrow.ipc.open_file(pyarrow.py_buffer(b''.join(response.streaming_content))).read_all()
+        self.assertEqual(table.num_rows, 3)
+        self.assertListEqual(table.column('counter').to_pylist(), [1, 2, 3])
@@ -0,0 +1,74 @@
+from django.db import OperationalError, connection
+from django.test import override_settings
+from psycopg2.errors import DeadlockDetected
+from rest_framework.test import APITestCase
+
+from holistic_organization.locks import (
+    LOCK_THERAPIST,
+    advisory_xact_lock,
+    atomic_with_retry,
+)
+
+
+def make_deadlock_error():
+    try:
+        raise OperationalError('deadlock detected') from DeadlockDetected()
+    except OperationalError as e:
+        return e
+
+
+@override_settings(SYNC_RETRY_DELAY=0)
+class TestLocks(APITestCase):
+    """
+    Test the `advisory_xact_lock` and `atomic_with_retry`
+    """
+
+    def test_advisory_xact_lock(self):
+        advisory_xact_lock(LOCK_THERAPIST, ['b' * 32, 'a' * 32, 'a' * 32])
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT count(*) FROM pg_locks
+                WHERE locktype = 'advisory' AND classid = %s AND pid = pg_backend_pid()
+            """, [LOCK_THERAPIST])
+
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_retry_transient_error(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+
+            if len(calls) < 3:
+                raise make_deadlock_error()
+
+            return 'done'
+
+        self.assertEqual(atomic_with_retry(func), 'done')
+        self.assertEqual(len(calls), 3)
+
+    @override_settings(SYNC_MAX_RETRIES=1)
+    def test_retry_bounded(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise make_deadlock_error()
+
+        with self.assertRaises(OperationalError):
+            atomic_with_retry(func)
+
+        self.assertEqual(len(calls), 2)
+
+    def test_no_retry_other_error(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise OperationalError('connection lost')
+
+        with self.assertRaises(OperationalError):
+            atomic_with_retry(func)
+
+        self.assertEqual(len(calls), 1)
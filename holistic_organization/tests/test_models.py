@@ -0,0 +1,120 @@
+from datetime import date
+from django.db import connection
+from model_bakery import baker
+from rest_framework.test import APITestCase
+
+from holistic_organization.models import (
+    DataVersion,
+    Interaction,
+    Therapist,
+)
+
+
+class TestUpsertQuerySet(APITestCase):
+    """
+    Test the `UpsertQuerySet`
+    """
+
+    def setUp(self):
+        self.therapist = baker.make(Therapist, id='a' * 32)
+
+    def test_upsert(self):
+        """
+        Test the upsert inserts new rows and updates the conflicting ones in a single statement
+        """
+        baker.make(
+            Interaction,
+            therapist=self.therapist,
+            interaction_date=date(2018, 6, 8),
+            counter=1,
+            chat_count=1,
+            call_count=1
+        )
+
+        objects = [
+            Interaction(therapist=self.therapist, interaction_date=date(2018, 6, 8), counter=1, chat_count=5, call_count=6),
+            Interaction(therapist=self.therapist, interaction_date=date(2018, 6, 9), counter=1, chat_count=2, call_count=3),
+        ]
+
+        with self.assertNumQueries(1):
+            actual = Interaction.objects.upsert(
+                objects,
+                conflict_fields=['therapist', 'interaction_date', 'counter'],
+                update_fields=['chat_count', 'call_count']
+            )
+
+        self.assertEqual(actual, (1, 1, 0))
+        self.assertEqual(
+            Interaction.objects.get(interaction_date=date(2018, 6, 8)).chat_count,
+            5
+        )
+
+    def test_upsert_unchanged(self):
+        """
+        Test the upsert doesn't rewrite the rows that already hold the same values
+        """
+        interaction = baker.make(
+            Interaction,
+            therapist=self.therapist,
+            interaction_date=date(2018, 6, 8),
+            counter=1,
+            chat_count=1,
+            call_count=1
+        )
+
+        def get_row_location():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT ctid::text FROM {Interaction._meta.db_table} WHERE id = %s',
+                    [interaction.id]
+                )
+                return cursor.fetchone()[0]
+
+        row_location = get_row_location()
+
+        objects = [
+            Interaction(therapist=self.therapist, interaction_date=date(2018, 6, 8), counter=1, chat_count=1, call_count=1),
+        ]
+
+        actual = Interaction.objects.upsert(
+            objects,
+            conflict_fields=['therapist', 'interaction_date', 'counter'],
+            update_fields=['chat_count', 'call_count']
+        )
+
+        self.assertEqual(actual, (0, 0, 1))
+        self.assertEqual(get_row_location(), row_location)
+
+    def test_upsert_do_nothing(self):
+        """
+        Test the upsert leaves the conflicting rows untouched without any `update_fields`
+        """
+        objects = [Therapist(id='a' * 32), Therapist(id='b' * 32)]
+
+        actual = Therapist.objects.upsert(objects, conflict_fields=['id'], update_fields=[])
+
+        self.assertEqual(actual, (1, 0, 1))
+        self.assertEqual(Therapist.objects.count(), 2)
+
+    def test_upsert_empty(self):
+        with self.assertNumQueries(0):
+            actual = Therapist.objects.upsert([], conflict_fields=['id'], update_fields=[])
+
+        self.assertEqual(actual, (0, 0, 0))
+
+
+class TestDataVersionQuerySet(APITestCase):
+    """
+    Test the `DataVersionQuerySet`
+    """
+
+    def test_bump(self):
+        self.assertEqual(DataVersion.objects.get_version(Interaction), 0)
+
+        with self.assertNumQueries(1):
+            DataVersion.objects.bump(Interaction)
+
+        DataVersion.objects.bump(Interaction)
+
+        self.assertEqual(DataVersion.objects.get_version(Interaction), 2)
+        self.assertEqual(DataVersion.objects.get_version(Therapist), 0)
@@ -0,0 +1,134 @@
+import gzip
+import io
+import json
+import msgpack
+import zlib
+
+from datetime import date
+
+from django.test import override_settings
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.test import APITestCase
+from unittest import skipIf
+
+from holistic_organization.parsers import (
+    JSONArrayStreamParser,
+    MessagePackArrayStreamParser,
+    decode_content,
+    zstandard,
+)
+from holistic_organization.renderers import MessagePackRenderer
+
+
+class TestJSONArrayStreamParser(APITestCase):
+    """
+    Test the `JSONArrayStreamParser`
+    """
+
+    def setUp(self):
+        self.parser = JSONArrayStreamParser()
+        # Forces the items to be cut across many reads.
+        self.parser.read_size = 5
+
+    def _parse(self, content):
+        return list(self.parser.parse(io.BytesIO(content)))
+
+    def test_parse(self):
+        items = [
+            {'therapist_id': 'ß' * 4, 'counter': i, 'chat_count': [1, 2.5, None]}
+            for i in range(20)
+        ] + [12345, 'text']
+
+        self.assertListEqual(self._parse(json.dumps(items).encode()), items)
+        self.assertListEqual(self._parse(json.dumps(items, indent=2).encode()), items)
+
+    def test_parse_empty_array(self):
+        self.assertListEqual(self._parse(b' [ ]\n'), [])
+
+    def test_parse_invalid(self):
+        for content in [b'', b'{}', b'[1,', b'[1 2]', b'[1]x', b'[{"a":]', b'[', b'[\xff]']:
+            with self.assertRaises(ParseError):
+                self._parse(content)
+
+
+class TestMessagePackArrayStreamParser(APITestCase):
+    """
+    Test the `MessagePackArrayStreamParser`
+    """
+
+    def setUp(self):
+        self.parser = MessagePackArrayStreamParser()
+        # Forces the items to be cut across many reads.
+        self.parser.read_size = 5
+
+    def _parse(self, content):
+        return list(self.parser.parse(io.BytesIO(content)))
+
+    def test_parse(self):
+        items = [
+            {'therapist_id': 'ß' * 4, 'interaction_date': date(2018, 6, 8), 'counter': i, 'chat_count': [1, 2.5, None]}
+            for i in range(20)
+        ] + [12345, 'text', date(1969, 12, 31)]
+
+        self.assertListEqual(self._parse(MessagePackRenderer().render(items)), items)
+
+    def test_parse_empty_array(self):
+        self.assertListEqual(self._parse(msgpack.packb([])), [])
+
+    def test_parse_invalid(self):
+        content = msgpack.packb([1, 2, 3])
+
+        for content in [b'', msgpack.packb({}), content[:-1], content + b'\x01', b'\xc1']:
+            with self.assertRaises(ParseError):
+                self._parse(content)
+
+
+class TestDecodeContent(APITestCase):
+    """
+    Test the `decode_content`
+    """
+
+    def setUp(self):
+        self.content = json.dumps([{'interaction_date': '2018-06-08', 'counter': i} for i in range(1000)]).encode()
+
+    def _read(self, content, content_encoding):
+        stream = decode_content(io.BytesIO(content), content_encoding)
+        # Reads in small pieces to exercise the incremental decompression.
+        return b''.join(iter(lambda: stream.read(100), b''))
+
+    def test_gzip(self):
+        content = gzip.compress(self.content)
+
+        self.assertEqual(self._read(content, 'gzip'), self.content)
+        # Many gzip members.
+        self.assertEqual(self._read(content + content, 'gzip'), self.content * 2)
+
+    def test_deflate(self):
+        self.assertEqual(self._read(zlib.compress(self.content), 'deflate'), self.content)
+
+    @skipIf(zstandard is None, 'zstandard is not installed.')
+    def test_zstd(self):
+        content = zstandard.ZstdCompressor().compress(self.content)
+
+        self.assertEqual(self._read(content, 'zstd'), self.content)
+
+    def test_identity(self):
+        self.assertEqual(self._read(self.content, None), self.content)
+        self.assertEqual(self._read(self.content, 'identity'), self.content)
+
+    def test_invalid(self):
+        with self.assertRaises(ParseError):
+            self._read(gzip.compress(self.content)[:-20], 'gzip')
+
+        with self.assertRaises(ParseError):
+            self._read(self.content, 'gzip')
+
+        with self.assertRaises(UnsupportedMediaType):
+            self._read(self.content, 'br')
+
+    def test_decompression_bomb(self):
+        content = gzip.compress(b' ' * 1024 * 1024)
+
+        with override_settings(SYNC_MAX_DECOMPRESSED_SIZE=1024):
+            with self.assertRaises(ParseError):
+                self._read(content, 'gzip')
@@ -0,0 +1,204 @@
+from datetime import date
+from django.db import connection, transaction
+from model_bakery import baker
+from rest_framework.test import APITestCase
+
+from holistic_organization.models import (
+    Interaction,
+    Organization,
+    Therapist,
+)
+from holistic_organization.serializers import (
+    BulkInteractionDeserializer,
+    InteractionDeserializer,
+    OrganizationDeserializer,
+    TherapistDeserializer,
+)
+
+
+class TestOrganizationBatchDeserializer(APITestCase):
+    """
+    Test the `OrganizationBatchDeserializer`
+    """
+
+    def test_create_and_update(self):
+        """
+        Test the deserializer creates the missing organizations and renames the named ones
+        """
+        baker.make(Organization, id=1, name='First')
+        baker.make(Organization, id=2, name='Second')
+        baker.make(Organization, id=3, name='Third')
+
+        data = [
+            {'organization_id': 1},
+            {'organization_id': 2, 'name': 'Renamed'},
+            {'organization_id': 3, 'name': 'Third'},
+            {'organization_id': 4},
+            {'organization_id': 5, 'name': 'Fifth'},
+        ]
+
+        deserializer = OrganizationDeserializer(data=data, many=True)
+        deserializer.is_valid(raise_exception=True)
+        deserializer.save()
+
+        self.assertDictEqual(
+            deserializer.instance,
+            {'rows_created': 2, 'rows_updated': 1, 'rows_unchanged': 2}
+        )
+
+        actual = list(Organization.objects.order_by('id').values_list('id', 'name'))
+        expected = [
+            (1, 'First'),
+            (2, 'Renamed'),
+            (3, 'Third'),
+            (4, 'Organization 4'),
+            (5, 'Fifth'),
+        ]
+        self.assertListEqual(actual, expected)
+
+
+class TestInteractionBatchDeserializer(APITestCase):
+    """
+    Test the `InteractionBatchDeserializer`
+    """
+
+    def setUp(self):
+        self.therapist = baker.make(Therapist, id='a' * 32)
+        self.context = {'therapist_id': self.therapist.id}
+
+    def _save(self, data):
+        deserializer = InteractionDeserializer(data=data, many=True, context=self.context)
+        deserializer.is_valid(raise_exception=True)
+        deserializer.save()
+
+        return deserializer.instance
+
+    def test_create_and_update(self):
+        """
+        Test the deserializer upserts the interactions by `(interaction_date, counter)`
+        """
+        baker.make(
+            Interaction,
+            therapist=self.therapist,
+            interaction_date=date(2018, 6, 8),
+            counter=1,
+            chat_count=1,
+            call_count=1
+        )
+        # Outside of the payload date range, it must be left untouched.
+        baker.make(
+            Interaction,
+            therapist=self.therapist,
+            interaction_date=date(2017, 1, 1),
+            counter=1,
+            chat_count=7,
+            call_count=7
+        )
+
+        data = [
+            {'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0},
+            {'interaction_date': '2018-06-08', 'counter': 2, 'chat_count': 3, 'call_count': 1},
+            {'interaction_date': '2018-06-13', 'counter': 1, 'chat_count': 4, 'call_count': 5},
+        ]
+
+        result = self._save(data)
+
+        self.assertDictEqual(result, {'rows_created': 2, 'rows_updated': 1, 'rows_unchanged': 0})
+
+        actual = list(
+            Interaction.objects.filter(therapist=self.therapist)
+            .order_by('interaction_date', 'counter')
+            .values_list('interaction_date', 'counter', 'chat_count', 'call_count')
+        )
+        expected = [
+            (date(2017, 1, 1), 1, 7, 7),
+            (date(2018, 6, 8), 1, 2, 0),
+            (date(2018, 6, 8), 2, 3, 1),
+            (date(2018, 6, 13), 1, 4, 5),
+        ]
+        self.assertListEqual(actual, expected)
+
+    def test_create_unknown_therapist(self):
+        """
+        Test the deserializer creates the therapist who doesn't belong to any organization
+        """
+        self.context = {'therapist_id': 'b' * 32}
+
+        data = [
+            {'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0},
+        ]
+
+        result = self._save(data)
+
+        self.assertDictEqual(result, {'rows_created': 1, 'rows_updated': 0, 'rows_unchanged': 0})
+
+        therapist = Therapist.objects.get(id='b' * 32)
+        self.assertIsNone(therapist.organization_id)
+        self.assertIsNone(therapist.date_joined)
+
+
+class TestBulkInteractionBatchDeserializer(APITestCase):
+    """
+    Test the `BulkInteractionBatchDeserializer`
+    """
+
+    def test_create_without_locks(self):
+        """
+        Test the deserializer doesn't hold an advisory lock per therapist
+        """
+        data = [
+            {'therapist_id': f'{i:032}', 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0}
+            for i in range(100, 0, -1)
+        ]
+
+        deserializer = BulkInteractionDeserializer(data=data, many=True)
+        deserializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            deserializer.save()
+
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()
+                """)
+
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+        self.assertEqual(deserializer.instance['rows_created'], 100)
+        self.assertEqual(Interaction.objects.count(), 100)
+
+
+class TestTherapistBatchDeserializer(APITestCase):
+    """
+    Test the `TherapistBatchDeserializer`
+    """
+
+    def setUp(self):
+        self.organization = baker.make(Organization)
+        self.context = {'organization_id': self.organization.id}
+
+    def test_create_and_update(self):
+        """
+        Test the deserializer upserts the therapists by their `therapist_id`
+        """
+        baker.make(Therapist, id='a' * 32, organization=None, date_joined=None)
+
+        data = [
+            {'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'},
+            {'therapist_id': 'b' * 32, 'date_joined': '2018-06-17'},
+        ]
+
+        deserializer = TherapistDeserializer(data=data, many=True, context=self.context)
+        deserializer.is_valid(raise_exception=True)
+        deserializer.save()
+
+        self.assertDictEqual(deserializer.instance, {'rows_created': 1, 'rows_updated': 1, 'rows_unchanged': 0})
+
+        actual = list(
+            Therapist.objects.order_by('id').values_list('id', 'organization_id', 'date_joined')
+        )
+        expected = [
+            ('a' * 32, self.organization.id, date(2018, 4, 6)),
+            ('b' * 32, self.organization.id, date(2018, 6, 17)),
+        ]
+        self.assertListEqual(actual, expected)
@@ -0,0 +1,67 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from holistic_data_presentation.serializers import (
+    RateDeserializer,
+    TotalTherapistDeserializer,
+)
+from holistic_organization.serializers import (
+    BulkInteractionDeserializer,
+    TherapistDeserializer,
+)
+
+
+class TestFastBatchValidationMixin(APITestCase):
+    """
+    Test the compiled validation gives the same result as the DRF validation
+    """
+
+    def _validate(self, deserializer_class, data, fast):
+        with override_settings(SYNC_FAST_VALIDATION=fast):
+            deserializer = deserializer_class(data=data, many=True, context={'organization_id': 1})
+            is_valid = deserializer.is_valid()
+
+            return is_valid, deserializer.errors, deserializer.validated_data
+
+    def assertSameValidation(self, deserializer_class, data):
+        expected = self._validate(deserializer_class, data, fast=False)
+        actual = self._validate(deserializer_class, data, fast=True)
+
+        self.assertEqual(actual, expected)
+
+    def test_interactions(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'interaction_date': '2018-06-08', 'counter': 1, 'chat_count': 2, 'call_count': 0},
+            {'therapist_id': ' ' + 'a' * 31, 'interaction_date': '2018-6-8', 'counter': '2', 'chat_count': 2.0, 'call_count': 0},
+        ]
+        self.assertSameValidation(BulkInteractionDeserializer, data)
+
+        data += [
+            {'therapist_id': 'a' * 33, 'interaction_date': '2018-06-31', 'counter': 0, 'chat_count': None},
+            {'therapist_id': '', 'interaction_date': 20180608, 'counter': True, 'chat_count': -1, 'call_count': 'x'},
+            ['not', 'an', 'item'],
+        ]
+        self.assertSameValidation(BulkInteractionDeserializer, data)
+
+    def test_therapists(self):
+        data = [
+            {'therapist_id': 'a' * 32, 'date_joined': '2018-04-06'},
+            {'therapist_id': 'b' * 31, 'date_joined': '2018-04-06T00:00:00'},
+        ]
+        self.assertSameValidation(TherapistDeserializer, data)
+
+    def test_total_therapists(self):
+        data = [
+            {'period_type': 'weekly', 'start_date': '2022-11-07', 'end_date': '2022-11-13', 'is_active': True, 'value': 3},
+            {'period_type': 'monthly', 'start_date': '2022-11-07', 'end_date': '2022-11-30', 'is_active': 'true', 'value': 3},
+            {'period_type': 'daily', 'start_date': '2022-11-01', 'end_date': '2022-11-30', 'is_active': 1, 'value': '3'},
+        ]
+        self.assertSameValidation(TotalTherapistDeserializer, data)
+
+    def test_rates(self):
+        data = [
+            {'type': 'retention_rate', 'period_type': 'yearly', 'start_date': '2022-01-01', 'end_date': '2022-12-31', 'value': 0.5},
+            {'type': 'retention_rate', 'period_type': 'yearly', 'start_date': '2022-01-01', 'end_date': '2022-12-31', 'value': 1},
+            {'type': 'unknown', 'period_type': 'yearly', 'start_date': '2022-01-02', 'end_date': '2022-12-31', 'value': 'x'},
+        ]
+        self.assertSameValidation(RateDeserializer, data)
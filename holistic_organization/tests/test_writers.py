@@ -0,0 +1,122 @@
+from model_bakery import baker
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from holistic_data_presentation.exports import RATE_EXPORT_COLUMNS
+from holistic_data_presentation.models import Rate
+from holistic_organization.exports import INTERACTION_EXPORT_COLUMNS, copy_csv_sql
+from holistic_organization.models import (
+    Interaction,
+    Organization,
+    Therapist,
+)
+from holistic_organization.writers import CSVStream, CopyChunkWriter, CopyCSVStream
+
+
+class TestCopyCSVStream(APITestCase):
+    """
+    Test the `CopyCSVStream` writes the same CSV as the `CSVStream`
+    """
+
+    def _export(self, stream_class, queryset, columns):
+        response = stream_class().export('export', queryset, columns)
+
+        return b''.join(response.streaming_content)
+
+    def assertSameExport(self, queryset, columns):
+        expected = self._export(CSVStream, queryset, columns)
+        actual = self._export(CopyCSVStream, queryset, columns)
+
+        self.assertEqual(actual, expected)
+
+        return actual
+
+    def test_interactions(self):
+        queryset = Interaction.objects.annotate_organization_id()\
+            .annotate_organization_date_joined().order_by('id')
+
+        self.assertSameExport(queryset, INTERACTION_EXPORT_COLUMNS)
+
+        organization = baker.make(Organization)
+        therapists = [
+            baker.make(Therapist, id='a' * 32, organization=organization, date_joined='2018-06-01'),
+            baker.make(Therapist, id='b,"b"\nb', organization=None, date_joined=None),
+            baker.make(Therapist, id='ß€ c', organization=organization, date_joined='1999-12-31'),
+        ]
+
+        for i in range(30):
+            baker.make(
+                Interaction, therapist=therapists[i % 3], interaction_date=f'2018-06-{i % 28 + 1:02}',
+                counter=i + 1, chat_count=i, call_count=0
+            )
+
+        content = self.assertSameExport(queryset, INTERACTION_EXPORT_COLUMNS)
+        self.assertIn(b'"b,""b""\nb",', content)
+
+    def test_rates(self):
+        queryset = Rate.objects.all().order_by('organization', 'type', 'period_type', 'start_date')
+        organization = baker.make(Organization)
+
+        for i, value in enumerate([0, 1.5, 100.0, 1 / 7, 1e-5, 2.5e-7, 123456789012345.0, 1e15, 1e16, -3.0, 1e300]):
+            baker.make(
+                Rate, organization=organization if i % 2 else None, type='churn_rate', period_type='weekly',
+                start_date=f'2022-01-{i + 1:02}', end_date=f'2022-01-{i + 7:02}', value=value
+            )
+
+        self.assertSameExport(queryset, RATE_EXPORT_COLUMNS)
+
+    def test_rates_exponent_boundaries(self):
+        """
+        Test the floats around 1e15 and 1e16, where PostgreSQL and Python switch to the exponent notation
+        """
+        queryset = Rate.objects.all().order_by('start_date')
+        values = [
+            999999999999999.9, 1e15, 1000000000000000.5, 1234567890123456.5, 9999999999999998.0,
+            9999999999999999.0, 1e16, 12345678901234568.0, 1.5e16, 1e-4, 1e-5,
+        ]
+
+        for i, value in enumerate(values + [-value for value in values]):
+            baker.make(
+                Rate, organization=None, type='churn_rate', period_type='weekly',
+                start_date=f'2022-01-{i + 1:02}', end_date=f'2022-01-{i + 7:02}', value=value
+            )
+
+        content = self.assertSameExport(queryset, RATE_EXPORT_COLUMNS)
+        self.assertIn(b',1234567890123456.5', content)
+        self.assertIn(b',-1000000000000000.5', content)
+
+    def test_crlf_across_chunks(self):
+        writer = CopyChunkWriter(chunks=None)
+        content = b'1,"a\nb",2\n3,"c""\n'
+
+        self.assertEqual(
+            b''.join(writer._crlf(content[i:i + 1]) for i in range(len(content))),
+            b'1,"a\nb",2\r\n3,"c""\n'
+        )
+
+
+class TestCopyCSVStreamClosed(APITransactionTestCase):
+    """
+    Test the `CopyCSVStream` stops the COPY when the client goes away
+    """
+
+    def test_close(self):
+        therapist = baker.make(Therapist, id='a' * 32)
+        Interaction.objects.bulk_create([
+            Interaction(therapist=therapist, interaction_date='2018-06-08', counter=i + 1, chat_count=0, call_count=0)
+            for i in range(5000)
+        ])
+
+        stream = CopyCSVStream()
+        stream.chunk_size = 64
+        stream.max_chunks = 1
+
+        queryset = Interaction.objects.annotate_organization_id()\
+            .annotate_organization_date_joined().order_by('id')
+        content = stream._content(copy_csv_sql(queryset, INTERACTION_EXPORT_COLUMNS), INTERACTION_EXPORT_COLUMNS)
+
+        next(content)
+        next(content)
+        content.close()
+
+        # The connection is still usable.
+        self.assertEqual(Interaction.objects.count(), 5000)
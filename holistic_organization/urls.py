@@ -1,10 +1,14 @@
 from django.urls import path
 
 from holistic_organization.views import (
+    BulkInteractionSyncView,
+    ExportJobDetailView,
+    ExportJobFileView,
     InteractionExportView,
     InteractionSyncView,
     OrganizationListView,
     OrganizationSyncView,
+    SyncJobDetailView,
     TherapistExportView,
     TherapistSyncView,
 )
@@ -25,6 +29,16 @@ urlpatterns = [
         InteractionExportView.as_view(),
         name='export-all-interactions'
     ),
+    path(
+        'exports/jobs/<int:pk>/',
+        ExportJobDetailView.as_view(),
+        name='export-job'
+    ),
+    path(
+        'exports/jobs/<int:pk>/file/',
+        ExportJobFileView.as_view(),
+        name='export-job-file'
+    ),
     path(
         'sync/organizations/',
         OrganizationSyncView.as_view(),
@@ -40,4 +54,14 @@ urlpatterns = [
         InteractionSyncView.as_view(),
         name='sync-therapist-interactions'
     ),
+    path(
+        'sync/interactions/',
+        BulkInteractionSyncView.as_view(),
+        name='sync-interactions'
+    ),
+    path(
+        'sync/jobs/<int:pk>/',
+        SyncJobDetailView.as_view(),
+        name='sync-job'
+    ),
 ]
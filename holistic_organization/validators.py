@@ -0,0 +1,252 @@
+from collections.abc import Mapping
+from datetime import date
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import (
+    MaxLengthValidator,
+    MaxValueValidator,
+    MinLengthValidator,
+    MinValueValidator,
+    ProhibitNullCharactersValidator,
+)
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import (
+    ISO_8601,
+    SkipField,
+    empty,
+    get_error_detail,
+)
+from rest_framework.serializers import as_serializer_error
+from rest_framework.settings import api_settings
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
+
+
+# Returned by a compiled field when it can't tell whether the value is valid,
+# the value is then validated by the DRF field itself.
+SLOW_PATH = object()
+
+# Validators that are derived from the field arguments, hence checked by the compiled fields.
+KNOWN_VALIDATORS = (
+    MaxLengthValidator,
+    MaxValueValidator,
+    MinLengthValidator,
+    MinValueValidator,
+    ProhibitNullCharactersValidator,
+    ProhibitSurrogateCharactersValidator,
+)
+
+
+def compile_field(field):
+    """
+    Returns a function that converts a valid primitive value of the `field`
+    into its internal value, or returns `SLOW_PATH` for anything else.
+    Returns `None` if the `field` can't be compiled.
+
+    @param field: A bound DRF field.
+    """
+    if any(not isinstance(validator, KNOWN_VALIDATORS) for validator in field.validators):
+        return None
+
+    if type(field) is serializers.IntegerField:
+        min_value = field.min_value
+        max_value = field.max_value
+
+        def convert(value):
+            if type(value) is not int:
+                return SLOW_PATH
+
+            if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+                return SLOW_PATH
+
+            return value
+
+        return convert
+
+    if type(field) is serializers.FloatField:
+        min_value = field.min_value
+        max_value = field.max_value
+
+        def convert(value):
+            if type(value) is not float and type(value) is not int:
+                return SLOW_PATH
+
+            value = float(value)
+
+            if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+                return SLOW_PATH
+
+            return value
+
+        return convert
+
+    if type(field) is serializers.CharField:
+        min_length = max(field.min_length or 0, 1 if not field.allow_blank else 0)
+        max_length = field.max_length
+
+        def convert(value):
+            # Only the plain ASCII strings without any surrounding whitespace are
+            # left as they are by the field, the rest goes through the slow path.
+            if type(value) is not str or not value.isascii() or '\x00' in value:
+                return SLOW_PATH
+
+            if len(value) < min_length or (max_length is not None and len(value) > max_length):
+                return SLOW_PATH
+
+            if field.trim_whitespace and value != value.strip():
+                return SLOW_PATH
+
+            return value
+
+        return convert
+
+    if type(field) is serializers.DateField:
+        input_formats = getattr(field, 'input_formats', api_settings.DATE_INPUT_FORMATS)
+
+        if list(input_formats) != [ISO_8601]:
+            return None
+
+        def convert(value):
+            # e.g. decoded by the `MessagePackArrayStreamParser`.
+            if type(value) is date:
+                return value
+
+            if type(value) is not str or len(value) != 10 or value[4] != '-' or value[7] != '-':
+                return SLOW_PATH
+
+            try:
+                return date.fromisoformat(value)
+            except ValueError:
+                return SLOW_PATH
+
+        return convert
+
+    if type(field) is serializers.BooleanField:
+
+        def convert(value):
+            if value is True or value is False:
+                return value
+
+            return SLOW_PATH
+
+        return convert
+
+    if type(field) is serializers.ChoiceField:
+        choices = field.choice_strings_to_values
+
+        def convert(value):
+            if type(value) is not str or value not in choices:
+                return SLOW_PATH
+
+            return choices[value]
+
+        return convert
+
+    return None
+
+
+def compile_serializer(serializer):
+    """
+    Returns a list of (field name, field, compiled field) of the writable fields of the `serializer`,
+    or `None` if the `serializer` can't be compiled.
+
+    @param serializer: A bound DRF serializer, e.g. the child of a list serializer.
+    """
+    if serializer.validators:
+        return None
+
+    plan = []
+
+    for field in serializer._writable_fields:
+        # The fields with custom sources or `validate_<field name>` methods need the full machinery.
+        if field.source != field.field_name or hasattr(serializer, f'validate_{field.field_name}'):
+            return None
+
+        convert = compile_field(field)
+
+        if convert is None:
+            return None
+
+        plan.append((field.field_name, field, convert))
+
+    return plan
+
+
+class FastBatchValidationMixin:
+    """
+    A mixin for the batch deserializers (`ListSerializer`) that validates the list items
+    through compiled fields when `SYNC_FAST_VALIDATION` is enabled.
+
+    A compiled field accepts the common valid values with plain type and range checks,
+    and hands anything else to the DRF field, so the errors keep the same format.
+    The item-level `validate` method of the child serializer is still called for each item.
+    """
+
+    def to_internal_value(self, data):
+        if not settings.SYNC_FAST_VALIDATION or not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+
+        plan = compile_serializer(self.child)
+
+        if plan is None:
+            return super().to_internal_value(data)
+
+        if self.max_length is not None and len(data) > self.max_length:
+            return super().to_internal_value(data)
+
+        if self.min_length is not None and len(data) < self.min_length:
+            return super().to_internal_value(data)
+
+        validate = self.child.validate
+        has_validate = type(self.child).validate is not serializers.Serializer.validate
+
+        ret = []
+        errors = []
+
+        for item in data:
+            if not isinstance(item, Mapping):
+                message = self.child.error_messages['invalid'].format(datatype=type(item).__name__)
+                errors.append({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+                continue
+
+            attrs = {}
+            item_errors = {}
+
+            for name, field, convert in plan:
+                primitive_value = item.get(name, empty)
+
+                if primitive_value is empty and not field.required and field.default is empty:
+                    continue
+
+                value = convert(primitive_value)
+
+                if value is SLOW_PATH:
+                    try:
+                        value = field.run_validation(primitive_value)
+                    except ValidationError as exc:
+                        item_errors[name] = exc.detail
+                        continue
+                    except DjangoValidationError as exc:
+                        item_errors[name] = get_error_detail(exc)
+                        continue
+                    except SkipField:
+                        continue
+
+                attrs[name] = value
+
+            if not item_errors and has_validate:
+                try:
+                    attrs = validate(attrs)
+                except (ValidationError, DjangoValidationError) as exc:
+                    item_errors = as_serializer_error(exc)
+
+            if item_errors:
+                errors.append(item_errors)
+            else:
+                ret.append(attrs)
+                errors.append({})
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        return ret
@@ -1,128 +1,88 @@
-from django.http import Http404
+from django.db.models import Q
+from django.http import FileResponse, Http404
 from drf_rw_serializers import generics
 from rest_framework import status
 from rest_framework.response import Response
 
+from holistic_organization.export_cache import CONTENT_TYPES
+from holistic_organization.mixins import BatchSyncMixin, CompressedResponseMixin, ExportJobMixin
 from holistic_organization.models import (
+    ExportJob,
+    IdempotencyRecord,
     Interaction,
     Organization,
+    SyncJob,
     Therapist
 )
 from holistic_organization.serializers import (
-    ExportDeserializer,
-    InteractionExportCSVSerializer,
-    InteractionExportJSONSerializer,
+    BulkInteractionDeserializer,
+    BulkInteractionSyncSerializer,
+    ExportJobSerializer,
     InteractionDeserializer,
+    InteractionExportDeserializer,
     OrganizationDeserializer,
     OrganizationSerializer,
+    SyncJobSerializer,
     SyncSerializer,
     TherapistDeserializer,
-    TherapistExportCSVSerializer,
-    TherapistExportJSONSerializer,
+    TherapistExportDeserializer,
 )
-from holistic_organization.writers import CSVStream
+from holistic_organization.writers import CopyCSVStream
 
 
-class OrganizationListView(generics.ListAPIView):
+class OrganizationListView(CompressedResponseMixin, generics.ListAPIView):
     serializer_class = OrganizationSerializer
     queryset = Organization.objects.all().order_by('id')
 
 
-class TherapistExportView(generics.CreateAPIView):
+class TherapistExportView(ExportJobMixin, CompressedResponseMixin, generics.CreateAPIView):
+    export_deserializer_class = TherapistExportDeserializer
+    export_filename = 'therapists'
+    export_job_type = ExportJob.TYPE_THERAPISTS
 
-    def post(self, request, *args, **kwargs):
-        deserializer = ExportDeserializer(data=request.data)
-        deserializer.is_valid(raise_exception=True)
-
-        format = deserializer.validated_data['format']
-        filename = 'therapists'
-
-        queryset = Therapist.objects.all().order_by('id')
-
-        if format == 'json':
-            serializer = TherapistExportJSONSerializer(
-                queryset,
-                many=True
-            )
-
-            response = Response(serializer.data)
-            response['Content-Disposition'] = f"attachment; filename={filename}.json"
-
-            return response
-
-        elif format == 'csv':
-            csv_stream = CSVStream()
-            headers = ['id', 'organization_id', 'date_joined']
+    def get_export_queryset(self, deserializer):
+        return deserializer.paginate(
+            Therapist.objects.filter(**deserializer.get_filters()).order_by('id')
+        )
 
-            return csv_stream.export(
-                filename,
-                headers,
-                queryset.iterator(),
-                TherapistExportCSVSerializer
-            )
-
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class InteractionExportView(generics.CreateAPIView):
 
-    def post(self, request, *args, **kwargs):
-        deserializer = ExportDeserializer(data=request.data)
-        deserializer.is_valid(raise_exception=True)
-
-        format = deserializer.validated_data['format']
-        filename = 'therapists_interactions'
+class InteractionExportView(ExportJobMixin, CompressedResponseMixin, generics.CreateAPIView):
+    export_deserializer_class = InteractionExportDeserializer
+    export_filename = 'therapists_interactions'
+    export_job_type = ExportJob.TYPE_INTERACTIONS
+    csv_stream_class = CopyCSVStream
 
-        queryset = Interaction.objects.annotate_organization_id()\
-            .annotate_organization_date_joined().order_by('id')
-
-        if format == 'json':
-            serializer = InteractionExportJSONSerializer(
-                queryset,
-                many=True
-            )
+    def get_export_queryset(self, deserializer):
+        queryset, continuation = deserializer.paginate(
+            Interaction.objects.filter(**deserializer.get_filters()).order_by('id')
+        )
 
-            response = Response(serializer.data)
-            response['Content-Disposition'] = f"attachment; filename={filename}.json"
+        return queryset.annotate_organization_id().annotate_organization_date_joined(), continuation
 
-            return response
 
-        elif format == 'csv':
-            csv_stream = CSVStream()
-            headers = [
-                'therapist_id', 'interaction_date', 'counter',
-                'chat_count', 'call_count', 'organization_id',
-                'organization_date_joined'
-            ]
-
-            return csv_stream.export(
-                filename,
-                headers,
-                queryset.iterator(),
-                InteractionExportCSVSerializer
-            )
-
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class BaseSyncView(generics.CreateAPIView):
+class BaseSyncView(BatchSyncMixin, generics.CreateAPIView):
     read_serializer_class = SyncSerializer
 
     def post(self, request, *args, **kwargs):
-        deserializer = self.get_write_serializer(data=request.data, many=True)
-        deserializer.is_valid(raise_exception=True)
-        deserializer.save()
-
-        serializer = self.get_read_serializer(deserializer.instance)
-        return Response(serializer.data)
+        return self.create_batch_sync_response(request)
 
 
 class OrganizationSyncView(BaseSyncView):
     write_serializer_class = OrganizationDeserializer
+    sync_scope = 'organizations'
+    sync_job_type = SyncJob.TYPE_ORGANIZATIONS
 
 
 class TherapistSyncView(BaseSyncView):
     write_serializer_class = TherapistDeserializer
+    sync_scope = 'therapists'
+    sync_job_type = SyncJob.TYPE_THERAPISTS
+
+    def get_stale_fingerprints(self, scope, result):
+        """
+        We override this method because the therapists might be moved from other organizations.
+        """
+        return IdempotencyRecord.objects.filter(scope__startswith=f'{self.sync_scope}:')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -138,6 +98,16 @@ class TherapistSyncView(BaseSyncView):
 
 class InteractionSyncView(BaseSyncView):
     write_serializer_class = InteractionDeserializer
+    sync_scope = 'interactions'
+    sync_job_type = SyncJob.TYPE_INTERACTIONS
+
+    def get_stale_fingerprints(self, scope, result):
+        """
+        We override this method because the bulk interactions synchronization covers this therapist as well.
+        """
+        return IdempotencyRecord.objects.filter(
+            Q(scope=scope) | Q(scope__startswith=f'{BulkInteractionSyncView.sync_scope}:')
+        )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -149,3 +119,86 @@ class InteractionSyncView(BaseSyncView):
             raise Http404
 
         return super().post(request, *args, **kwargs)
+
+
+class BulkInteractionSyncView(BaseSyncView):
+    read_serializer_class = BulkInteractionSyncSerializer
+    write_serializer_class = BulkInteractionDeserializer
+    sync_scope = 'bulk_interactions'
+
+    def get_stale_fingerprints(self, scope, result):
+        """
+        We override this method to include the interactions synchronization of the affected therapists.
+        """
+        scopes = [
+            f'{InteractionSyncView.sync_scope}:{therapist["therapist_id"]}'
+            for therapist in (result or {}).get('therapists', [])
+        ]
+
+        return IdempotencyRecord.objects.filter(Q(scope=scope) | Q(scope__in=scopes))
+
+    def merge_results(self, results):
+        """
+        We override this method to merge the per-therapist results of all chunks.
+        """
+        merged = super().merge_results(results)
+        therapists = {}
+
+        for result in results:
+            for therapist in result['therapists']:
+                total = therapists.setdefault(
+                    therapist['therapist_id'],
+                    {
+                        'therapist_id': therapist['therapist_id'],
+                        'rows_created': 0,
+                        'rows_updated': 0,
+                        'rows_unchanged': 0
+                    }
+                )
+                total['rows_created'] += therapist['rows_created']
+                total['rows_updated'] += therapist['rows_updated']
+                total['rows_unchanged'] += therapist['rows_unchanged']
+
+        merged['rows_updated'] = merged.get('rows_updated', 0)
+        merged['rows_unchanged'] = merged.get('rows_unchanged', 0)
+        merged['therapists'] = list(therapists.values())
+
+        return merged
+
+
+class SyncJobDetailView(generics.RetrieveAPIView):
+    read_serializer_class = SyncJobSerializer
+    queryset = SyncJob.objects.all()
+
+
+class ExportJobDetailView(generics.RetrieveAPIView):
+    read_serializer_class = ExportJobSerializer
+    queryset = ExportJob.objects.all()
+
+
+class ExportJobFileView(generics.RetrieveAPIView):
+    """
+    Sends the file of a completed export job. The response isn't compressed,
+    so the server sends the file through its `wsgi.file_wrapper` (i.e. `sendfile`).
+    """
+    queryset = ExportJob.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+
+        if job.status != ExportJob.STATUS_COMPLETED:
+            return Response(
+                {'detail': f'The export job is {job.status}.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            file = open(job.get_file_path(), 'rb')
+        except FileNotFoundError:
+            # It's expired meanwhile.
+            raise Http404
+
+        response = FileResponse(file, content_type=CONTENT_TYPES[job.format])
+        response['Content-Disposition'] = f"attachment; filename={job.file_name}"
+
+        return response
@@ -1,39 +1,329 @@
 import csv
+import io
+import queue
+import threading
 
+from django.db import connection
 from django.http import StreamingHttpResponse
-from itertools import chain
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
 
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
-class Echo:
+from holistic_organization.exports import Column, copy_csv_sql, iter_chunks, iter_text_chunks
+
+
+class CSVStream:
     """
-    An object that implements just the write method of the file-like
-    interface.
+    Class to stream (download) the rows of a queryset to a CSV file.
     """
-    def write(self, value):
+    # Number of rows that are fetched and written into one chunk of the response.
+    chunk_size = 2000
+
+    def export(self, filename, queryset, columns):
+        # 1. Create the StreamingHttpResponse using the chunks of the rows as streaming content
+        response = StreamingHttpResponse(
+            self._content(queryset, columns),
+            content_type="text/csv"
+        )
+
+        # 2. Add additional headers to the response
+        response['Content-Disposition'] = f"attachment; filename={filename}.csv"
+
+        # 3. Return the response
+        return response
+
+    def _content(self, queryset, columns):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow([column.header for column in columns])
+
+        for chunk in iter_text_chunks(queryset, columns, self.chunk_size):
+            writer.writerows(chunk)
+
+            yield buffer.getvalue()
+
+            buffer.seek(0)
+            buffer.truncate()
+
+        # The header of an empty export.
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+class CopyChunkWriter(io.RawIOBase):
+    """
+    The raw file that receives the output of `COPY ... TO STDOUT` through an `io.BufferedWriter`,
+    so it's called once per chunk instead of once per row.
+    It hands the chunks to the response through the bounded `chunks` queue.
+    """
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.discarded = False
+        # Whether the output stopped within a quoted field.
+        self.in_quotes = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        size = len(data)
+
+        if not self.discarded:
+            self.put(self._crlf(bytes(data)))
+
+        return size
+
+    def put(self, item):
+        """
+        Puts the `item` into the `chunks` queue, unless the response is discarded meanwhile.
+        """
+        while not self.discarded:
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _crlf(self, data):
         """
-        Write the value by returning it, instead of storing in a buffer.
+        Ends the records with CRLF as Python's `csv` module does, PostgreSQL ends them with LF.
+        The line breaks within the quoted fields are kept as they are.
         """
-        return value
+        if b'"' not in data and not self.in_quotes:
+            return data.replace(b'\n', b'\r\n')
 
+        lines = data.split(b'\n')
+        result = []
 
-class CSVStream:
+        for line in lines[:-1]:
+            # The escaped quotes are doubled, so they don't change the parity.
+            self.in_quotes ^= line.count(b'"') % 2 == 1
+            result.append(line + (b'\n' if self.in_quotes else b'\r\n'))
+
+        self.in_quotes ^= lines[-1].count(b'"') % 2 == 1
+        result.append(lines[-1])
+
+        return b''.join(result)
+
+
+class CopyCSVStream:
     """
-    Class to stream (download) an iterator to a CSV file.
+    Class to stream (download) the rows of a queryset to a CSV file, which is written by PostgreSQL
+    through `COPY ... TO STDOUT`. The output is the same as the output of the `CSVStream`.
     """
-    def export(self, filename, headers, iterator, serializer_class):
-        # 1. Create our writer object with the pseudo buffer
-        writer = csv.writer(Echo())
-
-        # 2. Create the StreamingHttpResponse using our iterator as streaming content
-        serializer = serializer_class()
+    # Size of the chunks of the response.
+    chunk_size = 64 * 1024
+    # Number of chunks that are read ahead of the client.
+    max_chunks = 16
 
+    def export(self, filename, queryset, columns):
+        # 1. Create the StreamingHttpResponse using the chunks of the COPY output as streaming content
         response = StreamingHttpResponse(
-            chain((writer.writerow(headers)), (writer.writerow(serializer.to_representation(data)) for data in iterator)),
+            self._content(copy_csv_sql(queryset, columns), columns),
             content_type="text/csv"
         )
 
-        # 3. Add additional headers to the response
+        # 2. Add additional headers to the response
         response['Content-Disposition'] = f"attachment; filename={filename}.csv"
 
+        # 3. Return the response
+        return response
+
+    def _content(self, sql, columns):
+        header = io.StringIO()
+        csv.writer(header).writerow([column.header for column in columns])
+
+        yield header.getvalue().encode()
+
+        # The COPY runs in its own thread, since psycopg2 writes its whole output into a file at once.
+        chunks = queue.Queue(maxsize=self.max_chunks)
+        writer = CopyChunkWriter(chunks)
+        cursor = connection.cursor()
+
+        def copy():
+            try:
+                with io.BufferedWriter(writer, buffer_size=self.chunk_size) as file:
+                    cursor.cursor.copy_expert(sql, file)
+
+                writer.put(None)
+            except Exception as e:
+                writer.put(e)
+
+        thread = threading.Thread(target=copy, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                chunk = chunks.get()
+
+                if chunk is None:
+                    return
+
+                if isinstance(chunk, Exception):
+                    raise chunk
+
+                yield chunk
+
+        finally:
+            if thread.is_alive():
+                # The client went away, the COPY is cancelled and its remaining output is dropped.
+                writer.discarded = True
+                connection.connection.cancel()
+
+            thread.join()
+            cursor.close()
+
+
+class JSONStream:
+    """
+    Class to stream (download) the rows of a queryset to a JSON array or to a NDJSON file,
+    one JSON object per line.
+    """
+    # Number of rows that are fetched and encoded into one chunk of the response.
+    chunk_size = 2000
+
+    def export(self, filename, queryset, columns, lines=False):
+        # 1. Create the encoder, it writes the same JSON as the `JSONRenderer`
+        encoder = JSONEncoder(
+            ensure_ascii=not api_settings.UNICODE_JSON,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': ')
+        )
+        names = [column.name for column in columns]
+        chunks = (
+            [dict(zip(names, row)) for row in chunk]
+            for chunk in iter_text_chunks(queryset, columns, self.chunk_size)
+        )
+
+        # 2. Create the StreamingHttpResponse using the encoded chunks as streaming content
+        if lines:
+            response = StreamingHttpResponse(self._lines(encoder, chunks), content_type="application/x-ndjson")
+            extension = 'ndjson'
+        else:
+            response = StreamingHttpResponse(self._array(encoder, chunks), content_type="application/json")
+            extension = 'json'
+
+        # 3. Add additional headers to the response
+        response['Content-Disposition'] = f"attachment; filename={filename}.{extension}"
+
         # 4. Return the response
         return response
+
+    def _array(self, encoder, chunks):
+        yield '['
+
+        separator = ''
+
+        for chunk in chunks:
+            # Encodes the whole chunk at once, then drops the brackets of the list.
+            yield separator + encoder.encode(chunk)[1:-1]
+            separator = ','
+
+        yield ']'
+
+    def _lines(self, encoder, chunks):
+        for chunk in chunks:
+            yield ''.join(encoder.encode(row) + '\n' for row in chunk)
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    The file that receives the output of the columnar writers, the written bytes are taken by `drain`.
+    It keeps counting the position, since the writers store the offsets of the row groups.
+    """
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        """
+        Returns the bytes that are written since the last call.
+        """
+        data = b''.join(self.parts)
+        self.parts = []
+
+        return data
+
+
+class ColumnarStream:
+    """
+    Class to stream (download) the rows of a queryset to a Parquet file or to an Arrow IPC file.
+    The rows are written in row groups (record batches) of `row_group_size` rows,
+    and each column keeps its type, e.g. the dates are stored as dates.
+    """
+    # Number of rows that are fetched and written into one row group.
+    row_group_size = 65536
+
+    FORMATS = {
+        'parquet': ('application/vnd.apache.parquet', 'parquet'),
+        'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    }
+
+    def export(self, filename, queryset, columns, format):
+        content_type, extension = self.FORMATS[format]
+
+        # 1. Create the StreamingHttpResponse using the row groups as streaming content
+        response = StreamingHttpResponse(
+            self._content(queryset, columns, format),
+            content_type=content_type
+        )
+
+        # 2. Add additional headers to the response
+        response['Content-Disposition'] = f"attachment; filename={filename}.{extension}"
+
+        # 3. Return the response
+        return response
+
+    def _content(self, queryset, columns, format):
+        types = {
+            Column.TEXT: pyarrow.string(),
+            Column.INTEGER: pyarrow.int64(),
+            Column.FLOAT: pyarrow.float64(),
+            Column.DATE: pyarrow.date32(),
+        }
+        schema = pyarrow.schema([(column.name, types[column.kind]) for column in columns])
+
+        sink = ChunkSink()
+
+        if format == 'parquet':
+            writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        else:
+            writer = pyarrow.ipc.new_file(sink, schema)
+
+        with writer:
+            chunks = iter_chunks(queryset, [column.expression() for column in columns], self.row_group_size)
+
+            for chunk in chunks:
+                batch = pyarrow.record_batch(
+                    [pyarrow.array(values, type=type) for values, type in zip(zip(*chunk), schema.types)],
+                    schema=schema
+                )
+
+                if format == 'parquet':
+                    writer.write_table(pyarrow.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+
+                yield sink.drain()
+
+        # The footer.
+        yield sink.drain()
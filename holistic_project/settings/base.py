@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 
 from datetime import timedelta
 
@@ -110,9 +111,90 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': ['holistic_auth.auth.TokenAuthentication'],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
-    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer']
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'holistic_organization.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'holistic_organization.renderers.MessagePackRenderer',
+    ],
+    # The dates are rendered by the renderer, i.e. ISO 8601 strings in JSON
+    # and the compact date extension type in MessagePack.
+    'DATE_FORMAT': None,
 }
 
+#
+# Synchronization API
+#
+
+# Number of items that are validated and upserted at once
+# by the synchronization and batch create endpoints.
+# Each chunk is committed within its own transaction.
+SYNC_CHUNK_SIZE = 1000
+
+# Upper bound of the `chunk_size` query parameter of those endpoints.
+SYNC_MAX_CHUNK_SIZE = 10000
+
+# Number of seconds the `run_sync_worker` command waits before polling new jobs.
+SYNC_JOB_POLL_INTERVAL = 5
+
+# Number of seconds without any heartbeat after which a running job is considered abandoned,
+# and can be claimed again by another worker.
+SYNC_JOB_TIMEOUT = 600
+
+# Number of times a chunk is retried when its transaction collides with a concurrent synchronization
+# (a serialization failure or a deadlock), and the delay in seconds that grows with each retry.
+SYNC_MAX_RETRIES = 3
+SYNC_RETRY_DELAY = 0.1
+
+# Validates the items of the synchronization and batch create endpoints through compiled fields,
+# instead of the full DRF field machinery (see `holistic_organization.validators`).
+SYNC_FAST_VALIDATION = False
+
+# Number of seconds a synchronization response is replayed
+# to the requests with the same `Idempotency-Key` header or payload.
+SYNC_IDEMPOTENCY_TTL = 24 * 60 * 60
+
+# Upper bound of the decompressed size of a compressed request body (`Content-Encoding: gzip`),
+# it guards against decompression bombs.
+SYNC_MAX_DECOMPRESSED_SIZE = 1024 * 1024 * 1024
+
+# Number of bytes of the fingerprinted payload kept in memory before it's spooled to disk.
+SYNC_SPOOL_MAX_MEMORY_SIZE = 5 * 1024 * 1024
+
+#
+# Export API
+#
+
+# The directory where the rendered exports of the total therapists and the rates are cached,
+# keyed by their request and by the data version of their table. `None` disables the cache.
+# It must be cleared whenever the database is restored, since the data versions restart with it.
+EXPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'holistic_export_cache')
+
+# Number of bytes the cached exports may take, the least recently used files are removed beyond it.
+# `None` keeps every file of the current data versions.
+EXPORT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Number of rows of each page of the exports requested by pages, when the request doesn't give its `page_size`.
+EXPORT_PAGE_SIZE = 100000
+
+# The directory where the files of the `?async=true` exports are written by the `run_export_worker` command,
+# it must be shared with the web workers that send them.
+EXPORT_JOB_DIR = os.path.join(tempfile.gettempdir(), 'holistic_export_jobs')
+
+# Number of seconds the `run_export_worker` command waits before polling new jobs.
+EXPORT_JOB_POLL_INTERVAL = 5
+
+# Number of seconds without any heartbeat after which a running export job is considered abandoned,
+# and can be claimed again by another worker.
+EXPORT_JOB_TIMEOUT = 600
+
+# Number of seconds the files of the finished export jobs are kept, the expired jobs are removed along with them.
+EXPORT_JOB_TTL = 24 * 60 * 60
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/